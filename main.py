@@ -2,14 +2,47 @@
 Pretty Pixels - Face Editing Application
 Main entry point
 """
+import time
+
+_PROCESS_START = time.perf_counter()
+
+import argparse
+import logging
 import tkinter as tk
 from src.gui.main_window import MainWindow
+from src.utils.config import RENDER_PROCESS, PROFILE_PATH
+
+
+def print_startup_timings(timings):
+    """Print the startup breakdown collected by MainWindow"""
+    print("Startup timings:")
+    print(f"  window visible: {timings.get('window', 0.0):.2f}s after MainWindow()")
+    print(f"  heavy imports:  {timings['imports']:.2f}s (background)")
+    print(f"  model load:     {timings['model_load']:.2f}s (background)")
+    print(f"  detector ready: {timings['ready']:.2f}s after MainWindow()")
+    print(f"  process total:  {time.perf_counter() - _PROCESS_START:.2f}s")
 
 
 def main():
     """Main application entry point"""
+    parser = argparse.ArgumentParser(description='Pretty Pixels face editor')
+    parser.add_argument('--startup-timing', action='store_true',
+                        help='Print import vs. model-load startup breakdown')
+    parser.add_argument('--render-process', action=argparse.BooleanOptionalAction, default=RENDER_PROCESS,
+                        help='Render in a separate process sharing frames through shared memory')
+    parser.add_argument('--profile', nargs='?', const=PROFILE_PATH, metavar='PATH',
+                        help='Sample loads and renders from the start and write collapsed stacks to PATH '
+                             'on exit (F9 toggles profiling at any time)')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Log thread and process decisions (see src/processing/resources.py)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s %(name)s %(message)s')
+
     root = tk.Tk()
-    app = MainWindow(root)
+    app = MainWindow(root, on_ready=print_startup_timings if args.startup_timing else None,
+                     render_process=args.render_process, profile=args.profile)
     root.mainloop()
 
 
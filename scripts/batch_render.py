@@ -0,0 +1,116 @@
+"""
+Render a folder of portraits with one recipe, resumably
+
+Finished items are recorded in output/.job/manifest; rerunning the same
+command skips them. --shard i/N splits the folder between machines that
+share the output directory, --workers runs several processes on this
+machine, coordinated by lease files. By default there is one process per
+usable core (see src/processing/resources.py), each with its share of the
+cores for OpenCV's threads.
+
+Usage:
+    python -m scripts.batch_render face_dataset -o out --recipe '{"smoothing": 40, "lipstick": 60}'
+    python -m scripts.batch_render face_dataset -o /shared/out --shard 0/4 --workers 2
+"""
+import argparse
+import json
+import sys
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from src.processing.recipe import normalize_recipe
+from src.processing.resources import plan_resources, describe
+from src.service.batch import run_batch, parse_shard
+from src.utils.config import MEMORY_BUDGET, BATCH_LEASE_SECONDS
+
+
+def print_item(status, name, record):
+    """Progress line per rendered or failed input"""
+    if record is None:
+        return
+    detail = record.get('error') or f"{record['timings_ms']['total']:.0f} ms"
+    print(f"{status:<7} {name}  {detail}", flush=True)
+
+
+def run_shard(kwargs, verbose):
+    """run_batch in a worker process"""
+    return run_batch(**kwargs, on_item=print_item if verbose else None)
+
+
+def main():
+    """Run (or resume) the job and print a summary"""
+    parser = argparse.ArgumentParser(description='Resumable bulk rendering of a folder')
+    parser.add_argument('input', help='Directory of portraits')
+    parser.add_argument('-o', '--output', required=True, help='Output directory')
+    parser.add_argument('--recipe', default='{}', help='Recipe as a JSON string')
+    parser.add_argument('--recipe-file', help='Recipe JSON file (overrides --recipe)')
+    parser.add_argument('--format', default='jpg', choices=['jpg', 'png'])
+    parser.add_argument('--shard', default='0/1', help='This machine\'s shard, i/N')
+    parser.add_argument('--workers', type=int, help='Processes on this machine (default: one per usable core)')
+    parser.add_argument('--job-dir', help='Manifest and lease directory (default: OUTPUT/.job)')
+    parser.add_argument('--cache-dir', help='Render cache directory')
+    parser.add_argument('--memory-budget', type=float, metavar='MB', help='Memory budget per render')
+    parser.add_argument('--lease-timeout', type=float, default=BATCH_LEASE_SECONDS,
+                        help='Seconds before another process\'s lease is taken over')
+    parser.add_argument('-q', '--quiet', action='store_true', help='Only print the summary')
+    args = parser.parse_args()
+
+    if args.recipe_file:
+        with open(args.recipe_file) as f:
+            recipe = json.load(f)
+    else:
+        recipe = json.loads(args.recipe)
+
+    try:
+        shard = parse_shard(args.shard)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        normalize_recipe(recipe)
+    except (ValueError, TypeError) as e:
+        parser.error(f"Invalid recipe: {e}")
+
+    resources = plan_resources('batch', args.workers)
+    if not args.quiet:
+        print(describe(resources))
+
+    kwargs = {
+        'input_dir': args.input,
+        'output_dir': args.output,
+        'recipe': recipe,
+        'fmt': args.format,
+        'shard': shard,
+        'job_dir': args.job_dir,
+        'cache_dir': args.cache_dir,
+        'memory_budget': int(args.memory_budget * 1024 ** 2) if args.memory_budget else MEMORY_BUDGET,
+        'lease_timeout': args.lease_timeout,
+        'resources': resources,
+        'run_id': uuid.uuid4().hex
+    }
+
+    start = time.perf_counter()
+    if resources.processes > 1:
+        with ProcessPoolExecutor(max_workers=resources.processes) as executor:
+            futures = [executor.submit(run_shard, kwargs, not args.quiet) for _ in range(resources.processes)]
+            results = [future.result() for future in futures]
+    else:
+        results = [run_shard(kwargs, not args.quiet)]
+    elapsed = time.perf_counter() - start
+
+    # Every process walks the whole shard: count each item once, by its
+    # outcome in the process that rendered it
+    items = {}
+    for result in results:
+        for key, status in result.items():
+            if items.get(key, 'skipped') == 'skipped':
+                items[key] = status
+    counts = Counter(items.values())
+    print(f"Shard {args.shard}: {counts['done']} rendered, {counts['skipped']} already done, "
+          f"{counts['failed']} failed in {elapsed:.1f}s")
+    sys.exit(1 if counts['failed'] else 0)
+
+
+if __name__ == '__main__':
+    main()
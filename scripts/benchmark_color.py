@@ -0,0 +1,127 @@
+"""
+Benchmark the makeup saturation paths
+
+Times the saturation step alone and a full lipstick + blush render on the
+lip and cheek ROIs of a real portrait:
+- legacy: float HSV round trip per stage (the previous implementation,
+  saturation step only)
+- separate: each stage converts its own input
+- shared: one ColorContext per render, HSV path
+- direct: one ColorContext per render, BGR saturation scaling
+and reports the difference from the HSV result.
+
+Usage:
+    python -m scripts.benchmark_color face_dataset/00000.jpg --scale 4 --repeat 20
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from src.effects.makeup import apply_lipstick, apply_blush, LIPSTICK_SATURATION_BOOST
+from src.processing.feathering import feathered_mask
+from src.processing.loader import load_face_image
+from src.utils.color_space import ColorContext, ColorView, saturate_hsv, saturate_direct
+from src.utils.regions import mask_bbox, align_rect, union_rect, crop, paste
+
+
+def render(image_manager, mode):
+    """Lipstick then blush on the face region, the way the pipeline tiles it"""
+    img = image_manager.get_original()
+    masks = image_manager.face_masks
+    lip_mask = feathered_mask(image_manager, 'lips')
+    lip_rect = align_rect(mask_bbox(lip_mask), img.shape)
+    cheek_rect = align_rect(mask_bbox(masks['cheeks']), img.shape)
+
+    context = None
+    if mode != 'separate':
+        context = ColorContext(img, union_rect(lip_rect, cheek_rect), direct=mode == 'direct')
+
+    def colors(rect):
+        return context.view(rect) if context is not None else ColorView.of(crop(img, rect), direct=False)
+
+    paste(img, apply_lipstick(crop(img, lip_rect), crop(masks['lips'], lip_rect), 'red', 60,
+                              feathered_mask=crop(lip_mask, lip_rect), colors=colors(lip_rect)),
+          lip_rect)
+    if context is not None:
+        context.invalidate(lip_rect)
+    paste(img, apply_blush(crop(img, cheek_rect), crop(masks['cheeks'], cheek_rect), 60, 'pink',
+                           colors=colors(cheek_rect)),
+          cheek_rect)
+    return img
+
+
+def legacy_saturation(image, mask, boost):
+    """The saturation step as it was before ColorContext"""
+    hsv = cv2.cvtColor(image.astype(np.uint8), cv2.COLOR_BGR2HSV).astype(np.float32)
+    hsv[:, :, 1] = hsv[:, :, 1] * (1 + boost * mask / 255.0)
+    hsv[:, :, 1] = np.clip(hsv[:, :, 1], 0, 255)
+    return cv2.cvtColor(hsv.astype(np.uint8), cv2.COLOR_HSV2BGR).astype(np.float32)
+
+
+def timed(fn, repeat):
+    """Milliseconds per call after one warm-up call, and the last result"""
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) * 1000.0 / repeat, result
+
+
+def print_row(name, ms, baseline_ms, result, reference):
+    """One table row"""
+    diff = np.abs(result.astype(np.float32) - reference.astype(np.float32))
+    print(f"{name:<10} {ms:>10.2f} {baseline_ms / ms:>7.2f}x {float(diff.max()):>9.1f} {diff.mean():>10.4f}")
+
+
+def main():
+    """Time each mode and compare outputs"""
+    parser = argparse.ArgumentParser(description='Benchmark makeup saturation paths')
+    parser.add_argument('image', help='Portrait to render')
+    parser.add_argument('--scale', type=int, default=1, help='Upscale factor before rendering')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    path = args.image
+    if args.scale > 1:
+        img = cv2.imread(path)
+        img = cv2.resize(img, None, fx=args.scale, fy=args.scale, interpolation=cv2.INTER_CUBIC)
+        path = '/tmp/benchmark_color_input.png'
+        cv2.imwrite(path, img)
+    image_manager = load_face_image(path)
+    h, w = image_manager.original_image.shape[:2]
+    print(f"Image {w}x{h}, {args.repeat} renders per mode")
+
+    header = f"{'mode':<10} {'ms':>10} {'speedup':>8} {'max diff':>9} {'mean diff':>10}"
+
+    # Saturation step alone, on the lip ROI
+    lip_mask = feathered_mask(image_manager, 'lips')
+    lip_rect = align_rect(mask_bbox(lip_mask), image_manager.original_image.shape)
+    roi = crop(image_manager.original_image, lip_rect)
+    mask = crop(lip_mask, lip_rect)
+    roi_float = roi.astype(np.float32)
+    roi_hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
+    boost = LIPSTICK_SATURATION_BOOST
+
+    print(f"\nSaturation step ({lip_rect[2] - lip_rect[0]}x{lip_rect[3] - lip_rect[1]} lip ROI)")
+    print(header)
+    legacy_ms, reference = timed(lambda: legacy_saturation(roi, mask, boost), args.repeat)
+    print_row('legacy', legacy_ms, legacy_ms, reference, reference)
+    ms, result = timed(lambda: saturate_hsv(roi_hsv, mask, boost), args.repeat)
+    print_row('shared', ms, legacy_ms, result, reference)
+    ms, result = timed(lambda: saturate_direct(roi, roi_float, mask, boost), args.repeat)
+    print_row('direct', ms, legacy_ms, result, reference)
+
+    # Whole lipstick + blush render
+    print("\nLipstick + blush render")
+    print(header)
+    baseline_ms, reference = timed(lambda: render(image_manager, 'separate'), args.repeat)
+    print_row('separate', baseline_ms, baseline_ms, reference, reference)
+    for mode in ('shared', 'direct'):
+        ms, result = timed(lambda: render(image_manager, mode), args.repeat)
+        print_row(mode, ms, baseline_ms, result, reference)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Sweep process and thread counts for multi-image runs
+
+Renders the same images (decode, detection, render, encode, as a batch
+job does) with every combination of worker processes, OpenCV threads and
+stage threads given, and prints images per second for each. The
+configuration plan_resources picks for this machine is marked with '*',
+so the sweep shows whether the plan (and CPU_LIMIT) needs tuning.
+
+Usage:
+    python -m scripts.benchmark_resources face_dataset --limit 48
+    python -m scripts.benchmark_resources face_dataset --processes 1 2 4 --cv2-threads 1 2 4 --stage-threads 1 4
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from src.processing.resources import ResourcePlan, detect_topology, plan_resources, describe
+from src.service import worker
+from src.utils.config import MEMORY_BUDGET
+from src.utils.thumbnails import list_images
+
+
+def run_config(images, recipe, plan):
+    """
+    Render every image with one configuration
+
+    Returns:
+        Seconds for all renders, after the workers are warm
+    """
+    # Spawned: workers must not inherit an initialized MediaPipe graph
+    with ProcessPoolExecutor(max_workers=plan.processes, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=worker.init_worker, initargs=(None, MEMORY_BUDGET, plan)) as executor:
+        for future in [executor.submit(worker.ping, 0.2) for _ in range(plan.processes)]:
+            future.result()
+        start = time.perf_counter()
+        for future in [executor.submit(worker.render_job, data, recipe) for data in images]:
+            future.result()
+        return time.perf_counter() - start
+
+
+def main():
+    """Time each configuration and print the table"""
+    topology = detect_topology()
+    cpus = topology.cpus
+    default_counts = sorted({1, max(1, cpus // 2), cpus})
+
+    parser = argparse.ArgumentParser(description='Process and thread count sweep')
+    parser.add_argument('folder', help='Directory of portraits')
+    parser.add_argument('--recipe', default='{"smoothing": 50, "lipstick": 50, "blush": 50, "sharpening": 50}',
+                        help='Recipe JSON')
+    parser.add_argument('--limit', type=int, default=32, help='Images rendered per configuration')
+    parser.add_argument('--processes', type=int, nargs='+', default=sorted({1, cpus, 2 * cpus}))
+    parser.add_argument('--cv2-threads', type=int, nargs='+', default=default_counts)
+    parser.add_argument('--stage-threads', type=int, nargs='+', default=sorted({1, min(4, cpus)}))
+    args = parser.parse_args()
+
+    recipe = json.loads(args.recipe)
+    images = []
+    for path in list_images(args.folder)[:args.limit]:
+        with open(path, 'rb') as f:
+            images.append(f.read())
+    if not images:
+        parser.error(f"No images in {args.folder}")
+
+    quota = f"{topology.quota:.2f}" if topology.quota is not None else 'none'
+    print(f"{topology.logical} logical CPUs, affinity {topology.affinity}, cgroup quota {quota}")
+    planned = plan_resources('batch')
+    print(f"Planned {describe(planned)}")
+
+    print(f"{'processes':>9} {'cv2':>4} {'stage':>5} {'seconds':>8} {'images/s':>9}")
+    results = []
+    for processes, cv2_threads, stage_threads in itertools.product(args.processes, args.cv2_threads,
+                                                                   args.stage_threads):
+        plan = ResourcePlan('batch', processes, cv2_threads, stage_threads, 1, cpus)
+        seconds = run_config(images, recipe, plan)
+        results.append((len(images) / seconds, plan))
+        mark = '*' if (processes, cv2_threads, stage_threads) == planned[1:4] else ' '
+        print(f"{processes:>9} {cv2_threads:>4} {stage_threads:>5} {seconds:>8.2f} "
+              f"{len(images) / seconds:>9.1f} {mark}", flush=True)
+
+    best_rate, best = max(results, key=lambda result: result[0])
+    print(f"Best: {best.processes} process(es) x {best.cv2_threads} OpenCV / {best.stage_threads} stage threads, "
+          f"{best_rate:.1f} images/s")
+
+
+if __name__ == '__main__':
+    main()
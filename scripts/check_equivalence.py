@@ -0,0 +1,282 @@
+"""
+Check the optimized render paths against the reference implementations
+
+Runs every optimized path over portraits from face_dataset/ with random
+slider values, colors and blemish points, compares each result with its
+oracle in src/effects/reference.py, and prints error and speed side by
+side:
+
+    case              runs  max diff   min PSNR  min SSIM   ref ms   opt ms  speedup
+    smoothing           40         0        inf    1.0000    3.10     1.20    2.58x
+
+A case fails when any run exceeds its tolerance (maximum absolute
+difference, minimum PSNR, minimum SSIM); the exit status is 1 if any case
+failed. Optimized renders start from an empty stage cache, except
+pipeline-reblend, which times a second render that only changes makeup
+intensities, and pipeline-click, which then adds one blemish point (only
+the tiles around it are patched) and checks the working image.
+
+Usage:
+    python -m scripts.check_equivalence --images 20 --trials 2
+    python -m scripts.check_equivalence --scale 4 --images 5 --seed 7
+"""
+import argparse
+import glob
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from src.effects import reference
+from src.effects.makeup import apply_lipstick, apply_blush
+from src.effects.registry import STAGES, registered_stages
+from src.effects.sharpening import create_eyebrow_eyelash_mask
+from src.processing.face_detector import FaceDetector
+from src.processing.feathering import feathered_mask
+from src.processing.filters import apply_all_effects, build_render_graph
+from src.processing.graph import RenderGraph
+from src.processing.loader import load_face_image
+from src.processing.mask_generator import MaskGenerator
+from src.processing.memory import MemoryBudgetError
+from src.utils.color_space import ColorView
+from src.utils.constants import LIPSTICK_COLORS, BLUSH_COLORS
+from src.utils.regions import mask_bbox
+
+# Per case: (max abs diff, min PSNR in dB, min SSIM). Paths that only
+# reorganize the work must be bit-exact; the direct BGR saturation and the
+# analytic cheek blur are approximations.
+EXACT = (0, math.inf, 1.0)
+TOLERANCES = {
+    'blemish': EXACT,
+    'smoothing': EXACT,
+    'lipstick': EXACT,
+    'lipstick-direct': (8, 50.0, 0.995),
+    'blush': EXACT,
+    'blush-direct': (8, 50.0, 0.995),
+    'sharpening': EXACT,
+    'cheek-mask': (3, 50.0, 0.999),
+    'pipeline': EXACT,
+    'pipeline-reblend': EXACT,
+    'pipeline-click': EXACT,
+    'pipeline-budget': EXACT,
+}
+
+
+def psnr(a, b):
+    """Peak signal-to-noise ratio in dB (inf for identical images)"""
+    mse = np.mean((a.astype(np.float64) - b.astype(np.float64)) ** 2)
+    return math.inf if mse == 0 else 10.0 * math.log10(255.0 ** 2 / mse)
+
+
+def ssim(a, b):
+    """Mean structural similarity (11x11 Gaussian window, sigma 1.5), averaged over channels"""
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    a = a.astype(np.float64)
+    b = b.astype(np.float64)
+
+    def blur(x):
+        return cv2.GaussianBlur(x, (11, 11), 1.5)
+
+    mu_a, mu_b = blur(a), blur(b)
+    var_a = blur(a * a) - mu_a ** 2
+    var_b = blur(b * b) - mu_b ** 2
+    cov = blur(a * b) - mu_a * mu_b
+    ssim_map = ((2 * mu_a * mu_b + c1) * (2 * cov + c2)) / ((mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2))
+    return float(ssim_map.mean())
+
+
+def timed(fn):
+    """(result, milliseconds)"""
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000.0
+
+
+def random_values(rng):
+    """Random slider values and colors, every stage switched on"""
+    return {
+        'smoothing': rng.randint(1, 100),
+        'lipstick': rng.randint(1, 100),
+        'lipstick_color': rng.choice(list(LIPSTICK_COLORS) + [tuple(rng.randint(0, 255) for _ in range(3))]),
+        'blush': rng.randint(1, 100),
+        'blush_color': rng.choice(list(BLUSH_COLORS)),
+        'sharpening': rng.randint(1, 100)
+    }
+
+
+def random_blemishes(rng, image_manager):
+    """A few points inside the face, sometimes two close enough to interact"""
+    x0, y0, x1, y1 = mask_bbox(image_manager.face_masks['face'])
+    points = [(rng.randrange(x0, x1), rng.randrange(y0, y1)) for _ in range(rng.randint(1, 5))]
+    if rng.random() < 0.5:
+        x, y = points[0]
+        points.append((x + rng.randint(-8, 8), y + rng.randint(-8, 8)))
+    return points
+
+
+def stage_render(image_manager, name, values):
+    """One registered stage through the render graph, cold cache"""
+    image_manager.stage_cache = {}
+    return RenderGraph(image_manager, values, stages=[STAGES[name]]).run()
+
+
+def cold_render(image_manager, values, memory_budget=None):
+    """Whole pipeline through the render graph, cold cache"""
+    image_manager.stage_cache = {}
+    return apply_all_effects(image_manager, values, memory_budget=memory_budget)
+
+
+def run_cases(image_manager, mask_generator, values, rng):
+    """
+    Run every case once
+
+    Yields:
+        (case, reference result, ref ms, optimized result, opt ms); the
+        optimized result is None when the path declined the input
+    """
+    im = image_manager
+    original = im.original_image
+    masks = im.face_masks
+    lip_mask = feathered_mask(im, 'lips')
+
+    ref, ref_ms = timed(lambda: reference.remove_blemishes(original, im.blemish_points))
+    out, opt_ms = timed(lambda: stage_render(im, 'blemish', values))
+    yield 'blemish', ref, ref_ms, out, opt_ms
+
+    ref, ref_ms = timed(lambda: reference.smooth_face(original, masks['face'], masks['eyes'], values['smoothing']))
+    out, opt_ms = timed(lambda: stage_render(im, 'smoothing', values))
+    yield 'smoothing', ref, ref_ms, out, opt_ms
+
+    ref, ref_ms = timed(lambda: reference.apply_lipstick(original, masks['lips'], values['lipstick_color'],
+                                                         values['lipstick']))
+    out, opt_ms = timed(lambda: stage_render(im, 'lipstick', values))
+    yield 'lipstick', ref, ref_ms, out, opt_ms
+    out, opt_ms = timed(lambda: apply_lipstick(original, masks['lips'], values['lipstick_color'], values['lipstick'],
+                                               feathered_mask=lip_mask,
+                                               colors=ColorView.of(original, direct=True)))
+    yield 'lipstick-direct', ref, ref_ms, out, opt_ms
+
+    ref, ref_ms = timed(lambda: reference.apply_blush(original, masks['cheeks'], values['blush'],
+                                                      values['blush_color']))
+    out, opt_ms = timed(lambda: stage_render(im, 'blush', values))
+    yield 'blush', ref, ref_ms, out, opt_ms
+    out, opt_ms = timed(lambda: apply_blush(original, masks['cheeks'], values['blush'], values['blush_color'],
+                                            colors=ColorView.of(original, direct=True)))
+    yield 'blush-direct', ref, ref_ms, out, opt_ms
+
+    brows = create_eyebrow_eyelash_mask(im.face_landmarks, original.shape)
+    ref, ref_ms = timed(lambda: reference.sharpen_region(original, brows, values['sharpening']))
+    out, opt_ms = timed(lambda: stage_render(im, 'sharpening', values))
+    yield 'sharpening', ref, ref_ms, out, opt_ms
+
+    ellipses = mask_generator.cheek_ellipses(im.face_landmarks)
+    ref, ref_ms = timed(lambda: reference.cheek_mask(original.shape, ellipses))
+    out, opt_ms = timed(lambda: mask_generator.create_cheek_masks(im.face_landmarks, original.shape))
+    yield 'cheek-mask', ref, ref_ms, out, opt_ms
+
+    ref, ref_ms = timed(lambda: reference.render(im, values))
+    out, opt_ms = timed(lambda: cold_render(im, values))
+    yield 'pipeline', ref, ref_ms, out, opt_ms
+
+    # Only makeup intensities change: cached layers are re-blended
+    reblend = dict(values, lipstick=rng.randint(1, 100), blush=rng.randint(1, 100))
+    ref, ref_ms = timed(lambda: reference.render(im, reblend))
+    out, opt_ms = timed(lambda: apply_all_effects(im, reblend))
+    yield 'pipeline-reblend', ref, ref_ms, out, opt_ms
+
+    # One more blemish: cached tiles are patched around it and only the
+    # changed rectangles are copied into the working image
+    im.blemish_points.append(random_blemishes(rng, im)[0])
+    ref, ref_ms = timed(lambda: reference.render(im, reblend))
+    _, opt_ms = timed(lambda: apply_all_effects(im, reblend))
+    yield 'pipeline-click', ref, ref_ms, im.working_image.copy(), opt_ms
+
+    # A budget below the untiled peak forces smaller tiles
+    budget = int(build_render_graph(im, values).predicted_bytes() * 0.6)
+    try:
+        out, opt_ms = timed(lambda: cold_render(im, values, memory_budget=budget))
+    except MemoryBudgetError:
+        out, opt_ms = None, 0.0
+    ref, ref_ms = timed(lambda: reference.render(im, values))
+    yield 'pipeline-budget', ref, ref_ms, out, opt_ms
+
+
+def load_scaled(path, scale, face_detector, mask_generator):
+    """load_face_image on the portrait upscaled by scale (through a private temporary file)"""
+    if scale <= 1:
+        return load_face_image(path, face_detector, mask_generator)
+    img = cv2.imread(path)
+    img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    with tempfile.NamedTemporaryFile(suffix='.png') as f:
+        cv2.imwrite(f.name, img)
+        return load_face_image(f.name, face_detector, mask_generator)
+
+
+def main():
+    """Run the cases over the dataset and print the report"""
+    parser = argparse.ArgumentParser(description='Compare optimized render paths with the reference implementations')
+    parser.add_argument('--dataset', default='face_dataset', help='Directory of portraits')
+    parser.add_argument('--images', type=int, default=20, help='Portraits to sample')
+    parser.add_argument('--trials', type=int, default=2, help='Random recipes per portrait')
+    parser.add_argument('--scale', type=int, default=1, help='Upscale factor before rendering')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    paths = sorted(glob.glob(os.path.join(args.dataset, '*')))
+    paths = rng.sample(paths, min(args.images, len(paths)))
+
+    registered_stages()
+    face_detector = FaceDetector()
+    mask_generator = MaskGenerator()
+    stats = {case: {'runs': 0, 'skipped': 0, 'max_diff': 0, 'psnr': math.inf, 'ssim': 1.0,
+                    'ref_ms': 0.0, 'opt_ms': 0.0} for case in TOLERANCES}
+
+    for path in paths:
+        try:
+            image_manager = load_scaled(path, args.scale, face_detector, mask_generator)
+        except ValueError:
+            continue
+
+        for _ in range(args.trials):
+            values = random_values(rng)
+            image_manager.blemish_points = random_blemishes(rng, image_manager)
+            for case, ref, ref_ms, out, opt_ms in run_cases(image_manager, mask_generator, values, rng):
+                row = stats[case]
+                if out is None:
+                    row['skipped'] += 1
+                    continue
+                row['runs'] += 1
+                row['max_diff'] = max(row['max_diff'], int(np.abs(ref.astype(np.int16) - out).max()))
+                row['psnr'] = min(row['psnr'], psnr(ref, out))
+                row['ssim'] = min(row['ssim'], ssim(ref, out))
+                row['ref_ms'] += ref_ms
+                row['opt_ms'] += opt_ms
+
+    print(f"{'case':<17} {'runs':>5} {'max diff':>9} {'min PSNR':>9} {'min SSIM':>9} "
+          f"{'ref ms':>8} {'opt ms':>8} {'speedup':>8}  result")
+    failed = False
+    for case, (max_diff, min_psnr, min_ssim) in TOLERANCES.items():
+        row = stats[case]
+        runs = row['runs']
+        if not runs:
+            print(f"{case:<17} {0:>5}  (no runs)")
+            continue
+        ok = row['max_diff'] <= max_diff and row['psnr'] >= min_psnr and row['ssim'] >= min_ssim
+        failed = failed or not ok
+        ref_ms, opt_ms = row['ref_ms'] / runs, row['opt_ms'] / runs
+        skipped = f" ({row['skipped']} rejected)" if row['skipped'] else ''
+        print(f"{case:<17} {runs:>5} {row['max_diff']:>9} {row['psnr']:>9.2f} {row['ssim']:>9.4f} "
+              f"{ref_ms:>8.2f} {opt_ms:>8.2f} {ref_ms / max(opt_ms, 1e-9):>7.2f}x  "
+              f"{'ok' if ok else 'FAIL'}{skipped}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Check what the entry modules load at import time, and how long it takes
+
+Imports each module in a fresh interpreter (several times, the median
+counts) and fails if it takes longer than its budget or loads a module it
+must not: the processing core never imports Tk or PIL.ImageTk, only face
+detection loads MediaPipe, and the GUI opens its window before OpenCV and
+NumPy are loaded.
+
+    module                        median ms  budget ms  loaded         result
+    src.service.worker                245.1        600  cv2, numpy     ok
+
+Exit status 1 if any module fails.
+
+Usage:
+    python -m scripts.check_imports --runs 5
+    python -m scripts.check_imports --scale 2    # slower machine: double the budgets
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+HEAVY = ('cv2', 'numpy', 'mediapipe', 'tkinter', 'PIL.ImageTk')
+HEADLESS = ('mediapipe', 'tkinter', 'PIL.ImageTk')
+
+# Module -> (budget in ms, modules it must not load)
+BUDGETS = {
+    'src.effects.smoothing': (500, HEADLESS),
+    'src.effects.makeup': (500, HEADLESS),
+    'src.effects.sharpening': (500, HEADLESS),
+    'src.processing.filters': (500, HEADLESS),
+    'src.processing.loader': (500, HEADLESS),
+    'src.processing.stacked': (500, HEADLESS),
+    'src.processing.video': (600, HEADLESS),
+    'src.service.worker': (600, HEADLESS),
+    'src.service.server': (600, HEADLESS),
+    'src.service.batch': (600, HEADLESS),
+    'src.processing.render_engine': (250, ('cv2', 'mediapipe', 'tkinter', 'PIL.ImageTk')),
+    'src.processing.resources': (50, ('cv2', 'numpy', 'mediapipe', 'tkinter')),
+    'src.gui.main_window': (250, ('cv2', 'numpy', 'mediapipe')),
+}
+
+PROBE = r'''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{'ms': (time.perf_counter() - start) * 1000.0,
+                  'loaded': [name for name in {heavy!r} if name in sys.modules]}}))
+'''
+
+
+def probe(module):
+    """(milliseconds, heavy modules loaded) for one import in a fresh interpreter"""
+    out = subprocess.run([sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY)],
+                         capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    return result['ms'], result['loaded']
+
+
+def main():
+    """Import every module, print the table and set the exit status"""
+    parser = argparse.ArgumentParser(description='Import-time budget check')
+    parser.add_argument('--runs', type=int, default=3, help='Imports per module (median counts)')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply every budget')
+    parser.add_argument('modules', nargs='*', help='Check only these modules')
+    args = parser.parse_args()
+
+    modules = args.modules or list(BUDGETS)
+    print(f"{'module':<30} {'median ms':>9} {'budget ms':>10}  {'loaded':<14} result")
+    failed = False
+    for module in modules:
+        budget, forbidden = BUDGETS[module]
+        budget *= args.scale
+        samples = [probe(module) for _ in range(args.runs)]
+        ms = statistics.median(ms for ms, _ in samples)
+        loaded = sorted(set().union(*(loaded for _, loaded in samples)))
+        bad = [name for name in loaded if name in forbidden]
+        ok = ms <= budget and not bad
+        failed = failed or not ok
+        note = f" (loads {', '.join(bad)})" if bad else ''
+        print(f"{module:<30} {ms:>9.1f} {budget:>10.0f}  {', '.join(loaded) or '-':<14} "
+              f"{'ok' if ok else 'FAIL'}{note}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
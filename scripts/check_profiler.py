@@ -0,0 +1,62 @@
+"""
+Check that the render engine's profile covers renders, not idle time
+
+Profiles the engine process across a few renders, then keeps profiling
+while it sits idle. Fails if the idle period added any samples or if the
+render samples are not attributed to src/effects or src/processing code
+(for example to the engine's dispatch loop waiting in conn.recv):
+
+    render samples  idle samples  in dispatcher  result
+               412             0           0.0%  ok
+
+Exit status 1 on failure.
+
+Usage:
+    python -m scripts.check_profiler face_dataset/00000.jpg --renders 5 --idle 2
+"""
+import argparse
+import sys
+import time
+
+from src.processing.loader import load_face_image
+from src.processing.render_engine import RenderEngine
+
+RECIPE = {'smoothing': 50, 'lipstick': 50, 'blush': 50, 'sharpening': 50}
+DISPATCHER_WAIT = 'src/processing/render_engine.py:_engine_main;connection.py'
+MAX_DISPATCHER_SHARE = 0.05  # Render samples allowed to end in the dispatch loop
+
+
+def main():
+    """Profile renders and an idle period in the engine, print the counts"""
+    parser = argparse.ArgumentParser(description='Render engine profiling check')
+    parser.add_argument('image', help='Portrait to render')
+    parser.add_argument('--renders', type=int, default=5, help='Renders profiled')
+    parser.add_argument('--idle', type=float, default=2.0, help='Idle seconds profiled afterwards')
+    args = parser.parse_args()
+
+    image_manager = load_face_image(args.image)
+    engine = RenderEngine()
+    try:
+        engine.load(image_manager)
+        engine.set_profiling(True)
+        for intensity in range(args.renders):
+            engine.render(dict(RECIPE, smoothing=40 + intensity), [])
+        rendered = engine.set_profiling(False)
+
+        engine.set_profiling(True)
+        time.sleep(args.idle)
+        idle = engine.set_profiling(False)
+    finally:
+        engine.close()
+
+    samples = sum(rendered.values())
+    dispatcher = sum(count for stack, count in rendered.items() if DISPATCHER_WAIT in stack)
+    share = dispatcher / samples if samples else 1.0
+    ok = samples > 0 and not idle and share <= MAX_DISPATCHER_SHARE
+    print(f"{'render samples':>14} {'idle samples':>13} {'in dispatcher':>14}  result")
+    print(f"{samples:>14} {sum(idle.values()):>13} {100.0 * share:>13.1f}%  {'ok' if ok else 'FAIL'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Load-test the rendering service at a target concurrency
+
+Usage:
+    python -m scripts.load_test face_dataset --concurrency 8 --requests 200
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from src.utils.config import SERVICE_HOST, SERVICE_PORT
+from src.utils.constants import LIPSTICK_COLORS, BLUSH_COLORS
+from .render_client import build_request
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def random_recipe(rng):
+    """Random slider values and colors"""
+    return {
+        'smoothing': rng.randint(0, 100),
+        'lipstick': rng.randint(0, 100),
+        'lipstick_color': rng.choice(list(LIPSTICK_COLORS)),
+        'blush': rng.randint(0, 100),
+        'blush_color': rng.choice(list(BLUSH_COLORS)),
+        'sharpening': rng.randint(0, 100)
+    }
+
+
+def main():
+    """Fire requests and report latency percentiles"""
+    parser = argparse.ArgumentParser(description='PrettyPixels service load test')
+    parser.add_argument('inputs', help='Image file or directory')
+    parser.add_argument('--url', default=f"http://{SERVICE_HOST}:{SERVICE_PORT}")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if os.path.isdir(args.inputs):
+        paths = sorted(glob.glob(os.path.join(args.inputs, '*.jpg')))
+    else:
+        paths = [args.inputs]
+    images = []
+    for path in paths[:args.requests]:
+        with open(path, 'rb') as f:
+            images.append(f.read())
+
+    rng = random.Random(args.seed)
+    jobs = [(images[i % len(images)], random_recipe(rng)) for i in range(args.requests)]
+
+    lock = threading.Lock()
+    latencies = []
+    server_ms = {'queue': [], 'render': []}
+    statuses = {}
+
+    def send(job):
+        image_bytes, recipe = job
+        request = build_request(args.url, image_bytes, recipe)
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                status = response.status
+                headers = response.headers
+        except urllib.error.HTTPError as e:
+            e.read()
+            status, headers = e.code, None
+        elapsed = (time.perf_counter() - start) * 1000.0
+
+        with lock:
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 200:
+                latencies.append(elapsed)
+                server_ms['queue'].append(float(headers['X-Queue-Ms']))
+                server_ms['render'].append(float(headers['X-Render-Ms']))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(send, jobs))
+    wall = time.perf_counter() - start
+
+    report = {
+        'concurrency': args.concurrency,
+        'requests': args.requests,
+        'statuses': statuses,
+        'throughput_rps': round(len(latencies) / wall, 2),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50), 1),
+            'p95': round(percentile(latencies, 95), 1),
+            'p99': round(percentile(latencies, 99), 1),
+            'max': round(max(latencies), 1) if latencies else None
+        },
+        'server_queue_ms_p99': round(percentile(server_ms['queue'], 99), 1),
+        'server_render_ms_p99': round(percentile(server_ms['render'], 99), 1)
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
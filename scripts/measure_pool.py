@@ -0,0 +1,98 @@
+"""
+Measure worker start-up of the service pool
+
+Starts the render workers both ways: a ProcessPoolExecutor as the service
+used before (every worker imports everything and loads Face Mesh on its
+own) and the pre-forked WarmPool. For each it prints
+
+- first request: a render submitted right after the pool is created,
+  measured until its result arrives (what a request pays during scale-up);
+- time to ready: until every worker has loaded its detector;
+- warm request: median render latency once the workers are ready.
+
+The warm pool's worker is then killed: the script prints how long the
+replacement took to be ready and the latency of the next request.
+
+Usage:
+    python -m scripts.measure_pool face_dataset/00000.jpg --workers 2
+"""
+import argparse
+import os
+import signal
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from src.processing.resources import plan_resources
+from src.service import worker
+from src.service.pool import WarmPool
+from src.utils.config import MEMORY_BUDGET
+
+RECIPE = {'smoothing': 50, 'lipstick': 50, 'blush': 50, 'sharpening': 50}
+
+
+def timed_render(pool, image_bytes):
+    """Milliseconds for one render through the pool"""
+    start = time.perf_counter()
+    pool.submit(worker.render_job, image_bytes, RECIPE).result()
+    return (time.perf_counter() - start) * 1000.0
+
+
+def measure(make_pool, wait_ready, image_bytes, renders):
+    """(first request ms, time to ready s, median warm ms, pool)"""
+    start = time.perf_counter()
+    pool = make_pool()
+    first = timed_render(pool, image_bytes)
+    wait_ready(pool)
+    ready = time.perf_counter() - start
+    warm = statistics.median(timed_render(pool, image_bytes) for _ in range(renders))
+    return first, ready, warm, pool
+
+
+def main():
+    """Measure both pools and print the comparison"""
+    parser = argparse.ArgumentParser(description='Service pool start-up and replacement latency')
+    parser.add_argument('image', help='Portrait rendered by every request')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: planned)')
+    parser.add_argument('--renders', type=int, default=5, help='Warm renders timed per pool')
+    args = parser.parse_args()
+
+    with open(args.image, 'rb') as f:
+        image_bytes = f.read()
+    plan = plan_resources('service', args.workers)
+    initargs = (None, MEMORY_BUDGET, plan)
+
+    def executor_ready(executor):
+        # Each ping blocks briefly so the executor has to start every worker
+        for future in [executor.submit(worker.ping, 0.2) for _ in range(plan.processes)]:
+            future.result()
+
+    print(f"{plan.processes} worker(s)")
+    print(f"{'pool':<10} {'first request':>14} {'time to ready':>14} {'warm request':>13}")
+    rows = [('executor', lambda: ProcessPoolExecutor(plan.processes, initializer=worker.init_worker,
+                                                     initargs=initargs), executor_ready),
+            ('warm', lambda: WarmPool(plan.processes, worker.init_worker, initargs),
+             lambda pool: pool.wait_ready())]
+    for name, make_pool, wait_ready in rows:
+        first, ready, warm, pool = measure(make_pool, wait_ready, image_bytes, args.renders)
+        print(f"{name:<10} {first:>11.0f} ms {ready:>12.2f} s {warm:>10.1f} ms")
+        if name == 'warm':
+            warm_pool = pool
+        else:
+            pool.shutdown()
+
+    # Kill a warm worker while idle: its slot starts a replacement at once
+    pid = warm_pool.wait_ready()[0][0]
+    killed = time.perf_counter()
+    os.kill(pid, signal.SIGKILL)
+    while warm_pool.snapshot()['died'] == 0:
+        time.sleep(0.01)
+    warm_pool.wait_ready()
+    replaced = time.perf_counter() - killed
+    after = timed_render(warm_pool, image_bytes)
+    print(f"Killed worker {pid}: replacement ready after {replaced:.2f} s, next request {after:.1f} ms")
+    warm_pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Measure cold-start cost of the processing stack in fresh interpreters
+
+Breaks startup into per-module import time and Face Mesh model-load time,
+which is what the GUI pays on its background thread.
+
+Usage:
+    python -m scripts.measure_startup --runs 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+PROBE = r'''
+import json, time
+t = {}
+s = time.perf_counter(); import numpy; t['numpy'] = time.perf_counter() - s
+s = time.perf_counter(); import cv2; t['cv2'] = time.perf_counter() - s
+s = time.perf_counter(); import mediapipe; t['mediapipe'] = time.perf_counter() - s
+s = time.perf_counter()
+import src.processing.filters, src.processing.mask_generator, src.processing.face_detector
+t['effects'] = time.perf_counter() - s
+s = time.perf_counter()
+from src.processing.face_detector import FaceDetector
+FaceDetector()
+t['model_load'] = time.perf_counter() - s
+s = time.perf_counter(); import tkinter; t['tkinter'] = time.perf_counter() - s
+print(json.dumps(t))
+'''
+
+
+def main():
+    """Run the probe several times and print median timings"""
+    parser = argparse.ArgumentParser(description='Measure startup breakdown')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    samples = []
+    for _ in range(args.runs):
+        out = subprocess.run([sys.executable, '-c', PROBE], capture_output=True, text=True, check=True)
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"{'phase':<12} {'median':>8}")
+    imports = 0.0
+    for key in samples[0]:
+        value = statistics.median(s[key] for s in samples)
+        if key not in ('model_load', 'tkinter'):
+            imports += value
+        print(f"{key:<12} {value:>7.3f}s")
+    print(f"{'imports':<12} {imports:>7.3f}s  (deferred to background thread)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Report per-stage peak memory of one render
+
+Renders a portrait with memory tracking and prints, for each stage, the
+number of tiles, the predicted and the measured (tracemalloc) peak of its
+largest tile, and the peak of the whole render. The first makeup stage's
+peak includes allocating the shared color planes, which the prediction
+counts as memory held by the render instead. With --budget the render
+is planned against that budget: large stages are tiled, and renders that
+cannot fit are rejected.
+
+Every render also reports how many buffers it took from the image's
+BufferArena that had to be freshly allocated. With --scrub N the first
+recipe slider is then nudged up and down N times, as when dragging it;
+after the first couple of renders these should stop allocating.
+
+Usage:
+    python -m scripts.memory_report photo.jpg --recipe '{"smoothing": 60, "lipstick": 50}'
+    python -m scripts.memory_report photo.jpg --scale 8 --budget 64
+    python -m scripts.memory_report photo.jpg --recipe '{"smoothing": 60}' --scrub 20
+"""
+import argparse
+import json
+import sys
+import time
+
+import cv2
+
+from src.processing.filters import build_render_graph, set_blemish_points
+from src.processing.loader import load_face_image
+from src.processing.memory import MemoryBudgetError, format_bytes
+from src.processing.recipe import normalize_recipe, slider_values
+
+
+def main():
+    """Render once with memory tracking and print the report"""
+    parser = argparse.ArgumentParser(description='Per-stage peak memory of a render')
+    parser.add_argument('image', help='Portrait to render')
+    parser.add_argument('--recipe', default='{"smoothing": 50, "lipstick": 50, "blush": 50, "sharpening": 50}',
+                        help='Recipe JSON')
+    parser.add_argument('--scale', type=int, default=1, help='Upscale factor before rendering')
+    parser.add_argument('--budget', type=float, metavar='MB', help='Memory budget for the render')
+    parser.add_argument('--scrub', type=int, default=0, metavar='N',
+                        help='Renders moving the first recipe slider afterwards')
+    args = parser.parse_args()
+
+    path = args.image
+    if args.scale > 1:
+        img = cv2.imread(path)
+        img = cv2.resize(img, None, fx=args.scale, fy=args.scale, interpolation=cv2.INTER_CUBIC)
+        path = '/tmp/memory_report_input.png'
+        cv2.imwrite(path, img)
+
+    recipe = normalize_recipe(json.loads(args.recipe))
+    image_manager = load_face_image(path)
+    set_blemish_points(image_manager, recipe)
+    h, w = image_manager.original_image.shape[:2]
+    budget = int(args.budget * 1024 ** 2) if args.budget else None
+
+    try:
+        graph = build_render_graph(image_manager, slider_values(recipe), memory_budget=budget, track_memory=True)
+    except MemoryBudgetError as e:
+        print(f"Rejected: {e}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    graph.run()
+    elapsed = (time.perf_counter() - start) * 1000.0
+
+    print(f"Image {w}x{h}, budget {format_bytes(budget) if budget else 'none'}, render {elapsed:.0f} ms")
+    print(f"{'stage':<12} {'tiles':>6} {'predicted':>10} {'peak':>10}")
+    for row in graph.report():
+        if 'peak_bytes' not in row:
+            print(f"{row['stage']:<12} {'-':>6} {row['status']:>21}")
+            continue
+        print(f"{row['stage']:<12} {row['tiles']:>6} {format_bytes(row['predicted_bytes']):>10} "
+              f"{format_bytes(row['peak_bytes']):>10}")
+    print(f"{'render':<12} {'':>6} {format_bytes(graph.predicted_bytes()):>10} {format_bytes(graph.meter.total):>10}")
+    print(f"Buffers: {format_allocations(graph.allocations)}")
+
+    if args.scrub:
+        scrub(image_manager, recipe, json.loads(args.recipe), args.scrub, budget)
+
+
+def format_allocations(allocations):
+    """One-line summary of a render's arena activity"""
+    return (f"{allocations['allocations']} allocated ({format_bytes(allocations['allocated_bytes'])}), "
+            f"{allocations['reuses']} reused")
+
+
+def scrub(image_manager, recipe, given, renders, budget):
+    """Render while nudging the first slider and print each render's buffers"""
+    sliders = [key for key, value in given.items() if isinstance(value, (int, float)) and value > 0]
+    if not sliders:
+        print("Nothing to scrub: the recipe sets no slider")
+        return
+    slider = sliders[0]
+    values = slider_values(recipe)
+    base = values[slider]
+
+    print(f"Scrubbing {slider} around {base}")
+    for i in range(renders):
+        values[slider] = max(1, min(100, base + (1 if i % 2 == 0 else -1) * (1 + i % 3)))
+        graph = build_render_graph(image_manager, values, memory_budget=budget)
+        start = time.perf_counter()
+        image_manager.update_working(graph.run(), graph.write_rects(), graph.changes())
+        elapsed = (time.perf_counter() - start) * 1000.0
+        print(f"  {slider}={values[slider]:<4} {elapsed:6.1f} ms  {format_allocations(graph.allocations)}")
+
+
+if __name__ == '__main__':
+    main()
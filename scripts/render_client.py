@@ -0,0 +1,78 @@
+"""
+Send one image to the rendering service
+
+Usage:
+    python -m scripts.render_client photo.jpg -o result.jpg \
+        --recipe '{"smoothing": 40, "lipstick": 60, "lipstick_color": "wine"}'
+    python -m scripts.render_client photo.jpg -o result.png --recipe-file look.json --format png
+"""
+import argparse
+import base64
+import json
+import sys
+import urllib.error
+import urllib.request
+
+from src.utils.config import SERVICE_HOST, SERVICE_PORT
+
+
+def build_request(url, image_bytes, recipe, fmt='jpg'):
+    """
+    Build a POST /render request
+
+    Args:
+        url: Service base URL
+        image_bytes: Encoded input image
+        recipe: Recipe dictionary
+        fmt: Output format
+
+    Returns:
+        urllib.request.Request
+    """
+    body = json.dumps({
+        'image': base64.b64encode(image_bytes).decode('ascii'),
+        'recipe': recipe,
+        'format': fmt
+    }).encode('utf-8')
+    return urllib.request.Request(
+        url.rstrip('/') + '/render',
+        data=body,
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+
+
+def main():
+    """Render one image through the service"""
+    parser = argparse.ArgumentParser(description='PrettyPixels service client')
+    parser.add_argument('image')
+    parser.add_argument('-o', '--output', required=True)
+    parser.add_argument('--url', default=f"http://{SERVICE_HOST}:{SERVICE_PORT}")
+    parser.add_argument('--recipe', default='{}', help='Recipe as a JSON string')
+    parser.add_argument('--recipe-file', help='Recipe JSON file (overrides --recipe)')
+    parser.add_argument('--format', default='jpg', choices=['jpg', 'png'])
+    args = parser.parse_args()
+
+    if args.recipe_file:
+        with open(args.recipe_file) as f:
+            recipe = json.load(f)
+    else:
+        recipe = json.loads(args.recipe)
+
+    with open(args.image, 'rb') as f:
+        request = build_request(args.url, f.read(), recipe, args.format)
+
+    try:
+        with urllib.request.urlopen(request) as response:
+            with open(args.output, 'wb') as f:
+                f.write(response.read())
+            for key, value in response.headers.items():
+                if key.startswith('X-'):
+                    print(f"{key}: {value}")
+    except urllib.error.HTTPError as e:
+        print(f"Error {e.code}: {e.read().decode('utf-8', 'replace')}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
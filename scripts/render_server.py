@@ -0,0 +1,53 @@
+"""
+Run the local HTTP rendering service
+
+Usage:
+    python -m scripts.render_server --port 8765 --workers 4 --queue-depth 16
+"""
+import argparse
+import logging
+
+from src.processing.resources import describe
+from src.service.server import RenderServer
+from src.utils.config import (
+    SERVICE_HOST, SERVICE_PORT, SERVICE_WORKERS, SERVICE_QUEUE_DEPTH, SERVICE_TIMEOUT, MEMORY_BUDGET
+)
+
+
+def main():
+    """Start the server and serve until interrupted"""
+    parser = argparse.ArgumentParser(description='PrettyPixels rendering service')
+    parser.add_argument('--host', default=SERVICE_HOST)
+    parser.add_argument('--port', type=int, default=SERVICE_PORT)
+    parser.add_argument('--workers', type=int, default=SERVICE_WORKERS,
+                        help='Render processes (default: one per usable core)')
+    parser.add_argument('--queue-depth', type=int, default=SERVICE_QUEUE_DEPTH)
+    parser.add_argument('--timeout', type=float, default=SERVICE_TIMEOUT)
+    parser.add_argument('--cache-dir', help='Persistent render cache directory')
+    parser.add_argument('--memory-budget', type=float, metavar='MB',
+                        help='Memory one render may allocate; larger renders are tiled or rejected (413)')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s %(name)s %(message)s')
+
+    memory_budget = int(args.memory_budget * 1024 ** 2) if args.memory_budget else MEMORY_BUDGET
+    server = RenderServer(args.host, args.port, args.workers, args.queue_depth, args.timeout,
+                          args.cache_dir, memory_budget)
+    for pid, init_seconds, ready_seconds in server.pool.warm_up():
+        print(f"Worker {pid} ready in {ready_seconds:.2f}s ({init_seconds:.2f}s detector init)")
+    print(describe(server.pool.resources))
+    print(f"Serving on http://{args.host}:{args.port} "
+          f"({server.pool.workers} workers, queue depth {args.queue_depth})")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
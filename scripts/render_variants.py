@@ -0,0 +1,76 @@
+"""
+Render a contact sheet of makeup variants for one portrait
+
+Usage:
+    python -m scripts.render_variants photo.jpg -o sheet.jpg
+    python -m scripts.render_variants photo.jpg -o out_dir --individual \
+        --lipstick-colors red pink --blush-colors peach --intensities 40 80
+"""
+import argparse
+import os
+import time
+
+import cv2
+
+from src.processing.loader import load_face_image
+from src.processing.variants import VariantRenderer, iter_variants, variant_label, make_contact_sheet
+from src.utils.constants import LIPSTICK_COLORS, BLUSH_COLORS
+
+
+def parse_args():
+    """Parse command-line arguments"""
+    parser = argparse.ArgumentParser(description='Render makeup variants of a portrait')
+    parser.add_argument('image', help='Input portrait')
+    parser.add_argument('-o', '--output', required=True,
+                        help='Contact sheet path, or directory with --individual')
+    parser.add_argument('--individual', action='store_true',
+                        help='Write one file per variant instead of a grid')
+    parser.add_argument('--lipstick-colors', nargs='*', choices=list(LIPSTICK_COLORS),
+                        default=None, help='Lipstick colors (default: all, empty: none)')
+    parser.add_argument('--blush-colors', nargs='*', choices=list(BLUSH_COLORS),
+                        default=None, help='Blush colors (default: all, empty: none)')
+    parser.add_argument('--intensities', nargs='+', type=int, default=[50],
+                        help='Makeup intensities (0-100)')
+    parser.add_argument('--smoothing', type=int, default=0, help='Face smoothing (0-100)')
+    parser.add_argument('--sharpening', type=int, default=0, help='Eye/eyebrow sharpening (0-100)')
+    parser.add_argument('--columns', type=int, default=None,
+                        help='Grid columns (default: number of blush colors)')
+    parser.add_argument('--cell-width', type=int, default=256, help='Grid cell width in pixels')
+    return parser.parse_args()
+
+
+def main():
+    """Render variants and write the grid or individual files"""
+    args = parse_args()
+
+    image_manager = load_face_image(args.image)
+    base_values = {'smoothing': args.smoothing, 'sharpening': args.sharpening}
+    variants = list(iter_variants(args.lipstick_colors, args.blush_colors, args.intensities))
+
+    start = time.perf_counter()
+    renderer = VariantRenderer(image_manager, base_values)
+    results = renderer.render_all(variants)
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {len(results)} variants in {elapsed:.2f}s")
+
+    if args.individual:
+        os.makedirs(args.output, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(args.image))[0]
+        for i, (variant, image) in enumerate(results):
+            name = variant_label(variant).replace(' / ', '_').replace(' ', '-')
+            cv2.imwrite(os.path.join(args.output, f"{stem}_{i:03d}_{name}.jpg"), image)
+        return
+
+    columns = args.columns or max(1, len(args.blush_colors if args.blush_colors is not None
+                                         else BLUSH_COLORS))
+    sheet = make_contact_sheet(
+        [image for _, image in results],
+        [variant_label(variant) for variant, _ in results],
+        columns=columns,
+        cell_width=args.cell_width
+    )
+    cv2.imwrite(args.output, sheet)
+
+
+if __name__ == '__main__':
+    main()
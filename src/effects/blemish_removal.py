@@ -3,7 +3,21 @@ Blemish removal using inpainting
 """
 import cv2
 import numpy as np
-from ..utils.config import BLEMISH_RADIUS, INPAINT_RADIUS
+from ..utils.buffers import NO_ARENA
+from ..utils.config import (
+    BLEMISH_RADIUS, INPAINT_RADIUS, BLEMISH_AUTO_SENSITIVITY, BLEMISH_AUTO_MAX_SPOTS, BLEMISH_DETECT_WIDTH,
+    BLEMISH_EDGE_MARGIN
+)
+from ..utils.constants import NOSE_INDICES
+from ..utils.regions import mask_bbox, expand_rect, merge_rects, crop
+from .registry import EffectStage, register_stage, register_mask
+
+# Margin around each spot that inpainting may read (radius plus the narrow
+# band fast marching starts from)
+BLEMISH_MARGIN = INPAINT_RADIUS + 2
+
+# Masks automatic detection skips: features whose texture reads as spots
+BLEMISH_EXCLUDE_MASKS = ('eyes', 'lips', 'brows', 'nose')
 
 
 def remove_blemish(image, x, y, radius=BLEMISH_RADIUS):
@@ -26,21 +40,189 @@ def remove_blemish(image, x, y, radius=BLEMISH_RADIUS):
     return result
 
 
-def remove_multiple_blemishes(image, blemish_points, radius=BLEMISH_RADIUS):
+def remove_multiple_blemishes(image, blemish_points, radius=BLEMISH_RADIUS, buffers=NO_ARENA):
     """
     Remove multiple blemishes sequentially
 
+    Same result as calling remove_blemish once per point; the spot mask
+    and two image buffers are reused, inpainting from one into the other.
+
     Args:
         image: Input image (BGR)
         blemish_points: List of (x, y) coordinates
         radius: Inpainting radius
+        buffers: BufferArena for the mask, the spare buffer and the result
 
     Returns:
         Image with all blemishes removed
     """
-    result = image.copy()
+    result = buffers.like(image)
+    np.copyto(result, image)
+    if not blemish_points:
+        return result
 
+    mask = buffers.take(image.shape[:2], np.uint8)
+    spare = buffers.like(image)
     for x, y in blemish_points:
-        result = remove_blemish(result, x, y, radius)
+        mask.fill(0)
+        cv2.circle(mask, (x, y), radius, 255, -1)
+        cv2.inpaint(result, mask, INPAINT_RADIUS, cv2.INPAINT_TELEA, dst=spare)
+        result, spare = spare, result
 
+    buffers.give(mask, spare)
     return result
+
+
+def blemish_rects(blemish_points, shape, radius=BLEMISH_RADIUS):
+    """
+    Independent regions of a set of blemish points
+
+    Each spot's rectangle includes the margin its inpainting reads;
+    overlapping rectangles are merged so spots that interact are removed
+    together, in their original order.
+
+    Args:
+        blemish_points: List of (x, y) coordinates
+        shape: Image shape
+        radius: Inpainting radius
+
+    Returns:
+        List of disjoint rectangles
+    """
+    pad = radius + 1 + BLEMISH_MARGIN
+    return merge_rects(expand_rect((x, y, x + 1, y + 1), pad, shape) for x, y in blemish_points)
+
+
+def create_nose_mask(landmarks, shape):
+    """
+    Create mask for the nose tip, alae and nostrils
+
+    Args:
+        landmarks: List of (x, y) coordinates
+        shape: Image shape
+
+    Returns:
+        Binary mask of the lower nose
+    """
+    mask = np.zeros(shape[:2], dtype=np.uint8)
+    points = np.array([landmarks[i] for i in NOSE_INDICES], dtype=np.int32)
+    cv2.fillConvexPoly(mask, cv2.convexHull(points), 255)
+    return mask
+
+
+def detect_blemishes(image, face_mask, exclude_mask, sensitivity=BLEMISH_AUTO_SENSITIVITY,
+                     max_spots=BLEMISH_AUTO_MAX_SPOTS, radius=BLEMISH_RADIUS):
+    """
+    Find small dark or red spots on the skin
+
+    Works on the face's bounding box, downscaled so the face is at most
+    BLEMISH_DETECT_WIDTH pixels wide. A difference of Gaussians on the
+    LAB lightness (darker than the surroundings) and a channel (redder
+    than the surroundings) scores every pixel; pixels scoring far above
+    the skin's typical score (median plus a multiple of the MAD) are
+    grouped into connected components, and those small and round enough
+    to be a spot are kept, strongest first. Only the skin well inside the
+    face outline is searched (BLEMISH_EDGE_MARGIN): hair strands and the
+    jaw shadow along the outline score like spots. Components closer than
+    the inpainting radius are merged into one spot.
+
+    Args:
+        image: Input image (BGR)
+        face_mask: Face mask; spots are only searched inside it
+        exclude_mask: Mask of features to skip (eyes, lips, ...)
+        sensitivity: 0-100; higher also finds fainter spots
+        max_spots: Most spots returned
+        radius: Inpainting radius; closer spots are merged
+
+    Returns:
+        List of (x, y) spot centers, strongest first
+    """
+    rect = mask_bbox(face_mask)
+    if rect is None or max_spots <= 0:
+        return []
+    x0, y0, x1, y1 = rect
+    scale = min(1.0, BLEMISH_DETECT_WIDTH / (x1 - x0))
+
+    roi, face, exclude = crop(image, rect), crop(face_mask, rect), crop(exclude_mask, rect)
+    if scale < 1.0:
+        size = (max(1, round((x1 - x0) * scale)), max(1, round((y1 - y0) * scale)))
+        roi = cv2.resize(roi, size, interpolation=cv2.INTER_AREA)
+        face = cv2.resize(face, size, interpolation=cv2.INTER_NEAREST)
+        exclude = cv2.resize(exclude, size, interpolation=cv2.INTER_NEAREST)
+    face_width = roi.shape[1]
+
+    # Keep clear of the excluded features, whose edges (lashes, lip line,
+    # nostrils) are dark too, and well inside the face outline
+    margin = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (int(face_width * 0.12) | 1,) * 2)
+    excluded = cv2.dilate(exclude, margin)
+    margin = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (int(face_width * 2 * BLEMISH_EDGE_MARGIN) | 1,) * 2)
+    allowed = cv2.subtract(cv2.erode(face, margin), excluded) > 0
+    if not allowed.any():
+        return []
+
+    # Expected spot radius; the fine blur keeps spots, the coarse one removes them
+    spot = max(1.5, face_width * 0.012)
+    fine, coarse = max(0.8, spot / 2), spot * 3
+    lab = cv2.cvtColor(roi, cv2.COLOR_BGR2LAB)
+    lightness = lab[..., 0].astype(np.float32)
+    redness = lab[..., 1].astype(np.float32)
+    score = cv2.GaussianBlur(lightness, (0, 0), coarse) - cv2.GaussianBlur(lightness, (0, 0), fine)
+    score += 2.0 * (cv2.GaussianBlur(redness, (0, 0), fine) - cv2.GaussianBlur(redness, (0, 0), coarse))
+
+    values = score[allowed]
+    median = np.median(values)
+    noise = 1.4826 * np.median(np.abs(values - median)) + 1e-3
+    threshold = median + (8.0 - 6.0 * sensitivity / 100.0) * noise
+    candidates = ((score > threshold) & allowed).astype(np.uint8)
+
+    count, labels, stats, centroids = cv2.connectedComponentsWithStats(candidates, connectivity=8)
+    area = stats[1:, cv2.CC_STAT_AREA]
+    width, height = stats[1:, cv2.CC_STAT_WIDTH], stats[1:, cv2.CC_STAT_HEIGHT]
+    strength = np.bincount(labels.ravel(), weights=score.ravel(), minlength=count)[1:] / np.maximum(area, 1)
+    spots = np.flatnonzero((area <= np.pi * (spot * 2.5) ** 2) &
+                           (np.maximum(width, height) <= 3 * np.minimum(width, height)))
+    spots = spots[np.argsort(-strength[spots], kind='stable')]
+
+    # Pieces of one spot would each be inpainted: merge them (weighted by
+    # area) into the strongest spot they are near
+    merged = []  # [x, y, area] in image coordinates, strongest first
+    for i in spots:
+        x, y = x0 + centroids[i + 1][0] / scale, y0 + centroids[i + 1][1] / scale
+        for kept in merged:
+            if (kept[0] - x) ** 2 + (kept[1] - y) ** 2 < radius ** 2:
+                total = kept[2] + area[i]
+                kept[0] = (kept[0] * kept[2] + x * area[i]) / total
+                kept[1] = (kept[1] * kept[2] + y * area[i]) / total
+                kept[2] = total
+                break
+        else:
+            merged.append([x, y, area[i]])
+
+    return [(int(x), int(y)) for x, y, _ in merged[:max_spots]]
+
+
+def _points_in(values, rect):
+    """Blemish points inside rect"""
+    x0, y0, x1, y1 = rect
+    return tuple((x, y) for x, y in values['blemish_points'] if x0 <= x < x1 and y0 <= y < y1)
+
+
+def _blemish_stage(roi, rect, inputs):
+    """Remove the blemish points that fall inside rect"""
+    x0, y0 = rect[:2]
+    points = [(x - x0, y - y0) for x, y in _points_in(inputs.values, rect)]
+    return remove_multiple_blemishes(roi, points, buffers=inputs.buffers)
+
+
+register_mask('nose', create_nose_mask)
+
+register_stage(EffectStage(
+    'blemish', 10, _blemish_stage,
+    params={'blemish_points': ()},
+    footprint=lambda inputs, shape: blemish_rects(inputs.values['blemish_points'], shape),
+    memory=16,
+    # Rectangles already hold whole spots; cutting one would change its inpainting
+    tileable=False,
+    # A new point leaves the other spots' tiles as they were
+    tile_params=_points_in
+))
@@ -3,11 +3,169 @@ Makeup effects: lipstick and blush
 """
 import cv2
 import numpy as np
-from ..utils.constants import LIPSTICK_RED, LIPSTICK_PINK, BLUSH_PINK
-from ..utils.image_utils import feather_mask
+from ..utils.constants import LIPSTICK_COLORS, BLUSH_COLORS
+from ..utils.buffers import NO_ARENA
+from ..utils.image_utils import feather_mask, float_mask_3ch
+from ..utils.color_space import ColorView, saturate_hsv, saturate_direct
+from .registry import EffectStage, register_stage
 
+LIPSTICK_SATURATION_BOOST = 0.3
+BLUSH_SATURATION_BOOST = 0.2
 
-def apply_lipstick(image, lip_mask, color='red', intensity=50):
+
+def resolve_color(color, palette, default):
+    """
+    Resolve a color name or (B,G,R) tuple to a float32 color vector
+
+    Args:
+        color: Color name from palette or (B,G,R) tuple
+        palette: Dictionary of named colors
+        default: Name used when color is unknown
+
+    Returns:
+        np.float32 array of shape (3,)
+    """
+    if isinstance(color, tuple):
+        return np.array(color, dtype=np.float32)
+    return np.array(palette.get(color, palette[default]), dtype=np.float32)
+
+
+def boost_saturation(image, mask, boost):
+    """
+    Raise HSV saturation inside a soft mask
+
+    Args:
+        image: Input image (BGR)
+        mask: Soft mask (0-255)
+        boost: Saturation gain at full mask strength
+
+    Returns:
+        Saturated image as float32 BGR
+    """
+    return saturate_hsv(cv2.cvtColor(image.astype(np.uint8), cv2.COLOR_BGR2HSV), mask, boost)
+
+
+def saturate(colors, mask, boost, buffers=NO_ARENA):
+    """
+    Saturation boost from shared conversions of the image
+
+    Args:
+        colors: ColorView of the image; its direct flag picks BGR scaling
+            over the HSV round trip
+        mask: Soft mask (0-255)
+        boost: Saturation gain at full mask strength
+        buffers: BufferArena for the HSV path's temporaries and result
+
+    Returns:
+        Saturated image as float32 BGR
+    """
+    if colors.direct:
+        return saturate_direct(colors.bgr, colors.float32, mask, boost)
+    return saturate_hsv(colors.hsv, mask, boost, buffers)
+
+
+def overlay_blend(saturated, color, buffers=NO_ARENA):
+    """
+    Overlay-blend a flat color onto a float image
+
+    Args:
+        saturated: Float32 BGR image
+        color: Float32 (B,G,R) color vector
+        buffers: BufferArena for the two halves and the result
+
+    Returns:
+        Blended float32 image
+    """
+    # Same float32 arithmetic as blending the two halves separately, without
+    # the boolean gathers; the color broadcasts over the pixels:
+    # s < 128: 2 * s * c / 255, else 255 - 2 * (255 - s) * (255 - c) / 255
+    dark = buffers.like(saturated, np.float32)
+    np.multiply(2, saturated, out=dark)
+    dark *= color
+    dark /= 255.0
+
+    result = buffers.like(saturated, np.float32)
+    np.subtract(255, saturated, out=result)
+    np.multiply(2, result, out=result)
+    result *= 255 - color
+    result /= 255.0
+    np.subtract(255, result, out=result)
+
+    below = buffers.like(saturated, np.bool_)
+    np.less(saturated, 128, out=below)
+    np.copyto(result, dark, where=below)
+    buffers.give(dark, below)
+    return result
+
+
+def composite(image, blended, mask, alpha, image_float=None, buffers=NO_ARENA):
+    """
+    Mix a blended layer back over the image through a soft mask
+
+    Args:
+        image: Input image (BGR)
+        blended: Blended float32 layer
+        mask: Soft mask (0-255)
+        alpha: Layer opacity (0-1)
+        image_float: image as float32, if already converted
+        buffers: BufferArena for temporaries and the result
+
+    Returns:
+        Composited uint8 image
+    """
+    mask_3ch = float_mask_3ch(mask, buffers)
+    converted = None
+    if image_float is None:
+        image_float = converted = buffers.like(image, np.float32)
+        np.copyto(converted, image)
+
+    # image_float * (1 - mask * alpha) + blended * mask * alpha
+    result_float = buffers.like(image, np.float64)
+    np.multiply(mask_3ch, alpha, out=result_float)
+    np.subtract(1, result_float, out=result_float)
+    np.multiply(image_float, result_float, out=result_float)
+    np.multiply(blended, mask_3ch, out=mask_3ch)
+    mask_3ch *= alpha
+    result_float += mask_3ch
+    np.clip(result_float, 0, 255, out=result_float)
+
+    result = buffers.like(image, np.uint8)
+    np.copyto(result, result_float, casting='unsafe')
+    buffers.give(mask_3ch, converted, result_float)
+    return result
+
+
+def makeup_layer(colors, mask, color, boost, buffers=NO_ARENA):
+    """
+    Saturated, color-blended layer; does not depend on intensity
+
+    Args:
+        colors: ColorView of the image
+        mask: Soft mask (0-255)
+        color: Float32 (B,G,R) color vector
+        boost: Saturation gain at full mask strength
+        buffers: BufferArena for temporaries and the layer
+
+    Returns:
+        Blended float32 layer
+    """
+    saturated = saturate(colors, mask, boost, buffers)
+    layer = overlay_blend(saturated, color, buffers)
+    buffers.give(saturated)
+    return layer
+
+
+def lipstick_alpha(intensity):
+    """Layer opacity for a lipstick intensity (0-100)"""
+    return min(intensity / 100.0 * 1.5, 1.0)
+
+
+def blush_alpha(intensity):
+    """Layer opacity for a blush intensity (0-100)"""
+    return min(intensity / 100.0 * 1.0, 1.0)
+
+
+def apply_lipstick(image, lip_mask, color='red', intensity=50, feathered_mask=None, colors=None):
     """
     Apply lipstick color to lips with enhanced visibility
 
@@ -16,6 +174,10 @@ def apply_lipstick(image, lip_mask, color='red', intensity=50):
         lip_mask: Binary mask of lip region
         color: 'red', 'pink', 'coral', 'berry', 'nude', or RGB tuple (B,G,R)
         intensity: 0-100
+        feathered_mask: Precomputed feathered lip mask; derived from
+            lip_mask when None
+        colors: ColorView of image from the render's ColorContext;
+            converted here when None
 
     Returns:
         Image with lipstick applied
@@ -23,48 +185,20 @@ def apply_lipstick(image, lip_mask, color='red', intensity=50):
     if intensity == 0:
         return image
 
-    colors = {
-        'red': (0, 0, 200),           # Classic red
-        'pink': (180, 100, 255),      # Bright pink
-        'coral': (80, 127, 255),      # Coral
-        'berry': (128, 0, 128),       # Berry/purple
-        'nude': (120, 140, 180),      # Nude/beige
-        'wine': (80, 30, 139),        # Wine/dark red
-        'orange': (0, 140, 255),      # Orange
-        'mauve': (170, 120, 200)      # Mauve
-    }
-
-    if isinstance(color, tuple):
-        lip_color = np.array(color, dtype=np.float32)
-    else:
-        lip_color = np.array(colors.get(color, colors['red']), dtype=np.float32)
+    lip_color = resolve_color(color, LIPSTICK_COLORS, 'red')
 
-    lip_mask_feathered = feather_mask(lip_mask, kernel_size=5)
-    lip_mask_3ch = cv2.cvtColor(lip_mask_feathered, cv2.COLOR_GRAY2BGR) / 255.0
+    if feathered_mask is None:
+        feathered_mask = feather_mask(lip_mask, kernel_size=5)
 
-    image_float = image.astype(np.float32)
+    if colors is None:
+        colors = ColorView.of(image)
 
-    alpha = min(intensity / 100.0 * 1.5, 1.0)  
+    blended = makeup_layer(colors, feathered_mask, lip_color, LIPSTICK_SATURATION_BOOST)
 
-    hsv = cv2.cvtColor(image.astype(np.uint8), cv2.COLOR_BGR2HSV).astype(np.float32)
-    hsv[:, :, 1] = hsv[:, :, 1] * (1 + 0.3 * lip_mask_feathered / 255.0)  # Boost saturation
-    hsv[:, :, 1] = np.clip(hsv[:, :, 1], 0, 255)
-    saturated = cv2.cvtColor(hsv.astype(np.uint8), cv2.COLOR_HSV2BGR).astype(np.float32)
+    return composite(image, blended, feathered_mask, lipstick_alpha(intensity), colors.float32)
 
-    overlay = np.zeros_like(image_float)
-    overlay[:] = lip_color
 
-    mask_bool = saturated < 128
-    blended = saturated.copy()
-    blended[mask_bool] = (2 * saturated[mask_bool] * overlay[mask_bool]) / 255.0
-    blended[~mask_bool] = 255 - 2 * (255 - saturated[~mask_bool]) * (255 - overlay[~mask_bool]) / 255.0
-
-    result = image_float * (1 - lip_mask_3ch * alpha) + blended * lip_mask_3ch * alpha
-
-    return np.clip(result, 0, 255).astype(np.uint8)
-
-
-def apply_blush(image, cheek_masks, intensity=50, color='pink'):
+def apply_blush(image, cheek_masks, intensity=50, color='pink', colors=None):
     """
     Apply blush to cheeks with enhanced visibility
 
@@ -73,6 +207,8 @@ def apply_blush(image, cheek_masks, intensity=50, color='pink'):
         cheek_masks: Binary mask of cheek regions
         intensity: 0-100
         color: 'pink', 'peach', 'coral', 'rose', 'bronze', or RGB tuple (B,G,R)
+        colors: ColorView of image from the render's ColorContext;
+            converted here when None
 
     Returns:
         Image with blush applied
@@ -80,40 +216,71 @@ def apply_blush(image, cheek_masks, intensity=50, color='pink'):
     if intensity == 0:
         return image
 
-    colors = {
-        'pink': (180, 100, 255),      # Bright pink
-        'peach': (140, 180, 255),     # Peach
-        'coral': (100, 140, 255),     # Coral
-        'rose': (150, 100, 200),      # Rose
-        'bronze': (80, 120, 180),     # Bronze/terracotta
-        'mauve': (180, 130, 200)      # Mauve
-    }
-
-    if isinstance(color, tuple):
-        blush_color = np.array(color, dtype=np.float32)
-    else:
-        blush_color = np.array(colors.get(color, colors['pink']), dtype=np.float32)
-
-    overlay = np.zeros_like(image, dtype=np.float32)
-    overlay[:] = blush_color
-
-    cheek_mask_3ch = cv2.cvtColor(cheek_masks, cv2.COLOR_GRAY2BGR) / 255.0
+    blush_color = resolve_color(color, BLUSH_COLORS, 'pink')
 
+    if colors is None:
+        colors = ColorView.of(image)
 
-    alpha = min(intensity / 100.0 * 1.0, 1.0)
-    image_float = image.astype(np.float32)
+    blended = makeup_layer(colors, cheek_masks, blush_color, BLUSH_SATURATION_BOOST)
 
-    hsv = cv2.cvtColor(image.astype(np.uint8), cv2.COLOR_BGR2HSV).astype(np.float32)
-    cheek_mask_normalized = cheek_masks / 255.0
-    hsv[:, :, 1] = hsv[:, :, 1] * (1 + 0.2 * cheek_mask_normalized)  
-    hsv[:, :, 1] = np.clip(hsv[:, :, 1], 0, 255)
-    saturated = cv2.cvtColor(hsv.astype(np.uint8), cv2.COLOR_HSV2BGR).astype(np.float32)
+    return composite(image, blended, cheek_masks, blush_alpha(intensity), colors.float32)
 
-    mask_bool = saturated < 128
-    blended = saturated.copy()
-    blended[mask_bool] = (2 * saturated[mask_bool] * overlay[mask_bool]) / 255.0
-    blended[~mask_bool] = 255 - 2 * (255 - saturated[~mask_bool]) * (255 - overlay[~mask_bool]) / 255.0
 
-    result = image_float * (1 - cheek_mask_3ch * alpha) + blended * cheek_mask_3ch * alpha
+register_stage(EffectStage(
+    'lipstick', 30,
+    lambda roi, rect, inputs: apply_lipstick(
+        roi,
+        inputs.mask('lips', rect),
+        inputs.values['lipstick_color'],
+        inputs.values['lipstick'],
+        feathered_mask=inputs.mask('feathered_lips', rect),
+        colors=inputs.colors(rect)
+    ),
+    params={'lipstick': 0, 'lipstick_color': 'red'},
+    intensity='lipstick',
+    masks=('lips', 'feathered_lips'),
+    footprint='feathered_lips',
+    align=True,
+    color_space=True,
+    prepare=lambda roi, rect, inputs: makeup_layer(
+        inputs.colors(rect),
+        inputs.mask('feathered_lips', rect),
+        resolve_color(inputs.values['lipstick_color'], LIPSTICK_COLORS, 'red'),
+        LIPSTICK_SATURATION_BOOST,
+        inputs.buffers
+    ),
+    blend=lambda roi, layer, rect, inputs: composite(
+        roi, layer, inputs.mask('feathered_lips', rect),
+        lipstick_alpha(inputs.values['lipstick']), inputs.colors(rect).float32, inputs.buffers
+    ),
+    memory=88
+))
 
-    return np.clip(result, 0, 255).astype(np.uint8)
+register_stage(EffectStage(
+    'blush', 40,
+    lambda roi, rect, inputs: apply_blush(
+        roi,
+        inputs.mask('cheeks', rect),
+        inputs.values['blush'],
+        inputs.values['blush_color'],
+        colors=inputs.colors(rect)
+    ),
+    params={'blush': 0, 'blush_color': 'pink'},
+    intensity='blush',
+    masks=('cheeks',),
+    footprint='cheeks',
+    align=True,
+    color_space=True,
+    prepare=lambda roi, rect, inputs: makeup_layer(
+        inputs.colors(rect),
+        inputs.mask('cheeks', rect),
+        resolve_color(inputs.values['blush_color'], BLUSH_COLORS, 'pink'),
+        BLUSH_SATURATION_BOOST,
+        inputs.buffers
+    ),
+    blend=lambda roi, layer, rect, inputs: composite(
+        roi, layer, inputs.mask('cheeks', rect),
+        blush_alpha(inputs.values['blush']), inputs.colors(rect).float32, inputs.buffers
+    ),
+    memory=88
+))
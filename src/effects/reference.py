@@ -0,0 +1,176 @@
+"""
+Reference implementations of the effect stages
+
+These are the straightforward full-frame versions the optimized paths
+(ROI tiles, shared color conversions, cached layers, analytic masks) were
+derived from. They are kept unchanged as oracles for
+scripts/check_equivalence.py; do not optimize them.
+"""
+import cv2
+import numpy as np
+from ..utils.config import (
+    BLEMISH_RADIUS, INPAINT_RADIUS, SMOOTHING_MIN_D, SMOOTHING_MAX_D,
+    SMOOTHING_MIN_SIGMA, SMOOTHING_MAX_SIGMA, SHARPEN_MIN_AMOUNT, SHARPEN_MAX_AMOUNT
+)
+from ..utils.constants import LIPSTICK_COLORS, BLUSH_COLORS
+from ..utils.image_utils import feather_mask
+
+
+def remove_blemishes(image, blemish_points, radius=BLEMISH_RADIUS):
+    """Inpaint each spot in turn over the full frame"""
+    result = image.copy()
+    for x, y in blemish_points:
+        mask = np.zeros(result.shape[:2], dtype=np.uint8)
+        cv2.circle(mask, (x, y), radius, 255, -1)
+        result = cv2.inpaint(result, mask, INPAINT_RADIUS, cv2.INPAINT_TELEA)
+    return result
+
+
+def smooth_face(image, face_mask, eye_masks, intensity=50):
+    """Full-frame bilateral filter blended through a feathered face mask"""
+    if intensity == 0:
+        return image
+
+    d = int(SMOOTHING_MIN_D + (intensity / 100) * (SMOOTHING_MAX_D - SMOOTHING_MIN_D))
+    sigma_color = int(SMOOTHING_MIN_SIGMA + (intensity / 100) * (SMOOTHING_MAX_SIGMA - SMOOTHING_MIN_SIGMA))
+    sigma_space = int(SMOOTHING_MIN_SIGMA + (intensity / 100) * (SMOOTHING_MAX_SIGMA - SMOOTHING_MIN_SIGMA))
+
+    smoothed = cv2.bilateralFilter(image, d, sigma_color, sigma_space)
+
+    smooth_mask = cv2.subtract(face_mask, eye_masks)
+    smooth_mask = feather_mask(smooth_mask, kernel_size=15)
+
+    alpha = intensity / 100.0
+    smooth_mask_3ch = cv2.cvtColor(smooth_mask, cv2.COLOR_GRAY2BGR) / 255.0
+
+    result = (smoothed * smooth_mask_3ch * alpha +
+              image * (1 - smooth_mask_3ch * alpha))
+
+    return result.astype(np.uint8)
+
+
+def _overlay(saturated, overlay):
+    """Overlay blend with boolean-indexed halves"""
+    mask_bool = saturated < 128
+    blended = saturated.copy()
+    blended[mask_bool] = (2 * saturated[mask_bool] * overlay[mask_bool]) / 255.0
+    blended[~mask_bool] = 255 - 2 * (255 - saturated[~mask_bool]) * (255 - overlay[~mask_bool]) / 255.0
+    return blended
+
+
+def _saturate(image, mask, boost):
+    """Float HSV round trip scaling saturation under a mask"""
+    hsv = cv2.cvtColor(image.astype(np.uint8), cv2.COLOR_BGR2HSV).astype(np.float32)
+    hsv[:, :, 1] = hsv[:, :, 1] * (1 + boost * mask / 255.0)
+    hsv[:, :, 1] = np.clip(hsv[:, :, 1], 0, 255)
+    return cv2.cvtColor(hsv.astype(np.uint8), cv2.COLOR_HSV2BGR).astype(np.float32)
+
+
+def _color(color, palette, default):
+    """Color name or (B,G,R) tuple as a float32 vector"""
+    if isinstance(color, tuple):
+        return np.array(color, dtype=np.float32)
+    return np.array(palette.get(color, palette[default]), dtype=np.float32)
+
+
+def apply_lipstick(image, lip_mask, color='red', intensity=50):
+    """Full-frame lipstick: feather, saturate, overlay, composite"""
+    if intensity == 0:
+        return image
+
+    lip_color = _color(color, LIPSTICK_COLORS, 'red')
+    lip_mask_feathered = feather_mask(lip_mask, kernel_size=5)
+    lip_mask_3ch = cv2.cvtColor(lip_mask_feathered, cv2.COLOR_GRAY2BGR) / 255.0
+
+    image_float = image.astype(np.float32)
+    alpha = min(intensity / 100.0 * 1.5, 1.0)
+
+    saturated = _saturate(image, lip_mask_feathered, 0.3)
+    overlay = np.zeros_like(image_float)
+    overlay[:] = lip_color
+    blended = _overlay(saturated, overlay)
+
+    result = image_float * (1 - lip_mask_3ch * alpha) + blended * lip_mask_3ch * alpha
+    return np.clip(result, 0, 255).astype(np.uint8)
+
+
+def apply_blush(image, cheek_masks, intensity=50, color='pink'):
+    """Full-frame blush: saturate, overlay, composite"""
+    if intensity == 0:
+        return image
+
+    overlay = np.zeros_like(image, dtype=np.float32)
+    overlay[:] = _color(color, BLUSH_COLORS, 'pink')
+    cheek_mask_3ch = cv2.cvtColor(cheek_masks, cv2.COLOR_GRAY2BGR) / 255.0
+
+    alpha = min(intensity / 100.0 * 1.0, 1.0)
+    image_float = image.astype(np.float32)
+
+    saturated = _saturate(image, cheek_masks, 0.2)
+    blended = _overlay(saturated, overlay)
+
+    result = image_float * (1 - cheek_mask_3ch * alpha) + blended * cheek_mask_3ch * alpha
+    return np.clip(result, 0, 255).astype(np.uint8)
+
+
+def sharpen_region(image, region_mask, intensity=50):
+    """Full-frame unsharp mask blended through a region mask"""
+    if intensity == 0:
+        return image
+
+    blurred = cv2.GaussianBlur(image, (0, 0), 3)
+
+    amount = SHARPEN_MIN_AMOUNT + (intensity / 100.0) * (SHARPEN_MAX_AMOUNT - SHARPEN_MIN_AMOUNT)
+    sharpened = cv2.addWeighted(image, 1 + amount, blurred, -amount, 0)
+
+    region_mask_3ch = cv2.cvtColor(region_mask, cv2.COLOR_GRAY2BGR) / 255.0
+    result = (sharpened * region_mask_3ch +
+              image * (1 - region_mask_3ch))
+
+    return result.astype(np.uint8)
+
+
+def cheek_mask(shape, cheeks, kernel_size=51, sigma=30):
+    """
+    Filled cheek ellipses blurred over the full frame
+
+    Args:
+        shape: Image shape
+        cheeks: List of (center, (radius_h, radius_v))
+        kernel_size: Gaussian kernel size
+        sigma: Gaussian sigma
+    """
+    mask = np.zeros(shape[:2], dtype=np.uint8)
+    for center, axes in cheeks:
+        cv2.ellipse(mask, center, axes, 0, 0, 360, 255, -1)
+    return cv2.GaussianBlur(mask, (kernel_size, kernel_size), sigma)
+
+
+def render(image_manager, slider_values):
+    """
+    The whole pipeline, one stage after another on the full frame
+
+    Args:
+        image_manager: ImageManager with original image, face data and
+            blemish points
+        slider_values: Slider dictionary (see filters.apply_all_effects)
+
+    Returns:
+        Rendered image
+    """
+    from .sharpening import create_eyebrow_eyelash_mask
+
+    masks = image_manager.face_masks
+    img = image_manager.get_original()
+
+    if image_manager.blemish_points:
+        img = remove_blemishes(img, image_manager.blemish_points)
+    img = smooth_face(img, masks['face'], masks['eyes'], slider_values.get('smoothing', 0))
+    img = apply_lipstick(img, masks['lips'], slider_values.get('lipstick_color', 'red'),
+                         slider_values.get('lipstick', 0))
+    img = apply_blush(img, masks['cheeks'], slider_values.get('blush', 0),
+                      slider_values.get('blush_color', 'pink'))
+    if slider_values.get('sharpening', 0) > 0:
+        img = sharpen_region(img, create_eyebrow_eyelash_mask(image_manager.face_landmarks, img.shape),
+                             slider_values['sharpening'])
+    return img
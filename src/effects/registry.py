@@ -0,0 +1,146 @@
+"""
+Declarative registry of effect stages
+
+Each effect module registers an EffectStage describing what the pipeline
+needs to know to schedule it without special cases: its slider parameters,
+the masks it reads, the pixels it can change (footprint) and how far
+around them it reads (halo), and whether its intensity only controls a
+final blend. processing.graph builds the render graph from these
+declarations.
+"""
+
+STAGES = {}
+MASK_BUILDERS = {}
+
+DEFAULT_STAGE_MEMORY = 64  # Bytes per read pixel when a stage does not say
+
+
+class EffectStage:
+    """Declaration of one effect stage"""
+
+    def __init__(self, name, order, run, params=None, intensity=None, masks=(),
+                 footprint=None, halo=0, align=False, color_space=False,
+                 prepare=None, blend=None, memory=DEFAULT_STAGE_MEMORY, tileable=True, tile_params=None):
+        """
+        Describe a stage
+
+        Args:
+            name: Stage name
+            order: Position in the pipeline (lower runs first)
+            run: run(roi, rect, inputs) -> processed ROI; rect is the ROI's
+                position in the full frame and inputs a graph.StageInputs
+            params: Slider parameters and their defaults, e.g.
+                {'lipstick': 0, 'lipstick_color': 'red'}
+            intensity: Parameter that turns the stage off at 0 (None: the
+                stage decides through its footprint, e.g. blemish points)
+            masks: Names of the masks the stage reads
+            footprint: Name of the mask whose non-zero pixels are the only
+                ones the stage changes, or footprint(inputs, shape) returning
+                a list of rectangles; None means the whole image
+            halo: Pixels beyond the footprint the stage reads, or
+                halo(values) when it depends on the parameters
+            align: Keep ROIs on the 64-column grid (bit-exact color
+                conversions, see regions.align_rect)
+            color_space: Stage reads inputs.colors(rect) (shared ColorContext)
+            prepare: For intensity-linear stages, prepare(roi, rect, inputs)
+                returning a layer that does not depend on the intensity
+            blend: blend(roi, layer, rect, inputs) mixing the layer in at the
+                current intensity; run must equal blend(prepare(...))
+            memory: Peak bytes the stage allocates per pixel of a tile's
+                read area (see processing.memory)
+            tileable: Footprint rectangles may be cut into smaller tiles
+                with the same result (needs an exact halo)
+            tile_params: tile_params(values, rect) returning the part of
+                the parameters a tile reading rect depends on, for stages
+                without prepare/blend; when the parameters change, tiles
+                whose part did not keep their cached output
+        """
+        self.name = name
+        self.order = order
+        self.run = run
+        self.params = dict(params or {})
+        self.intensity = intensity
+        self.masks = tuple(masks)
+        self.footprint = footprint
+        self.halo = halo
+        self.align = align
+        self.color_space = color_space
+        self.prepare = prepare
+        self.blend = blend
+        self.memory = memory
+        self.tileable = tileable
+        self.tile_params = tile_params
+
+    @property
+    def intensity_linear(self):
+        """True if the intensity only weights a cacheable layer"""
+        return self.prepare is not None and self.blend is not None
+
+    def values(self, slider_values):
+        """
+        This stage's parameters from a slider dictionary, with defaults
+
+        Returns:
+            Dictionary of parameter values
+        """
+        return {key: slider_values.get(key, default) for key, default in self.params.items()}
+
+    def is_noop(self, slider_values):
+        """True if the intensity parameter is zero"""
+        return self.intensity is not None and slider_values.get(self.intensity, 0) <= 0
+
+    def halo_for(self, slider_values):
+        """Halo in pixels for the given parameters"""
+        return self.halo(self.values(slider_values)) if callable(self.halo) else self.halo
+
+
+def register_stage(stage):
+    """
+    Add a stage to the registry
+
+    Args:
+        stage: EffectStage
+
+    Returns:
+        The stage
+    """
+    STAGES[stage.name] = stage
+    return stage
+
+
+def register_mask(name, builder):
+    """
+    Register a mask built from landmarks on demand
+
+    Args:
+        name: Mask name stages can list in masks/footprint
+        builder: builder(landmarks, shape) returning a uint8 mask
+    """
+    MASK_BUILDERS[name] = builder
+
+
+def registered_stages():
+    """
+    All stages in pipeline order
+
+    Importing the effect modules registers their stages.
+
+    Returns:
+        List of EffectStage
+    """
+    from . import blemish_removal, smoothing, makeup, sharpening  # noqa: F401
+
+    return sorted(STAGES.values(), key=lambda stage: stage.order)
+
+
+def default_values():
+    """
+    Default slider values of every registered parameter
+
+    Returns:
+        Dictionary of parameter -> default
+    """
+    values = {}
+    for stage in registered_stages():
+        values.update(stage.params)
+    return values
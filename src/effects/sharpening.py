@@ -5,6 +5,12 @@ import cv2
 import numpy as np
 from ..utils.constants import LEFT_EYEBROW_INDICES, RIGHT_EYEBROW_INDICES
 from ..utils.config import SHARPEN_MIN_AMOUNT, SHARPEN_MAX_AMOUNT
+from ..utils.buffers import NO_ARENA
+from ..utils.image_utils import float_mask_3ch
+from ..utils.regions import gaussian_halo
+from .registry import EffectStage, register_stage, register_mask
+
+SHARPEN_BLUR_SIGMA = 3
 
 
 def sharpen_region(image, region_mask, intensity=50):
@@ -22,16 +28,52 @@ def sharpen_region(image, region_mask, intensity=50):
     if intensity == 0:
         return image
 
-    blurred = cv2.GaussianBlur(image, (0, 0), 3)
+    return sharpen_blend(image, sharpen_layer(image), region_mask, intensity)
+
+
+def sharpen_layer(image, buffers=NO_ARENA):
+    """
+    Blurred copy used by unsharp masking (independent of intensity)
+
+    Args:
+        image: Input image (BGR)
+        buffers: BufferArena to borrow the result from
+
+    Returns:
+        Blurred image
+    """
+    return cv2.GaussianBlur(image, (0, 0), SHARPEN_BLUR_SIGMA, dst=buffers.like(image))
+
+
+def sharpen_blend(image, blurred, region_mask, intensity, buffers=NO_ARENA):
+    """
+    Unsharp-mask an image inside a region given its blurred copy
+
+    Args:
+        image: Input image (BGR)
+        blurred: sharpen_layer(image)
+        region_mask: Binary mask of region to sharpen
+        intensity: 0-100
+        buffers: BufferArena for temporaries and the result
 
+    Returns:
+        Sharpened image
+    """
     amount = SHARPEN_MIN_AMOUNT + (intensity / 100.0) * (SHARPEN_MAX_AMOUNT - SHARPEN_MIN_AMOUNT)
-    sharpened = cv2.addWeighted(image, 1 + amount, blurred, -amount, 0)
+    sharpened = cv2.addWeighted(image, 1 + amount, blurred, -amount, 0, dst=buffers.like(image))
 
-    region_mask_3ch = cv2.cvtColor(region_mask, cv2.COLOR_GRAY2BGR) / 255.0
-    result = (sharpened * region_mask_3ch +
-              image * (1 - region_mask_3ch))
+    # sharpened * mask + image * (1 - mask)
+    region_mask_3ch = float_mask_3ch(region_mask, buffers)
+    kept = buffers.like(image, np.float64)
+    np.subtract(1, region_mask_3ch, out=kept)
+    np.multiply(image, kept, out=kept)
+    np.multiply(sharpened, region_mask_3ch, out=region_mask_3ch)
+    region_mask_3ch += kept
 
-    return result.astype(np.uint8)
+    result = buffers.like(image)
+    np.copyto(result, region_mask_3ch, casting='unsafe')
+    buffers.give(sharpened, region_mask_3ch, kept)
+    return result
 
 
 def create_eyebrow_eyelash_mask(landmarks, shape):
@@ -57,3 +99,24 @@ def create_eyebrow_eyelash_mask(landmarks, shape):
     mask = cv2.dilate(mask, kernel, iterations=1)
 
     return mask
+
+
+def _sharpen_blend_stage(roi, layer, rect, inputs):
+    """Stage blend: unsharp mask at the current intensity"""
+    return sharpen_blend(roi, layer, inputs.mask('brows', rect), inputs.values['sharpening'], inputs.buffers)
+
+
+register_mask('brows', create_eyebrow_eyelash_mask)
+
+register_stage(EffectStage(
+    'sharpening', 50,
+    lambda roi, rect, inputs: sharpen_region(roi, inputs.mask('brows', rect), inputs.values['sharpening']),
+    params={'sharpening': 0},
+    intensity='sharpening',
+    masks=('brows',),
+    footprint='brows',
+    halo=gaussian_halo(SHARPEN_BLUR_SIGMA),
+    prepare=lambda roi, rect, inputs: sharpen_layer(roi, inputs.buffers),
+    blend=_sharpen_blend_stage,
+    memory=80
+))
@@ -4,10 +4,28 @@ Face smoothing using bilateral filter
 import cv2
 import numpy as np
 from ..utils.config import SMOOTHING_MIN_D, SMOOTHING_MAX_D, SMOOTHING_MIN_SIGMA, SMOOTHING_MAX_SIGMA
-from ..utils.image_utils import feather_mask
+from ..utils.buffers import NO_ARENA
+from ..utils.image_utils import feather_mask, float_mask_3ch
+from .registry import EffectStage, register_stage
 
 
-def smooth_face(image, face_mask, eye_masks, intensity=50):
+def smoothing_params(intensity):
+    """
+    Bilateral filter parameters for an intensity
+
+    Args:
+        intensity: 0-100
+
+    Returns:
+        (d, sigma_color, sigma_space)
+    """
+    d = int(SMOOTHING_MIN_D + (intensity / 100) * (SMOOTHING_MAX_D - SMOOTHING_MIN_D))
+    sigma_color = int(SMOOTHING_MIN_SIGMA + (intensity / 100) * (SMOOTHING_MAX_SIGMA - SMOOTHING_MIN_SIGMA))
+    sigma_space = int(SMOOTHING_MIN_SIGMA + (intensity / 100) * (SMOOTHING_MAX_SIGMA - SMOOTHING_MIN_SIGMA))
+    return d, sigma_color, sigma_space
+
+
+def smooth_face(image, face_mask, eye_masks, intensity=50, smooth_mask=None, buffers=NO_ARENA):
     """
     Apply bilateral filter smoothing to face, preserving eyes
 
@@ -16,6 +34,10 @@ def smooth_face(image, face_mask, eye_masks, intensity=50):
         face_mask: Binary mask of face region
         eye_masks: Binary mask of eye regions to preserve
         intensity: 0-100, controls smoothing strength
+        smooth_mask: Precomputed feathered (face - eyes) mask; derived from
+            face_mask and eye_masks when None
+        buffers: BufferArena for the filtered copy, blend temporaries and
+            the result
 
     Returns:
         Smoothed image
@@ -23,19 +45,71 @@ def smooth_face(image, face_mask, eye_masks, intensity=50):
     if intensity == 0:
         return image
 
-    d = int(SMOOTHING_MIN_D + (intensity / 100) * (SMOOTHING_MAX_D - SMOOTHING_MIN_D))
-    sigma_color = int(SMOOTHING_MIN_SIGMA + (intensity / 100) * (SMOOTHING_MAX_SIGMA - SMOOTHING_MIN_SIGMA))
-    sigma_space = int(SMOOTHING_MIN_SIGMA + (intensity / 100) * (SMOOTHING_MAX_SIGMA - SMOOTHING_MIN_SIGMA))
+    d, sigma_color, sigma_space = smoothing_params(intensity)
 
-    smoothed = cv2.bilateralFilter(image, d, sigma_color, sigma_space)
+    smoothed = cv2.bilateralFilter(image, d, sigma_color, sigma_space, dst=buffers.like(image))
 
-    smooth_mask = cv2.subtract(face_mask, eye_masks)
-    smooth_mask = feather_mask(smooth_mask, kernel_size=15)
+    if smooth_mask is None:
+        smooth_mask = cv2.subtract(face_mask, eye_masks)
+        smooth_mask = feather_mask(smooth_mask, kernel_size=15)
 
+    result = smoothing_blend(image, smoothed, smooth_mask, intensity, buffers)
+    buffers.give(smoothed)
+    return result
+
+
+def smoothing_blend(image, smoothed, smooth_mask, intensity, buffers=NO_ARENA):
+    """
+    Mix a bilateral-filtered copy into the image through the face mask
+
+    Pixel-wise, so a batch of images stacked into one array blends in a
+    single call.
+
+    Args:
+        image: Input image (BGR)
+        smoothed: Bilateral-filtered image
+        smooth_mask: Feathered (face - eyes) mask
+        intensity: 0-100
+        buffers: BufferArena for temporaries and the result
+
+    Returns:
+        Smoothed image
+    """
     alpha = intensity / 100.0
-    smooth_mask_3ch = cv2.cvtColor(smooth_mask, cv2.COLOR_GRAY2BGR) / 255.0
+    smooth_mask_3ch = float_mask_3ch(smooth_mask, buffers)
+
+    # smoothed * mask * alpha + image * (1 - mask * alpha), operation by
+    # operation in the same order, in borrowed float64 buffers
+    blend = buffers.like(image, np.float64)
+    np.multiply(smoothed, smooth_mask_3ch, out=blend)
+    blend *= alpha
+    np.multiply(smooth_mask_3ch, alpha, out=smooth_mask_3ch)
+    np.subtract(1, smooth_mask_3ch, out=smooth_mask_3ch)
+    np.multiply(image, smooth_mask_3ch, out=smooth_mask_3ch)
+    blend += smooth_mask_3ch
+
+    result = buffers.like(image)
+    np.copyto(result, blend, casting='unsafe')
+    buffers.give(smooth_mask_3ch, blend)
+    return result
 
-    result = (smoothed * smooth_mask_3ch * alpha +
-              image * (1 - smooth_mask_3ch * alpha))
 
-    return result.astype(np.uint8)
+register_stage(EffectStage(
+    'smoothing', 20,
+    lambda roi, rect, inputs: smooth_face(
+        roi,
+        inputs.mask('face', rect),
+        inputs.mask('eyes', rect),
+        inputs.values['smoothing'],
+        smooth_mask=inputs.mask('feathered_smooth', rect),
+        buffers=inputs.buffers
+    ),
+    params={'smoothing': 0},
+    intensity='smoothing',
+    masks=('face', 'eyes', 'feathered_smooth'),
+    footprint='feathered_smooth',
+    # Bilateral filter reads d // 2 pixels around each output pixel
+    halo=lambda values: smoothing_params(values['smoothing'])[0] // 2 + 1,
+    # Float64 three-channel mask and blend temporaries dominate
+    memory=104
+))
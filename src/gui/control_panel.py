@@ -3,6 +3,7 @@ Control panel with sliders and buttons
 """
 import tkinter as tk
 from ..utils.config import SLIDER_MIN, SLIDER_MAX, SLIDER_DEFAULT
+from ..utils.constants import LIPSTICK_COLORS, BLUSH_COLORS
 
 
 class ControlPanel:
@@ -96,7 +97,7 @@ class ControlPanel:
         ).grid(row=1, column=1, padx=(10, 5), sticky='e')
 
         self.lipstick_color = tk.StringVar(value='red')
-        colors = ['red', 'pink', 'coral', 'berry', 'nude', 'wine', 'orange', 'mauve']
+        colors = list(LIPSTICK_COLORS)
         lipstick_menu = tk.OptionMenu(controls_grid, self.lipstick_color, *colors, command=lambda v: self.callback())
         lipstick_menu.config(
             width=8,
@@ -127,7 +128,7 @@ class ControlPanel:
         ).grid(row=2, column=1, padx=(10, 5), sticky='e')
 
         self.blush_color = tk.StringVar(value='pink')
-        blush_colors = ['pink', 'peach', 'coral', 'rose', 'bronze', 'mauve']
+        blush_colors = list(BLUSH_COLORS)
         blush_menu = tk.OptionMenu(controls_grid, self.blush_color, *blush_colors, command=lambda v: self.callback())
         blush_menu.config(
             width=8,
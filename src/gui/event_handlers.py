@@ -1,6 +1,7 @@
 """
 Mouse event handlers for interactive tools
 """
+from ..utils.config import VIEW_ZOOM_STEP
 
 
 class EventHandlers:
@@ -19,6 +20,17 @@ class EventHandlers:
 
         canvas.after_canvas.bind('<Button-1>', self.on_canvas_click)
 
+        # Wheel zooms, right or middle drag pans, right double-click fits
+        self._drag_start = None
+        for widget in (canvas.before_canvas, canvas.after_canvas):
+            widget.bind('<MouseWheel>', self.on_wheel)
+            widget.bind('<Button-4>', self.on_wheel)  # X11 wheel up
+            widget.bind('<Button-5>', self.on_wheel)  # X11 wheel down
+            for button in (2, 3):
+                widget.bind(f'<ButtonPress-{button}>', self.on_drag_start)
+                widget.bind(f'<B{button}-Motion>', self.on_drag)
+            widget.bind('<Double-Button-3>', lambda event: canvas.fit())
+
     def on_canvas_click(self, event):
         """
         Handle click on after canvas for blemish removal
@@ -30,3 +42,31 @@ class EventHandlers:
         canvas_y = event.y
 
         self.callback(canvas_x, canvas_y)
+
+    def on_wheel(self, event):
+        """
+        Zoom around the cursor
+
+        Args:
+            event: Tkinter event object
+        """
+        zoom_in = event.num == 4 or getattr(event, 'delta', 0) > 0
+        factor = VIEW_ZOOM_STEP if zoom_in else 1.0 / VIEW_ZOOM_STEP
+        self.canvas.zoom_at(factor, event.x, event.y)
+
+    def on_drag_start(self, event):
+        """Remember where a pan drag started"""
+        self._drag_start = (event.x, event.y)
+
+    def on_drag(self, event):
+        """
+        Pan by the distance dragged since the last motion event
+
+        Args:
+            event: Tkinter event object
+        """
+        if self._drag_start is None:
+            return
+        last_x, last_y = self._drag_start
+        self._drag_start = (event.x, event.y)
+        self.canvas.pan(event.x - last_x, event.y - last_y)
@@ -0,0 +1,233 @@
+"""
+Folder browser panel with lazily decoded thumbnails
+"""
+import math
+import os
+import tkinter as tk
+
+from ..utils.config import THUMBNAIL_SIZE, THUMBNAIL_THREADS, GALLERY_COLUMNS
+
+CELL_PADDING = 8
+LABEL_HEIGHT = 16
+POLL_MS = 30
+
+
+class GalleryPanel:
+    """
+    Scrollable thumbnail grid of the images in one folder
+
+    Only the rows in view have canvas items; thumbnails are requested from
+    the ThumbnailLoader as they scroll into view and queued decodes are
+    dropped when they scroll out, so folders with thousands of files scroll
+    as smoothly as small ones.
+    """
+
+    def __init__(self, parent, on_open, columns=GALLERY_COLUMNS, threads=THUMBNAIL_THREADS):
+        """
+        Build the panel (not packed)
+
+        Args:
+            parent: Parent Tkinter widget
+            on_open: Callback(path) when a thumbnail is clicked
+            columns: Thumbnails per row
+            threads: Thumbnail decode threads
+        """
+        from ..utils.thumbnails import ThumbnailLoader
+
+        bg_color = '#F8F5FA'         # Very light lavender background
+        label_bg = '#E8D5F2'         # Light lavender for labels
+        text_color = '#6B5B7E'       # Deep purple-gray
+        border_color = '#D4B8E8'     # Medium purple for borders
+
+        self.on_open = on_open
+        self.columns = columns
+        self.cell_w = THUMBNAIL_SIZE + CELL_PADDING
+        self.cell_h = THUMBNAIL_SIZE + LABEL_HEIGHT + CELL_PADDING
+        self.text_color = text_color
+        self.border_color = border_color
+
+        self.loader = ThumbnailLoader(threads=threads)
+        self.paths = []
+        self._index = {}  # Path -> position
+        self.selected = None
+        self._items = {}  # Index -> (frame id, image id, PhotoImage or None)
+        self._polling = False
+
+        self.frame = tk.Frame(parent, bg=label_bg, relief='groove', bd=3,
+                              highlightbackground=border_color, highlightthickness=2)
+
+        self.title = tk.Label(self.frame, text='🗂 FOLDER', font=('Segoe UI', 10, 'bold'),
+                              bg=label_bg, fg=text_color, pady=6)
+        self.title.pack(side='top', fill='x')
+
+        self.scrollbar = tk.Scrollbar(self.frame, orient='vertical')
+        self.scrollbar.pack(side='right', fill='y')
+
+        self.canvas = tk.Canvas(self.frame, width=self.cell_w * columns, bg=bg_color,
+                                highlightthickness=0, yscrollcommand=self._on_yscroll,
+                                yscrollincrement=self.cell_h // 2)
+        self.canvas.pack(side='left', fill='y', expand=True)
+        self.scrollbar.config(command=self.canvas.yview)
+
+        self.canvas.bind('<Configure>', lambda event: self._refresh())
+        self.canvas.bind('<Button-1>', self._on_click)
+        self.canvas.bind('<MouseWheel>', self._on_wheel)
+        self.canvas.bind('<Button-4>', self._on_wheel)  # X11 wheel up
+        self.canvas.bind('<Button-5>', self._on_wheel)  # X11 wheel down
+
+        toplevel = parent.winfo_toplevel()
+        toplevel.bind('<Next>', lambda event: self.open_offset(1))  # Page Down
+        toplevel.bind('<Prior>', lambda event: self.open_offset(-1))  # Page Up
+
+    def set_folder(self, directory):
+        """
+        Show the images of a folder
+
+        Args:
+            directory: Folder path
+        """
+        from ..utils.thumbnails import list_images
+
+        self.loader.cancel_all()
+        self.canvas.delete('all')
+        self._items.clear()
+
+        self.paths = list_images(directory)
+        self._index = {path: i for i, path in enumerate(self.paths)}
+        self.selected = None
+        self.title.config(text=f"🗂 {os.path.basename(os.path.normpath(directory))} ({len(self.paths)})")
+
+        rows = math.ceil(len(self.paths) / self.columns)
+        self.canvas.config(scrollregion=(0, 0, self.cell_w * self.columns, rows * self.cell_h))
+        self.canvas.yview_moveto(0)
+        self._refresh()
+
+    def _on_yscroll(self, first, last):
+        """Scrollbar update; also the hook for every change of the view"""
+        self.scrollbar.set(first, last)
+        self._refresh()
+
+    def _on_wheel(self, event):
+        """Scroll by rows"""
+        up = event.num == 4 or getattr(event, 'delta', 0) > 0
+        self.canvas.yview_scroll(-1 if up else 1, 'units')
+
+    def _visible_range(self):
+        """Indices of the thumbnails in (or one row around) the view"""
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        first_row = max(0, int(top // self.cell_h) - 1)
+        last_row = int(bottom // self.cell_h) + 1
+        return range(first_row * self.columns, min(len(self.paths), (last_row + 1) * self.columns))
+
+    def _refresh(self):
+        """Draw cells scrolling into view and drop the ones leaving it"""
+        visible = self._visible_range()
+
+        for index in [i for i in self._items if i not in visible]:
+            frame_id, image_id, _ = self._items.pop(index)
+            self.canvas.delete(frame_id, image_id, f"label{index}")
+            self.loader.cancel(self.paths[index])
+
+        for index in visible:
+            if index not in self._items:
+                self._draw_cell(index)
+
+        if self.loader.busy and not self._polling:
+            self._polling = True
+            self.canvas.after(POLL_MS, self._poll)
+
+    def _draw_cell(self, index):
+        """Placeholder frame and label; the image comes from the cache or later"""
+        x = (index % self.columns) * self.cell_w + CELL_PADDING // 2
+        y = (index // self.columns) * self.cell_h + CELL_PADDING // 2
+        outline = '#B8A4D4' if index == self.selected else self.border_color
+        frame_id = self.canvas.create_rectangle(x, y, x + THUMBNAIL_SIZE, y + THUMBNAIL_SIZE,
+                                                outline=outline, width=2 if index == self.selected else 1)
+        self.canvas.create_text(x + THUMBNAIL_SIZE // 2, y + THUMBNAIL_SIZE + LABEL_HEIGHT // 2,
+                                text=os.path.basename(self.paths[index])[:16], fill=self.text_color,
+                                font=('Segoe UI', 8), tags=(f"label{index}",))
+        image_id = self.canvas.create_image(x + THUMBNAIL_SIZE // 2, y + THUMBNAIL_SIZE // 2, anchor='center')
+        self._items[index] = (frame_id, image_id, None)
+
+        thumbnail = self.loader.request(self.paths[index])
+        if thumbnail is not None:
+            self._show(index, thumbnail)
+
+    def _show(self, index, thumbnail):
+        """Put a decoded thumbnail into its cell"""
+        from .photo import cv2_to_photoimage
+
+        frame_id, image_id, _ = self._items[index]
+        h, w = thumbnail.shape[:2]
+        photo = cv2_to_photoimage(thumbnail, w, h)
+        self.canvas.itemconfig(image_id, image=photo)
+        self._items[index] = (frame_id, image_id, photo)  # Keep reference
+
+    def _poll(self):
+        """Collect finished decodes on the Tk thread"""
+        for path, thumbnail in self.loader.drain():
+            index = self._index.get(path)
+            if thumbnail is not None and index in self._items:
+                self._show(index, thumbnail)
+
+        if self.loader.busy:
+            self.canvas.after(POLL_MS, self._poll)
+        else:
+            self._polling = False
+
+    def _on_click(self, event):
+        """Open the clicked thumbnail"""
+        x, y = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
+        column, row = int(x // self.cell_w), int(y // self.cell_h)
+        index = row * self.columns + column
+        if column < self.columns and 0 <= index < len(self.paths):
+            self.select(index)
+
+    def select(self, index):
+        """
+        Highlight a thumbnail, open its image and prefetch the next one
+
+        Args:
+            index: Position in the folder
+        """
+        previous, self.selected = self.selected, index
+        for i in (previous, index):
+            if i in self._items:
+                self.canvas.itemconfig(self._items[i][0], outline='#B8A4D4' if i == index else self.border_color,
+                                       width=2 if i == index else 1)
+
+        # Keep the selection in view
+        top, bottom = self.canvas.canvasy(0), self.canvas.canvasy(self.canvas.winfo_height())
+        rows = math.ceil(len(self.paths) / self.columns)
+        y = (index // self.columns) * self.cell_h
+        if y < top or y + self.cell_h > bottom:
+            self.canvas.yview_moveto(y / max(1, rows * self.cell_h))
+
+        self.on_open(self.paths[index])
+        if index + 1 < len(self.paths):
+            self.loader.prefetch(self.paths[index + 1])
+
+    def open_offset(self, step):
+        """Open the next (step 1) or previous (step -1) image"""
+        if not self.paths:
+            return
+        index = 0 if self.selected is None else max(0, min(len(self.paths) - 1, self.selected + step))
+        if index != self.selected:
+            self.select(index)
+
+    def take_prefetched(self, path):
+        """
+        Prefetched decode of an image, if there is one
+
+        Args:
+            path: Image file being opened
+
+        Returns:
+            Future resolving to the BGR image, or None
+        """
+        return self.loader.take_prefetched(path)
+
+    def close(self):
+        """Stop decoding"""
+        self.loader.close()
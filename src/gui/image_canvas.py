@@ -2,8 +2,13 @@
 Canvas for displaying before/after images
 """
 import tkinter as tk
-from ..utils.config import CANVAS_WIDTH, CANVAS_HEIGHT
-from ..utils.image_utils import cv2_to_photoimage
+from ..utils.config import CANVAS_WIDTH, CANVAS_HEIGHT, CANVAS_PATCH_LIMIT
+from ..utils.regions import intersect_rect
+from .viewport import Viewport
+
+# Tag for items drawn over the after image (e.g. click markers); they are
+# cleared whenever the after image is refreshed
+OVERLAY_TAG = 'overlay'
 
 
 class ImageCanvas:
@@ -78,35 +83,129 @@ class ImageCanvas:
         )
         self.after_canvas.pack()
 
-    def display_images(self, before_img, after_img):
+        # Both canvases show the same part of the image
+        self.viewport = Viewport(CANVAS_WIDTH, CANVAS_HEIGHT)
+        self.before_pyramid = None
+        self.after_pyramid = None
+        self._drawn = None  # (level, placement) of the last redraw
+        self._patches = []  # PhotoImages drawn over the after image since then
+
+    def display_images(self, before_img, after_img, after_changed=None):
         """
         Display before and after images
 
         Args:
             before_img: OpenCV BGR image (before)
             after_img: OpenCV BGR image (after)
+            after_changed: Rectangles outside which after_img equals the
+                previously displayed one (None: redraw everything)
+        """
+        # Imported here so the window can open before OpenCV/PIL are loaded
+        from ..utils.pyramid import ImagePyramid
+
+        if self.before_pyramid is None:
+            self.before_pyramid = ImagePyramid()
+            self.after_pyramid = ImagePyramid()
+
+        if before_img is not self.before_pyramid.image:
+            self.before_pyramid.update(before_img)
+            after_changed = None
+        self.after_pyramid.update(after_img, after_changed)
+
+        img_h, img_w = before_img.shape[:2]
+        self.viewport.set_image_size(img_w, img_h)
+        if after_changed is not None and self._drawn is not None and self._drawn == self._view():
+            self._patch_after(after_changed)
+        else:
+            self.redraw()
+
+    def _view(self):
+        """(level, placement) the canvases show at the current zoom"""
+        level = self.before_pyramid.level_for(self.viewport.zoom)
+        return level, self.viewport.placement(level)
+
+    def _patch_after(self, rects):
         """
-        before_photo = cv2_to_photoimage(before_img, CANVAS_WIDTH, CANVAS_HEIGHT)
-        after_photo = cv2_to_photoimage(after_img, CANVAS_WIDTH, CANVAS_HEIGHT)
+        Refresh only the parts of the after canvas over changed rectangles
 
-        self.before_canvas.delete('all')
-        self.after_canvas.delete('all')
+        Each visible changed area is drawn as a small PhotoImage over the
+        last full redraw, so a local edit costs a few thousand pixels
+        instead of the whole view.
 
-        self.before_canvas.create_image(
-            CANVAS_WIDTH // 2,
-            CANVAS_HEIGHT // 2,
-            image=before_photo
-        )
-        self.after_canvas.create_image(
-            CANVAS_WIDTH // 2,
-            CANVAS_HEIGHT // 2,
-            image=after_photo
-        )
+        Args:
+            rects: Changed rectangles in image pixels
+        """
+        from .photo import view_to_photoimage
+
+        self.after_canvas.delete(OVERLAY_TAG)
+        level, ((lx0, ly0, lx1, ly1), (x, y, width, height)) = self._drawn
+        scale = 1 << level
+        for x0, y0, x1, y1 in rects:
+            part = intersect_rect((x0 // scale, y0 // scale, -(-x1 // scale), -(-y1 // scale)),
+                                  (lx0, ly0, lx1, ly1))
+            if part is None:
+                continue
+            # Canvas pixels of the part, on the same grid as the full view
+            left = x + round((part[0] - lx0) * width / (lx1 - lx0))
+            top = y + round((part[1] - ly0) * height / (ly1 - ly0))
+            right = x + round((part[2] - lx0) * width / (lx1 - lx0))
+            bottom = y + round((part[3] - ly0) * height / (ly1 - ly0))
+            if right <= left or bottom <= top:
+                continue
+            photo = view_to_photoimage(self.after_pyramid.region(level, part), right - left, bottom - top)
+            self.after_canvas.create_image(left, top, image=photo, anchor='nw')
+            self._patches.append(photo)
+
+        if len(self._patches) > CANVAS_PATCH_LIMIT:
+            self.redraw()
+
+    def redraw(self):
+        """Repaint both canvases from the pyramids at the current zoom"""
+        from .photo import view_to_photoimage
 
-        self.before_canvas.image = before_photo
-        self.after_canvas.image = after_photo
+        self.before_canvas.delete('all')
+        self.after_canvas.delete('all')
+        self._drawn = None
+        self._patches = []
+        if self.before_pyramid is None:
+            return
+
+        level, placement = self._view()
+        if placement is None:
+            return
+        rect, (x, y, width, height) = placement
+        self._drawn = (level, placement)
+
+        for canvas, pyramid in ((self.before_canvas, self.before_pyramid),
+                                (self.after_canvas, self.after_pyramid)):
+            photo = view_to_photoimage(pyramid.region(level, rect), width, height)
+            canvas.create_image(x, y, image=photo, anchor='nw')
+            canvas.image = photo
+
+    def zoom_at(self, factor, canvas_x, canvas_y):
+        """Zoom both canvases around a canvas point"""
+        if self.before_pyramid is None:
+            return
+        self.viewport.zoom_at(factor, canvas_x, canvas_y)
+        self.redraw()
+
+    def pan(self, dx, dy):
+        """Drag both canvases by a canvas-pixel offset"""
+        if self.before_pyramid is None:
+            return
+        self.viewport.pan(dx, dy)
+        self.redraw()
+
+    def fit(self):
+        """Show the whole image again"""
+        if self.before_pyramid is None:
+            return
+        self.viewport.fit()
+        self.redraw()
 
     def clear(self):
         """Clear both canvases"""
         self.before_canvas.delete('all')
         self.after_canvas.delete('all')
+        self._drawn = None
+        self._patches = []
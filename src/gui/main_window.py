@@ -1,20 +1,20 @@
 """
 Main application window and controller
 """
+import os
+import threading
+import time
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import filedialog, messagebox
-import cv2
-import numpy as np
 
 from ..utils.config import (
     WINDOW_TITLE, WINDOW_WIDTH, WINDOW_HEIGHT,
-    CANVAS_WIDTH, CANVAS_HEIGHT, SUPPORTED_FORMATS
+    SUPPORTED_FORMATS, RENDER_POLL_MS, LOAD_POLL_MS, PROFILE_PATH
 )
-from ..processing.face_detector import FaceDetector
-from ..processing.mask_generator import MaskGenerator
 from ..processing.image_manager import ImageManager
-from ..processing.filters import apply_all_effects
-from .image_canvas import ImageCanvas
+from ..utils.profiler import SamplingProfiler
+from .image_canvas import ImageCanvas, OVERLAY_TAG
 from .control_panel import ControlPanel
 from .event_handlers import EventHandlers
 
@@ -22,22 +22,121 @@ from .event_handlers import EventHandlers
 class MainWindow:
     """Main application controller"""
 
-    def __init__(self, root):
+    def __init__(self, root, on_ready=None, render_process=False, profile=None):
         """
         Initialize main window
 
+        The window is built first; OpenCV, MediaPipe and the effects stack
+        are imported and the Face Mesh graph is loaded on a background
+        thread. "Load Image" stays disabled until that finishes.
+
         Args:
             root: Tkinter root window
+            on_ready: Optional callback(startup_timings) run on the Tk
+                thread once the detector is ready
+            render_process: Render in a separate process (RenderEngine)
+                so the Tk thread stays responsive during renders
+            profile: Collapsed-stack file to profile into from the start;
+                F9 toggles profiling at any time (see utils.profiler)
         """
         self.root = root
         self.root.title(WINDOW_TITLE)
         self.root.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}")
 
         self.image_manager = ImageManager()
-        self.face_detector = FaceDetector()
-        self.mask_generator = MaskGenerator()
+        self.face_detector = None
+        self.mask_generator = None
+        self.resources = None  # ResourcePlan, decided during background init
+        self.on_ready = on_ready
+        self.render_process = render_process
+        self.render_engine = None
+        self._render_pending = False
+        self._click_markers = []  # Image points of clicks whose render has not landed yet
+        self.gallery = None
+        self._load = None  # LoadTask in progress
+        self._load_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='load')
+        self.profiler = SamplingProfiler()
+        self.profile_path = profile or PROFILE_PATH
+
+        self.startup_timings = {}
+        self._init_result = None
+        self._window_start = time.perf_counter()
 
         self.setup_layout()
+        self.root.protocol('WM_DELETE_WINDOW', self.on_close)
+        self.root.bind('<Escape>', lambda event: self.cancel_load())
+        self.root.bind('<F9>', lambda event: self.toggle_profiling())
+        if profile:
+            self.start_profiling()
+        self.start_background_init()
+
+    def start_background_init(self):
+        """Import heavy modules and load the face model off the Tk thread"""
+        self.root.after_idle(self._record_window_shown)
+        threading.Thread(target=self._background_init, daemon=True).start()
+        self.root.after(50, self._poll_background_init)
+
+    def _record_window_shown(self):
+        """Note how long it took until the event loop was idle"""
+        self.startup_timings['window'] = time.perf_counter() - self._window_start
+
+    def _background_init(self):
+        """Worker thread body: never touches Tk"""
+        try:
+            start = time.perf_counter()
+            import cv2  # noqa: F401
+            import numpy  # noqa: F401
+            import mediapipe  # noqa: F401
+            from ..processing.face_detector import FaceDetector
+            from ..processing.mask_generator import MaskGenerator
+            from ..processing import filters  # noqa: F401
+            from ..processing.resources import plan_resources, configure_process
+            from . import photo  # noqa: F401
+            imported = time.perf_counter()
+
+            self.resources = plan_resources('gui')
+            configure_process(self.resources)
+
+            face_detector = FaceDetector()
+            mask_generator = MaskGenerator()
+            loaded = time.perf_counter()
+
+            self._init_result = ('ok', face_detector, mask_generator, {
+                'imports': imported - start,
+                'model_load': loaded - imported
+            })
+        except Exception as e:
+            self._init_result = ('error', e)
+
+    def _poll_background_init(self):
+        """Tk-thread side of the background init"""
+        result = self._init_result
+        if result is None:
+            self.root.after(50, self._poll_background_init)
+            return
+
+        if result[0] == 'error':
+            self.status_label.config(text='Face model failed to load')
+            messagebox.showerror("Error", f"Failed to load face detector: {result[1]}")
+            return
+
+        _, self.face_detector, self.mask_generator, timings = result
+        self.startup_timings.update(timings)
+        self.startup_timings['ready'] = time.perf_counter() - self._window_start
+
+        if self.render_process:
+            from ..processing.render_engine import RenderEngine
+            self.render_engine = RenderEngine()
+            if self.profiler.running:
+                self.render_engine.set_profiling(True)
+
+        self.load_button.config(state='normal')
+        self.folder_button.config(state='normal')
+        self.status_label.config(
+            text=f"Ready (imports {timings['imports']:.1f}s, model {timings['model_load']:.1f}s)")
+
+        if self.on_ready is not None:
+            self.on_ready(self.startup_timings)
 
     def setup_layout(self):
         """Setup GUI layout with Pretty Pixels branding"""
@@ -95,6 +194,15 @@ class MainWindow:
         button_frame = tk.Frame(header_frame, bg=bg_gradient_top)
         button_frame.pack(side='right', padx=20, pady=10)
 
+        self.status_label = tk.Label(
+            header_frame,
+            text='Loading face model...',
+            font=('Segoe UI', 9),
+            bg=bg_gradient_top,
+            fg=accent_purple
+        )
+        self.status_label.pack(side='right', padx=10)
+
         button_style = {
             'font': ('Segoe UI', 10, 'bold'),
             'bg': button_bg,
@@ -111,8 +219,10 @@ class MainWindow:
             'highlightthickness': 1
         }
 
+        buttons = {}
         for btn_text, btn_command in [
             ('📁 Load Image', self.load_image),
+            ('🗂 Open Folder', self.open_folder),
             ('💾 Save Image', self.save_image),
             ('🔄 Reset', self.reset_image)
         ]:
@@ -126,9 +236,16 @@ class MainWindow:
                 **button_style
             )
             btn.pack()
+            buttons[btn_command.__name__] = btn
+
+        self.load_button = buttons['load_image']
+        self.load_button.config(state='disabled')
+        self.folder_button = buttons['open_folder']
+        self.folder_button.config(state='disabled')
 
         canvas_container = tk.Frame(self.root, bg='#F8F5FA')
         canvas_container.pack(side='top', fill='both', expand=True, pady=10)
+        self.canvas_container = canvas_container
 
         self.canvas = ImageCanvas(canvas_container)
         self.canvas.frame.pack(expand=True)  # Center the canvas
@@ -140,37 +257,105 @@ class MainWindow:
 
     def load_image(self):
         """Load image from file"""
+        if self.face_detector is None:
+            return
+
         path = filedialog.askopenfilename(filetypes=SUPPORTED_FORMATS)
-        if not path:
+        if path:
+            self.open_image(path)
+
+    def open_folder(self):
+        """Show a folder's images in the gallery panel"""
+        if self.face_detector is None:
             return
 
-        try:
-            with open(path, 'rb') as f:
-                file_bytes = np.frombuffer(f.read(), dtype=np.uint8)
-                img = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
+        directory = filedialog.askdirectory()
+        if not directory:
+            return
 
-            if img is None or not isinstance(img, np.ndarray):
-                messagebox.showerror("Error", "Failed to load image")
-                return
+        if self.gallery is None:
+            from .gallery_panel import GalleryPanel
+            self.gallery = GalleryPanel(self.root, self.open_image, threads=self.resources.io_threads)
+            self.gallery.frame.pack(side='left', fill='y', padx=(20, 0), pady=10, before=self.canvas_container)
+        self.gallery.set_folder(directory)
 
-            landmarks = self.face_detector.detect(img)
-            if landmarks is None:
-                messagebox.showerror("Error", "No face detected in image")
-                return
+    def open_image(self, path):
+        """
+        Start loading an image in the background
 
-            masks = self.mask_generator.generate_all_masks(landmarks, img.shape)
+        Reading, decoding, face detection and mask generation run on a
+        load thread; the decoded image is shown as soon as it is ready and
+        becomes editable once its masks are. Opening another image (or
+        pressing Escape) abandons the load in progress.
 
-            self.image_manager.original_image = img.copy()
-            self.image_manager.working_image = img.copy()
-            self.image_manager.blemish_points = []
-            self.image_manager.set_face_data(landmarks, masks)
+        Args:
+            path: Image file
+        """
+        if self.face_detector is None:
+            return
 
-            self.update_display()
+        from ..processing.loader import LoadTask
 
-            self.control_panel.reset_values()
+        self.cancel_load(restore=False)
+        prefetched = self.gallery.take_prefetched(path) if self.gallery is not None else None
+        self._load = LoadTask(path, self.face_detector, self.mask_generator, prefetched)
+        self._load.start(self._load_executor)
+        self.status_label.config(text=f"Loading {os.path.basename(path)}...")
+        self.root.after(LOAD_POLL_MS, self._poll_load, self._load)
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to process image: {str(e)}")
+    def cancel_load(self, restore=True):
+        """
+        Abandon the load in progress
+
+        Args:
+            restore: Show the image being edited again
+        """
+        if self._load is None:
+            return
+        self._load.cancel()
+        self._load = None
+        if restore:
+            self.status_label.config(text='Load cancelled')
+            if self.image_manager.original_image is not None:
+                self.canvas.display_images(self.image_manager.original_image, self.image_manager.working_image)
+
+    def _poll_load(self, task):
+        """Tk-thread side of a background load"""
+        if task is not self._load:
+            return  # Superseded or cancelled: its results are discarded
+
+        name = os.path.basename(task.path)
+        for event, value in task.poll():
+            if event == 'decode':
+                image = task.image_manager.original_image
+                self.canvas.display_images(image, image)
+                self.status_label.config(text=f"Detecting face in {name}...")
+            elif event == 'detect':
+                self.status_label.config(text=f"Building masks for {name}...")
+            elif event == 'done':
+                self._finish_load(task, value)
+                return
+            elif event == 'error':
+                self.cancel_load()
+                self.status_label.config(text=f"Failed to load {name}")
+                messagebox.showerror("Error", f"Failed to process image: {str(value)}")
+                return
+
+        self.root.after(LOAD_POLL_MS, self._poll_load, task)
+
+    def _finish_load(self, task, timings):
+        """Make a finished load the image being edited"""
+        self._load = None
+        self._click_markers = []
+        self.image_manager = task.image_manager
+        if self.render_engine is not None:
+            self.render_engine.load(self.image_manager)
+
+        self.update_display()
+        self.control_panel.reset_values()
+
+        phases = ', '.join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in timings.items())
+        self.status_label.config(text=f"{os.path.basename(task.path)} ({phases})")
 
     def save_image(self):
         """Save processed image"""
@@ -187,6 +372,7 @@ class MainWindow:
         )
 
         if path:
+            import cv2
             try:
                 cv2.imwrite(path, self.image_manager.working_image)
                 messagebox.showinfo("Success", "Image saved successfully")
@@ -195,16 +381,17 @@ class MainWindow:
 
     def reset_image(self):
         """Reset all effects"""
-        if self.image_manager.original_image is None:
+        if self.image_manager.original_image is None or self._load is not None:
             return
 
         self.image_manager.reset()
+        self._click_markers = []
         self.control_panel.reset_values()
         self.update_display()
 
     def on_slider_change(self):
         """Handle slider change with debouncing"""
-        if self.image_manager.original_image is None:
+        if self.image_manager.original_image is None or self._load is not None:
             return
 
         if hasattr(self, '_slider_timer'):
@@ -216,6 +403,12 @@ class MainWindow:
         if self.image_manager.original_image is None:
             return
 
+        if self.render_engine is not None:
+            self.submit_render()
+            return
+
+        from ..processing.filters import apply_all_effects
+
         try:
             slider_values = self.control_panel.get_values()
 
@@ -226,6 +419,117 @@ class MainWindow:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to apply effects: {str(e)}")
 
+    def submit_render(self):
+        """Start a render in the engine process; the result is polled for"""
+        if self.render_engine.busy:
+            self._render_pending = True  # Coalesce changes made while rendering
+            return
+
+        from ..processing.render_engine import RenderEngineError
+
+        try:
+            self.render_engine.submit(self.control_panel.get_values(), self.image_manager.blemish_points)
+        except RenderEngineError as e:
+            messagebox.showerror("Error", f"Failed to apply effects: {str(e)}")
+            return
+        self.root.after(RENDER_POLL_MS, self._poll_render)
+
+    def _poll_render(self):
+        """Tk-thread side of an engine render"""
+        if not self.render_engine.busy:
+            return  # Dropped by an image load
+
+        from ..processing.render_engine import RenderEngineError
+
+        try:
+            result = self.render_engine.poll()
+        except RenderEngineError as e:
+            self._render_pending = False
+            messagebox.showerror("Error", f"Failed to apply effects: {str(e)}")
+            return
+
+        if result is None:
+            self.root.after(RENDER_POLL_MS, self._poll_render)
+            return
+
+        reply = self.render_engine.last_reply
+        self.image_manager.update_working(result, reply['rects'], reply['changes'])
+        if self._load is None:  # Otherwise the loading image is on screen
+            self.update_display()
+        for img_x, img_y in self._click_markers:
+            self.draw_click_marker(img_x, img_y)
+        self._click_markers = []
+
+        if self._render_pending:
+            self._render_pending = False
+            self.submit_render()
+
+    def toggle_profiling(self):
+        """F9: start profiling, or stop and write the profile"""
+        if self.profiler.running:
+            self.stop_profiling()
+        else:
+            self.start_profiling()
+
+    def start_profiling(self):
+        """Sample loads and renders, here and in the render process"""
+        if self.render_engine is not None and self.render_engine.busy:
+            self.root.after(RENDER_POLL_MS, self.start_profiling)
+            return
+        self.profiler.clear()
+        self.profiler.start()
+        if self.render_engine is not None:
+            self.render_engine.set_profiling(True)
+        self.status_label.config(text='Profiling loads and renders (F9 to stop)')
+
+    def stop_profiling(self, report=True):
+        """
+        Stop profiling, write the collapsed stacks and print the summary
+
+        Args:
+            report: Show where the profile went in the status line
+        """
+        if report and self.render_engine is not None and self.render_engine.busy:
+            self.root.after(RENDER_POLL_MS, self.stop_profiling)
+            return
+        self.profiler.stop()
+        if self.render_engine is not None:
+            from ..processing.render_engine import RenderEngineError
+            try:
+                self.profiler.merge(self.render_engine.set_profiling(False) or {})
+            except RenderEngineError:
+                pass  # Busy at shutdown, or restarted: its samples are lost
+
+        samples = self.profiler.write_collapsed(self.profile_path)
+        print(f"Profile: {samples} samples written to {self.profile_path}")
+        print(self.profiler.format_top())
+        if report:
+            self.status_label.config(text=f'Profile written to {os.path.basename(self.profile_path)}')
+
+    def on_close(self):
+        """Stop the render process before the window goes away"""
+        if self.profiler.running:
+            self.stop_profiling(report=False)
+        if self.render_engine is not None:
+            self.render_engine.close()
+        if self.gallery is not None:
+            self.gallery.close()
+        self.cancel_load(restore=False)
+        self._load_executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
+
+    def draw_click_marker(self, img_x, img_y):
+        """Circle a clicked blemish (image coordinates) on the after canvas"""
+        # Mapped when drawn: the view may have moved since the click
+        canvas_x, canvas_y = self.canvas.viewport.image_to_canvas(img_x + 0.5, img_y + 0.5)
+        self.canvas.after_canvas.create_oval(
+            canvas_x - 5, canvas_y - 5,
+            canvas_x + 5, canvas_y + 5,
+            outline='red',
+            width=2,
+            tags=OVERLAY_TAG
+        )
+
     def on_canvas_click(self, canvas_x, canvas_y):
         """
         Handle click on canvas for blemish removal
@@ -234,7 +538,7 @@ class MainWindow:
             canvas_x: Canvas X coordinate
             canvas_y: Canvas Y coordinate
         """
-        if self.image_manager.original_image is None:
+        if self.image_manager.original_image is None or self._load is not None:
             return
 
         try:
@@ -244,12 +548,10 @@ class MainWindow:
 
             self.apply_effects()
 
-            self.canvas.after_canvas.create_oval(
-                canvas_x - 5, canvas_y - 5,
-                canvas_x + 5, canvas_y + 5,
-                outline='red',
-                width=2
-            )
+            if self.render_engine is not None:
+                self._click_markers.append((img_x, img_y))  # Drawn once the render lands
+            else:
+                self.draw_click_marker(img_x, img_y)
 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to remove blemish: {str(e)}")
@@ -267,16 +569,9 @@ class MainWindow:
         """
         img_h, img_w = self.image_manager.original_image.shape[:2]
 
-        scale = min(CANVAS_WIDTH / img_w, CANVAS_HEIGHT / img_h)
-
-        display_w = int(img_w * scale)
-        display_h = int(img_h * scale)
-
-        offset_x = (CANVAS_WIDTH - display_w) // 2
-        offset_y = (CANVAS_HEIGHT - display_h) // 2
-
-        img_x = int((canvas_x - offset_x) / scale)
-        img_y = int((canvas_y - offset_y) / scale)
+        # The viewport tracks zoom and pan, so this holds at any zoom level
+        img_x, img_y = self.canvas.viewport.canvas_to_image(canvas_x, canvas_y)
+        img_x, img_y = int(img_x), int(img_y)
 
         img_x = max(0, min(img_x, img_w - 1))
         img_y = max(0, min(img_y, img_h - 1))
@@ -285,6 +580,6 @@ class MainWindow:
 
     def update_display(self):
         """Update before/after image display"""
-        before = self.image_manager.get_original()
+        before = self.image_manager.original_image
         after = self.image_manager.working_image if self.image_manager.working_image is not None else before
-        self.canvas.display_images(before, after)
+        self.canvas.display_images(before, after, self.image_manager.take_changes())
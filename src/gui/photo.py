@@ -0,0 +1,69 @@
+"""
+OpenCV image to Tk PhotoImage conversions
+
+Kept with the GUI so that the processing core (src/processing,
+src/effects, src/utils) never imports Tk or PIL.ImageTk: headless
+workers import it without a display or a Tk installation.
+"""
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+
+def cv2_to_pil(cv2_image):
+    """Convert OpenCV BGR image to PIL RGB image"""
+    rgb_image = cv2.cvtColor(cv2_image, cv2.COLOR_BGR2RGB)
+    return Image.fromarray(rgb_image)
+
+
+def pil_to_cv2(pil_image):
+    """Convert PIL RGB image to OpenCV BGR image"""
+    rgb_array = np.array(pil_image)
+    return cv2.cvtColor(rgb_array, cv2.COLOR_RGB2BGR)
+
+
+def cv2_to_photoimage(cv2_image, target_width=400, target_height=500):
+    """
+    Convert OpenCV image to Tkinter PhotoImage with resizing
+
+    Args:
+        cv2_image: OpenCV BGR image
+        target_width: Target width for display
+        target_height: Target height for display
+
+    Returns:
+        ImageTk.PhotoImage
+    """
+    rgb_image = cv2.cvtColor(cv2_image, cv2.COLOR_BGR2RGB)
+
+    h, w = rgb_image.shape[:2]
+    scale = min(target_width / w, target_height / h)
+    new_w, new_h = int(w * scale), int(h * scale)
+
+    resized = cv2.resize(rgb_image, (new_w, new_h), interpolation=cv2.INTER_AREA)
+
+    pil_image = Image.fromarray(resized)
+    return ImageTk.PhotoImage(pil_image)
+
+
+def view_to_photoimage(cv2_image, width, height):
+    """
+    Scale an image region to an exact display size and convert it
+
+    Enlarging uses nearest neighbour so individual pixels stay visible
+    when zoomed in; shrinking uses area averaging.
+
+    Args:
+        cv2_image: OpenCV BGR image region
+        width: Display width
+        height: Display height
+
+    Returns:
+        ImageTk.PhotoImage
+    """
+    h, w = cv2_image.shape[:2]
+    if (w, h) != (width, height):
+        interpolation = cv2.INTER_NEAREST if width > w else cv2.INTER_AREA
+        cv2_image = cv2.resize(cv2_image, (width, height), interpolation=interpolation)
+
+    return ImageTk.PhotoImage(Image.fromarray(cv2.cvtColor(cv2_image, cv2.COLOR_BGR2RGB)))
@@ -0,0 +1,111 @@
+"""
+Zoom and pan state shared by the before/after canvases
+"""
+import math
+
+from ..utils.config import VIEW_MAX_ZOOM
+
+
+class Viewport:
+    """Maps between canvas and image coordinates at the current zoom"""
+
+    def __init__(self, width, height):
+        """
+        Args:
+            width: Canvas width in pixels
+            height: Canvas height in pixels
+        """
+        self.width = width
+        self.height = height
+        self.image_size = None  # (width, height)
+        self.zoom = 1.0  # Canvas pixels per image pixel
+        self.x = 0.0  # Image coordinates of the canvas origin
+        self.y = 0.0
+
+    @property
+    def fit_zoom(self):
+        """Zoom that shows the whole image"""
+        img_w, img_h = self.image_size
+        return min(self.width / img_w, self.height / img_h)
+
+    def set_image_size(self, img_w, img_h):
+        """Fit a newly loaded image; keeps the view if the size is unchanged"""
+        if self.image_size != (img_w, img_h):
+            self.image_size = (img_w, img_h)
+            self.fit()
+
+    def fit(self):
+        """Show the whole image, centered"""
+        self.zoom = self.fit_zoom
+        self._clamp()
+
+    def zoom_at(self, factor, canvas_x, canvas_y):
+        """
+        Zoom keeping the image point under the cursor in place
+
+        Args:
+            factor: Zoom multiplier (> 1 zooms in)
+            canvas_x: Cursor X on the canvas
+            canvas_y: Cursor Y on the canvas
+        """
+        img_x, img_y = self.canvas_to_image(canvas_x, canvas_y)
+        self.zoom = max(min(self.fit_zoom, 1.0), min(self.zoom * factor, VIEW_MAX_ZOOM))
+        self.x = img_x - canvas_x / self.zoom
+        self.y = img_y - canvas_y / self.zoom
+        self._clamp()
+
+    def pan(self, dx, dy):
+        """
+        Move the image by a canvas-pixel offset
+
+        Args:
+            dx: Horizontal drag distance
+            dy: Vertical drag distance
+        """
+        self.x -= dx / self.zoom
+        self.y -= dy / self.zoom
+        self._clamp()
+
+    def _clamp(self):
+        """Center axes that fit on the canvas, keep the others inside the image"""
+        img_w, img_h = self.image_size
+        view_w, view_h = self.width / self.zoom, self.height / self.zoom
+        self.x = (img_w - view_w) / 2 if view_w >= img_w else min(max(self.x, 0.0), img_w - view_w)
+        self.y = (img_h - view_h) / 2 if view_h >= img_h else min(max(self.y, 0.0), img_h - view_h)
+
+    def canvas_to_image(self, canvas_x, canvas_y):
+        """Image coordinates (floats) of a canvas point"""
+        return self.x + canvas_x / self.zoom, self.y + canvas_y / self.zoom
+
+    def image_to_canvas(self, img_x, img_y):
+        """Canvas coordinates (floats) of an image point"""
+        return (img_x - self.x) * self.zoom, (img_y - self.y) * self.zoom
+
+    def placement(self, level):
+        """
+        Part of a pyramid level that covers the canvas
+
+        Args:
+            level: Pyramid level (each level halves the image)
+
+        Returns:
+            (level_rect, (canvas_x, canvas_y, width, height)): the level
+            pixels to show and where to draw them, or None if nothing
+            is visible
+        """
+        img_w, img_h = self.image_size
+        scale = 1 << level
+        level_w, level_h = img_w >> level, img_h >> level
+
+        x0 = max(0, int(math.floor(self.x / scale)))
+        y0 = max(0, int(math.floor(self.y / scale)))
+        x1 = min(level_w, int(math.ceil((self.x + self.width / self.zoom) / scale)))
+        y1 = min(level_h, int(math.ceil((self.y + self.height / self.zoom) / scale)))
+        if x1 <= x0 or y1 <= y0:
+            return None
+
+        canvas_x, canvas_y = self.image_to_canvas(x0 * scale, y0 * scale)
+        end_x, end_y = self.image_to_canvas(x1 * scale, y1 * scale)
+        left, top = int(round(canvas_x)), int(round(canvas_y))
+        width, height = max(1, int(round(end_x)) - left), max(1, int(round(end_y)) - top)
+        return (x0, y0, x1, y1), (left, top, width, height)
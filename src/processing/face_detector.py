@@ -2,29 +2,69 @@
 MediaPipe Face Mesh wrapper for face detection and landmark extraction
 """
 import cv2
-import mediapipe as mp
-from ..utils.config import FACE_DETECTION_CONFIDENCE, MAX_NUM_FACES
+from ..utils.config import (
+    FACE_DETECTION_CONFIDENCE, MAX_NUM_FACES,
+    TWO_STAGE_MIN_PIXELS, TWO_STAGE_PREVIEW_SCALE, TWO_STAGE_PADDING
+)
 
 
 class FaceDetector:
     """Wrapper for MediaPipe Face Mesh to detect faces and extract landmarks"""
 
-    def __init__(self):
-        """Initialize MediaPipe Face Mesh"""
+    def __init__(self, static_image_mode=True):
+        """
+        Initialize MediaPipe Face Mesh
+
+        Args:
+            static_image_mode: Detect the face from scratch in every image;
+                False tracks it from frame to frame (for video)
+        """
+        # Imported here: MediaPipe takes most of a second to import, which
+        # processes that never detect (the HTTP front end, say) skip
+        import mediapipe as mp
+
+        self.static_image_mode = static_image_mode
         self.mp_face_mesh = mp.solutions.face_mesh
         self.face_mesh = self.mp_face_mesh.FaceMesh(
-            static_image_mode=True,
+            static_image_mode=static_image_mode,
             max_num_faces=MAX_NUM_FACES,
             refine_landmarks=True,
             min_detection_confidence=FACE_DETECTION_CONFIDENCE
         )
 
-    def detect(self, image):
+    def detect(self, image, preview=None):
         """
         Detect face and extract 468 landmarks
 
+        Images above TWO_STAGE_MIN_PIXELS are handled in two stages: the
+        face box is found on a reduced-scale preview, then Face Mesh runs on
+        a padded full-resolution crop around it. Not in tracking mode: both
+        stages would feed the one tracking graph, the preview and then a
+        crop whose offset moves, and it would lose the face between frames.
+
         Args:
             image: OpenCV BGR image
+            preview: Optional reduced-scale copy of image (e.g. decoded with
+                cv2.IMREAD_REDUCED_COLOR_4); built by resizing if needed
+
+        Returns:
+            List of (x, y) pixel coordinates or None if no face detected
+        """
+        h, w = image.shape[:2]
+        if self.static_image_mode and h * w >= TWO_STAGE_MIN_PIXELS:
+            landmarks = self._detect_two_stage(image, preview)
+            if landmarks is not None:
+                return landmarks
+
+        return self._detect_region(image, 0, 0)
+
+    def _detect_region(self, image, offset_x, offset_y):
+        """
+        Run Face Mesh on image and map landmarks by an offset
+
+        Args:
+            image: OpenCV BGR image (full frame or crop)
+            offset_x, offset_y: Position of image inside the full frame
 
         Returns:
             List of (x, y) pixel coordinates or None if no face detected
@@ -41,12 +81,95 @@ class FaceDetector:
         h, w = image.shape[:2]
         landmarks = []
         for landmark in face_landmarks.landmark:
-            x = int(landmark.x * w)
-            y = int(landmark.y * h)
+            x = int(offset_x + landmark.x * w)
+            y = int(offset_y + landmark.y * h)
             landmarks.append((x, y))
 
         return landmarks
 
+    def _detect_two_stage(self, image, preview=None):
+        """
+        Coarse face box on a preview, then landmarks on a full-res crop
+
+        Returns:
+            List of (x, y) pixel coordinates or None if either stage fails
+        """
+        if preview is None:
+            preview = self.make_preview(image)
+
+        box = self.locate_face(preview)
+        if box is None:
+            return None
+        return self.detect_in_box(image, box)
+
+    @staticmethod
+    def make_preview(image):
+        """
+        Reduced-scale copy for stage one
+
+        Only the face box is needed from it, so a cheap bilinear resize is
+        good enough.
+        """
+        h, w = image.shape[:2]
+        return cv2.resize(
+            image,
+            (max(1, w // TWO_STAGE_PREVIEW_SCALE), max(1, h // TWO_STAGE_PREVIEW_SCALE)),
+            interpolation=cv2.INTER_LINEAR
+        )
+
+    def locate_face(self, preview):
+        """
+        Stage one: find the face box on a reduced-scale image
+
+        Args:
+            preview: Reduced-scale BGR image
+
+        Returns:
+            Face box (x0, y0, x1, y1) as fractions of the image size, or None
+        """
+        landmarks = self._detect_region(preview, 0, 0)
+        if landmarks is None:
+            return None
+
+        h, w = preview.shape[:2]
+        xs = [x for x, _ in landmarks]
+        ys = [y for _, y in landmarks]
+        return (min(xs) / w, min(ys) / h, (max(xs) + 1) / w, (max(ys) + 1) / h)
+
+    def detect_in_box(self, image, box):
+        """
+        Stage two: run Face Mesh on a padded full-resolution crop
+
+        Args:
+            image: Full-resolution BGR image
+            box: Face box as fractions of the image size (see locate_face)
+
+        Returns:
+            List of (x, y) pixel coordinates in full-image space, or None
+        """
+        h, w = image.shape[:2]
+        pixel_box = (box[0] * w, box[1] * h, box[2] * w, box[3] * h)
+        x0, y0, x1, y1 = self.padded_square(pixel_box, (h, w), TWO_STAGE_PADDING)
+        return self._detect_region(image[y0:y1, x0:x1], x0, y0)
+
+    @staticmethod
+    def padded_square(box, shape, padding):
+        """
+        Square crop around a box with a relative margin, clipped to the image
+
+        Face Mesh's own detector expects some context around the face, and a
+        square crop avoids anisotropic rescaling inside MediaPipe.
+
+        Returns:
+            Integer (x0, y0, x1, y1)
+        """
+        h, w = shape[:2]
+        x0, y0, x1, y1 = box
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        half = max(x1 - x0, y1 - y0) * (0.5 + padding)
+        return (max(0, int(cx - half)), max(0, int(cy - half)),
+                min(w, int(cx + half) + 1), min(h, int(cy + half) + 1))
+
     def get_pixel_coords(self, landmarks, width, height):
         """
         Convert normalized landmarks to pixel coordinates
@@ -0,0 +1,272 @@
+"""
+Mask feathering engine
+
+Feathering used to be a full-frame GaussianBlur every time a mask was built
+or used. This module keeps the same results while doing far less work:
+
+- feather_roi() blurs only the mask's bounding box plus the kernel halo,
+  which is bit-identical to blurring the whole frame.
+- blur_mask() runs large-sigma blurs at reduced scale and upsamples.
+- analytic_ellipse_falloff() computes a blurred filled ellipse directly
+  from its parameters: the horizontal pass is a closed-form difference of
+  the kernel's cumulative sum per row span, only the vertical pass is a
+  real (1D) filter, and both only cover the ellipse ROI.
+- feathered_mask() caches derived masks on the ImageManager so renders
+  never re-feather a mask that has not changed.
+"""
+import cv2
+import numpy as np
+
+from ..utils.regions import mask_bbox, expand_rect, crop
+
+# Blurs wider than this run at reduced scale (see blur_mask)
+DOWNSAMPLE_MIN_KERNEL = 31
+DOWNSAMPLE_TARGET_SIGMA = 3.0
+# cv2.ellipse fills pixels touching the outline, about half a pixel wider
+# than the ideal ellipse
+ELLIPSE_RASTER_GROWTH = 0.5
+
+
+def _kernel_size(kernel_size):
+    """Odd kernel size, as feather_mask enforces"""
+    return kernel_size + 1 if kernel_size % 2 == 0 else kernel_size
+
+
+def _sigma(kernel_size, sigma):
+    """OpenCV's sigma for a kernel size when sigma <= 0"""
+    if sigma > 0:
+        return sigma
+    return 0.3 * ((kernel_size - 1) * 0.5 - 1) + 0.8
+
+
+def feather_roi(mask, kernel_size=15, sigma=0):
+    """
+    Gaussian feather of a mask, computed only around its non-zero pixels
+
+    Same result as cv2.GaussianBlur(mask, (k, k), sigma) on the full frame.
+
+    Args:
+        mask: uint8 mask (0-255)
+        kernel_size: Blur kernel size (made odd)
+        sigma: Gaussian sigma (0 = derived from kernel size)
+
+    Returns:
+        Feathered mask (0-255), same shape as mask
+    """
+    kernel_size = _kernel_size(kernel_size)
+    if kernel_size >= DOWNSAMPLE_MIN_KERNEL:
+        return blur_mask(mask, kernel_size, sigma)
+
+    rect = mask_bbox(mask)
+    out = np.zeros_like(mask)
+    if rect is None:
+        return out
+
+    # Two halos: one for the pixels the blur writes, one so the border
+    # reflection of the crop only ever mirrors zeros
+    halo = kernel_size // 2
+    read_rect = expand_rect(rect, 2 * halo, mask.shape)
+    x0, y0, x1, y1 = read_rect
+    out[y0:y1, x0:x1] = cv2.GaussianBlur(crop(mask, read_rect), (kernel_size, kernel_size), sigma)
+    return out
+
+
+def blur_mask(mask, kernel_size, sigma=0):
+    """
+    Large-sigma mask blur at reduced scale
+
+    The ROI is downscaled by an integer factor, blurred there with the
+    scaled kernel and upsampled bilinearly. The factor is chosen from the
+    kernel's effective smoothness (sigma, or a third of its radius when a
+    large sigma is truncated hard), so the error stays within a few gray
+    levels.
+
+    Args:
+        mask: uint8 mask (0-255)
+        kernel_size: Full-resolution kernel size
+        sigma: Full-resolution sigma (0 = derived from kernel size)
+
+    Returns:
+        Blurred mask (0-255), same shape as mask
+    """
+    kernel_size = _kernel_size(kernel_size)
+    sigma = _sigma(kernel_size, sigma)
+    radius = kernel_size // 2
+
+    factor = max(1, int(min(sigma, radius / 3.0) // DOWNSAMPLE_TARGET_SIGMA))
+    if factor == 1:
+        return cv2.GaussianBlur(mask, (kernel_size, kernel_size), sigma)
+
+    rect = mask_bbox(mask)
+    out = np.zeros_like(mask)
+    if rect is None:
+        return out
+
+    read_rect = expand_rect(rect, 2 * radius, mask.shape)
+    x0, y0, x1, y1 = read_rect
+    roi = crop(mask, read_rect)
+
+    # Pad to a multiple of the factor so the small grid lines up exactly
+    pad_y, pad_x = -roi.shape[0] % factor, -roi.shape[1] % factor
+    roi = cv2.copyMakeBorder(roi, 0, pad_y, 0, pad_x, cv2.BORDER_REFLECT_101)
+    small = cv2.resize(roi, (roi.shape[1] // factor, roi.shape[0] // factor),
+                       interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    small_kernel = 2 * (radius // factor) + 1
+    small = cv2.GaussianBlur(small, (small_kernel, small_kernel), sigma / factor)
+
+    up = cv2.resize(small, (roi.shape[1], roi.shape[0]), interpolation=cv2.INTER_LINEAR)
+    out[y0:y1, x0:x1] = np.clip(np.rint(up[:y1 - y0, :x1 - x0]), 0, 255).astype(np.uint8)
+    return out
+
+
+def _row_spans(ellipse, rows, width):
+    """
+    Horizontal pixel span of a filled ellipse on each row
+
+    Returns:
+        (left, right, inside) arrays; left/right are inclusive pixel columns
+    """
+    (cx, cy), (a, b) = ellipse
+    a += ELLIPSE_RASTER_GROWTH
+    b += ELLIPSE_RASTER_GROWTH
+    t = 1 - ((rows - cy) / b) ** 2
+    half = a * np.sqrt(np.clip(t, 0, None))
+    left = np.clip(np.ceil(cx - half), 0, width - 1)
+    right = np.clip(np.floor(cx + half), 0, width - 1)
+    inside = (t > 0) & (left <= right)
+    return left, right, inside
+
+
+def _span_response(cumulative, cols, left, right, inside, radius):
+    """
+    Horizontal blur of a row span: sum of kernel taps over [left, right]
+
+    Returns:
+        (rows, cols) float32 array
+    """
+    size = 2 * radius + 1
+    hi = np.clip(cols[None, :] - left[:, None] + (radius + 1), 0, size)
+    lo = np.clip(cols[None, :] - right[:, None] + radius, 0, size)
+    response = cumulative[hi] - cumulative[lo]
+    response[~inside] = 0
+    return response
+
+
+def _reflected_spans(left, right, inside, width, radius):
+    """
+    Mirror images of a span across the image edges (BORDER_REFLECT_101)
+
+    Only spans within the kernel radius of an edge have visible mirrors.
+
+    Yields:
+        (left, right, inside) for each mirrored span
+    """
+    # Left edge: column j >= 1 reappears at -j
+    near = inside & (right >= 1) & (left <= radius)
+    if near.any():
+        yield -right, -np.maximum(left, 1), near
+    # Right edge: column j <= w-2 reappears at 2(w-1) - j
+    edge = 2 * (width - 1)
+    near = inside & (left <= width - 2) & (right >= width - 1 - radius)
+    if near.any():
+        yield edge - np.minimum(right, width - 2), edge - left, near
+
+
+def analytic_ellipse_falloff(shape, ellipses, kernel_size=51, sigma=30):
+    """
+    Gaussian-blurred union of filled ellipses, computed from their parameters
+
+    Matches cv2.ellipse(..., -1) followed by cv2.GaussianBlur to within 2
+    gray levels (scripts/check_equivalence, cheek-mask), while only
+    touching the ellipse ROI.
+
+    Args:
+        shape: Image shape (height, width, ...)
+        ellipses: List of ((cx, cy), (radius_x, radius_y)) axis-aligned ellipses
+        kernel_size: Blur kernel size
+        sigma: Blur sigma
+
+    Returns:
+        uint8 mask (0-255)
+    """
+    h, w = shape[:2]
+    out = np.zeros((h, w), dtype=np.uint8)
+    if not ellipses:
+        return out
+
+    radius = kernel_size // 2
+    kernel = cv2.getGaussianKernel(kernel_size, sigma).ravel()
+    cumulative = np.concatenate([[0.0], np.cumsum(kernel)]).astype(np.float32)
+
+    rects = [expand_rect((int(cx - a) - 1, int(cy - b) - 1, int(cx + a) + 2, int(cy + b) + 2), 0, (h, w))
+             for (cx, cy), (a, b) in ellipses]
+    fy0 = min(r[1] for r in rects)
+    fy1 = max(r[3] for r in rects)
+    x0 = max(0, min(r[0] for r in rects) - radius)
+    x1 = min(w, max(r[2] for r in rects) + radius)
+    y0, y1 = max(0, fy0 - radius), min(h, fy1 + radius)
+
+    rows = np.arange(fy0, fy1, dtype=np.float64)
+    spans = [_row_spans(ellipse, rows, w) for ellipse in ellipses]
+    horizontal = np.zeros((fy1 - fy0, x1 - x0), dtype=np.float32)
+
+    def accumulate(left, right, inside, sign=1):
+        # Only columns within the kernel radius of the span respond
+        if not inside.any():
+            return
+        c0 = max(x0, int(left[inside].min()) - radius)
+        c1 = min(x1, int(right[inside].max()) + radius + 1)
+        if c0 >= c1:
+            return
+        cols = np.arange(c0, c1, dtype=np.intp)
+        response = _span_response(cumulative, cols, left.astype(np.intp), right.astype(np.intp),
+                                  inside, radius)
+        horizontal[:, c0 - x0:c1 - x0] += response if sign > 0 else -response
+
+    # Horizontal pass in closed form; overlapping ellipses are combined by
+    # inclusion-exclusion so shared pixels are not counted twice
+    for i, (left, right, inside) in enumerate(spans):
+        accumulate(left, right, inside)
+        for mirrored in _reflected_spans(left, right, inside, w, radius):
+            accumulate(*mirrored)
+        for left2, right2, inside2 in spans[i + 1:]:
+            overlap_left, overlap_right = np.maximum(left, left2), np.minimum(right, right2)
+            accumulate(overlap_left, overlap_right, inside & inside2 & (overlap_left <= overlap_right), -1)
+
+    # Vertical pass: one 1D filter over the ROI columns
+    band = np.zeros((y1 - y0, x1 - x0), dtype=np.float32)
+    band[fy0 - y0:fy1 - y0] = horizontal
+    vertical = cv2.sepFilter2D(band, cv2.CV_32F, np.ones(1, np.float32),
+                               kernel.astype(np.float32), borderType=cv2.BORDER_REFLECT_101)
+
+    out[y0:y1, x0:x1] = np.clip(np.rint(vertical * 255), 0, 255).astype(np.uint8)
+    return out
+
+
+# Derived masks used at render time: name -> (builder(masks), kernel size)
+FEATHER_SPECS = {
+    'smooth': (lambda masks: cv2.subtract(masks['face'], masks['eyes']), 15),
+    'lips': (lambda masks: masks['lips'], 5)
+}
+
+
+def feathered_mask(image_manager, name):
+    """
+    Feathered render-time mask, cached on the image manager
+
+    The cache is cleared whenever ImageManager.set_face_data installs new
+    masks, so a mask is feathered at most once per loaded image.
+
+    Args:
+        image_manager: ImageManager with face masks
+        name: Key of FEATHER_SPECS
+
+    Returns:
+        Feathered uint8 mask
+    """
+    cache = image_manager.feathered_masks
+    if name not in cache:
+        build, kernel_size = FEATHER_SPECS[name]
+        cache[name] = feather_roi(build(image_manager.face_masks), kernel_size)
+    return cache[name]
@@ -1,13 +1,34 @@
 """
 Main image processing pipeline
 """
-from ..effects.blemish_removal import remove_multiple_blemishes
-from ..effects.smoothing import smooth_face
-from ..effects.makeup import apply_lipstick, apply_blush
-from ..effects.sharpening import sharpen_region, create_eyebrow_eyelash_mask
+import numpy as np
 
+from ..effects.blemish_removal import detect_blemishes, BLEMISH_EXCLUDE_MASKS
+from ..effects.registry import registered_stages
+from ..utils.config import MEMORY_BUDGET, BLEMISH_AUTO_SENSITIVITY, BLEMISH_AUTO_MAX_SPOTS
+from .graph import RenderGraph, resolve_mask
 
-def apply_all_effects(image_manager, slider_values):
+
+def build_render_graph(image_manager, slider_values, memory_budget=None, track_memory=False):
+    """
+    Execution graph for the current image, blemish points and sliders
+
+    Args:
+        image_manager: ImageManager instance
+        slider_values: Slider dictionary (see apply_all_effects)
+        memory_budget: Bytes the render may allocate, or None
+        track_memory: Measure per-stage peak memory (see RenderGraph)
+
+    Returns:
+        RenderGraph; call run() to render and report() to inspect it
+
+    Raises:
+        MemoryBudgetError: If the render cannot fit in memory_budget
+    """
+    return RenderGraph(image_manager, slider_values, memory_budget=memory_budget, track_memory=track_memory)
+
+
+def apply_all_effects(image_manager, slider_values, memory_budget=MEMORY_BUDGET):
     """
     Main processing pipeline - called whenever sliders change
 
@@ -18,6 +39,13 @@ def apply_all_effects(image_manager, slider_values):
     4. Apply makeup (lipstick and blush)
     5. Apply sharpening (eyebrow/eyelash)
 
+    The stages and their order come from the effect registry
+    (effects/registry.py); stages that touch disjoint pixels may run
+    concurrently, and unchanged stages are served from the image
+    manager's stage cache. The result is the same as running the stages
+    one after another on the full frame. With a memory budget, large
+    stages run in smaller tiles, still with the same result.
+
     Args:
         image_manager: ImageManager instance
         slider_values: {
@@ -26,48 +54,51 @@ def apply_all_effects(image_manager, slider_values):
             'blush': 0-100,
             'sharpening': 0-100
         }
+        memory_budget: Bytes the render may allocate, or None
 
     Returns:
         Processed image
+
+    Raises:
+        MemoryBudgetError: If the render cannot fit in memory_budget
     """
-    img = image_manager.get_original().copy()
-
-    if image_manager.blemish_points:
-        img = remove_multiple_blemishes(img, image_manager.blemish_points)
-
-    if slider_values['smoothing'] > 0:
-        img = smooth_face(
-            img,
-            image_manager.face_masks['face'],
-            image_manager.face_masks['eyes'],
-            slider_values['smoothing']
-        )
-
-    if slider_values['lipstick'] > 0:
-        lipstick_color = slider_values.get('lipstick_color', 'red')
-        img = apply_lipstick(
-            img,
-            image_manager.face_masks['lips'],
-            lipstick_color,
-            slider_values['lipstick']
-        )
-
-    if slider_values['blush'] > 0:
-        blush_color = slider_values.get('blush_color', 'pink')
-        img = apply_blush(
-            img,
-            image_manager.face_masks['cheeks'],
-            slider_values['blush'],
-            blush_color
-        )
-
-    if slider_values['sharpening'] > 0:
-        sharpen_mask = create_eyebrow_eyelash_mask(
-            image_manager.face_landmarks,
-            img.shape
-        )
-        img = sharpen_region(img, sharpen_mask, slider_values['sharpening'])
-
-    image_manager.update_working(img)
+    graph = build_render_graph(image_manager, slider_values, memory_budget=memory_budget)
+    img = graph.run()
+
+    image_manager.update_working(img, graph.write_rects(), graph.changes())
 
     return img
+
+
+def find_blemishes(image_manager, sensitivity=BLEMISH_AUTO_SENSITIVITY, max_spots=BLEMISH_AUTO_MAX_SPOTS):
+    """
+    Detect blemish candidates on the face of a loaded image
+
+    Args:
+        image_manager: ImageManager with face data
+        sensitivity: 0-100; higher also finds fainter spots
+        max_spots: Most spots returned
+
+    Returns:
+        List of (x, y) spot centers, strongest first
+    """
+    registered_stages()  # Imports the effect modules, registering the masks they build
+    exclude = resolve_mask(image_manager, BLEMISH_EXCLUDE_MASKS[0])
+    for name in BLEMISH_EXCLUDE_MASKS[1:]:
+        exclude = np.maximum(exclude, resolve_mask(image_manager, name))
+    return detect_blemishes(image_manager.original_image, resolve_mask(image_manager, 'face'), exclude,
+                            sensitivity, max_spots)
+
+
+def set_blemish_points(image_manager, recipe):
+    """
+    Use a recipe's blemish points, plus detected ones if it enables them
+
+    Args:
+        image_manager: ImageManager with face data
+        recipe: Normalized recipe
+    """
+    points = list(recipe['blemish_points'])
+    if recipe['auto_blemish'] > 0:
+        points += find_blemishes(image_manager, recipe['auto_blemish'], recipe['auto_blemish_max'])
+    image_manager.blemish_points = points
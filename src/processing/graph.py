@@ -0,0 +1,601 @@
+"""
+Render graph built from the effect stage registry
+
+For one render, RenderGraph turns the registered EffectStages into nodes:
+
+- Stages at intensity 0 or with an empty footprint are skipped.
+- Each remaining stage becomes a RegionStage over its footprint tiles, so
+  the scheduler runs independent tiles of different stages concurrently
+  and ahead of unrelated earlier stages (safe reordering).
+- A node depends on the earlier nodes that write pixels it reads. Its
+  cache key is its own parameters plus its dependencies' keys, so moving
+  one slider only invalidates the stages downstream of the pixels it
+  changes. Outputs are cached per tile on the ImageManager; for
+  intensity-linear stages the intensity-independent layer is cached too,
+  so dragging such a slider only re-blends.
+
+After a small edit (one more blemish point, say) most cached tiles are
+still right except near the change. Each node reports the rectangles
+where its output differs from the previous render. A node whose only
+change is its input keeps its cached tiles and recomputes just the parts
+within its halo of the earlier nodes' changed rectangles, pasting them
+into the cached output (and layer); stages declaring tile_params keep the
+tiles whose parameters did not change. changes() gives the final changed
+rectangles, so viewers refresh only those.
+
+With a memory budget, oversized tiles are split and memory-heavy waves run
+one tile at a time (see processing.memory); renders that cannot fit are
+rejected before any stage runs.
+
+Stages borrow their temporaries, tile outputs and layers from the image
+manager's BufferArena; cache entries a render replaces and the shared
+color planes go back to it, so renders of one image stop allocating after
+the first few.
+"""
+import itertools
+import os
+
+from ..effects.registry import registered_stages, MASK_BUILDERS
+from ..utils.buffers import allocations_since
+from ..utils.color_space import ColorContext
+from ..utils.regions import (
+    component_rects, intersect_rect, union_rect, expand_rect, align_rect, merge_rects, offset_rect, crop, paste
+)
+from .feathering import feathered_mask
+from .memory import MemoryBudgetError, MemoryMeter, tile_bytes, fixed_bytes, fit_rects, format_bytes
+from .scheduler import RegionStage, run_region_stages
+
+FEATHERED_PREFIX = 'feathered_'
+BUDGET_PASSES = 4  # Tile-splitting passes before giving up on a memory budget
+
+_render_ids = itertools.count(1)
+
+
+def _freeze(value):
+    """Hashable form of a parameter value"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def resolve_mask(image_manager, name):
+    """
+    Mask a stage reads, by name (cached for the loaded image)
+
+    Names are face_masks keys, 'feathered_<name>' for FEATHER_SPECS
+    masks, or masks registered with register_mask.
+
+    Args:
+        image_manager: ImageManager with face data
+        name: Mask name
+
+    Returns:
+        uint8 mask
+    """
+    masks = image_manager.stage_cache.setdefault('masks', {})
+    if name not in masks:
+        if name in image_manager.face_masks:
+            masks[name] = image_manager.face_masks[name]
+        elif name.startswith(FEATHERED_PREFIX):
+            masks[name] = feathered_mask(image_manager, name[len(FEATHERED_PREFIX):])
+        else:
+            masks[name] = MASK_BUILDERS[name](image_manager.face_landmarks, image_manager.original_image.shape)
+    return masks[name]
+
+
+class StageInputs:
+    """What a stage's run/prepare/blend functions can read"""
+
+    def __init__(self, graph, values):
+        """
+        Args:
+            graph: RenderGraph the stage belongs to
+            values: The stage's parameter values
+        """
+        self._graph = graph
+        self.values = values
+        self.buffers = graph.buffers
+
+    def mask(self, name, rect):
+        """Named mask cropped to rect"""
+        return crop(self._graph.mask(name), rect)
+
+    def colors(self, rect):
+        """ColorView of the live image inside rect"""
+        return self._graph.colors.view(rect)
+
+
+class GraphNode:
+    """One active stage in a render graph"""
+
+    def __init__(self, stage, inputs, region, deps, key, layer_key):
+        self.stage = stage
+        self.inputs = inputs
+        self.region = region
+        self.deps = deps
+        self.key = key
+        self.layer_key = layer_key
+        self.counts = {'cached': 0, 'patched': 0, 'blended': 0, 'computed': 0}
+        self.changed = None  # Rectangles where the output differs from the previous render
+        self.patches = {}  # Tile read rect -> [(patch read rect, patch write rect)]
+
+
+class RenderGraph:
+    """Execution graph for one render of the loaded image"""
+
+    def __init__(self, image_manager, slider_values, stages=None, memory_budget=None, track_memory=False):
+        """
+        Build the graph
+
+        Args:
+            image_manager: ImageManager with original image and face data
+            slider_values: ControlPanel.get_values() dictionary; blemish
+                points are taken from the image manager
+            stages: EffectStages to use (default: the registry)
+            memory_budget: Bytes the render may allocate, or None
+            track_memory: Measure per-stage peaks with tracemalloc (tiles
+                then run one at a time)
+
+        Raises:
+            MemoryBudgetError: If the render cannot fit in memory_budget
+        """
+        self.image_manager = image_manager
+        self.shape = image_manager.original_image.shape
+        self.cache = image_manager.stage_cache
+        self.buffers = image_manager.buffers
+        self.allocations = None  # Arena activity of the last run
+        self.values = dict(slider_values, blemish_points=tuple(image_manager.blemish_points))
+        self.colors = None
+        self.nodes = []
+        self.skipped = []
+        self.memory_budget = memory_budget
+        self.meter = MemoryMeter() if track_memory else None
+        self.tile_budget = None  # Bytes left for running tiles
+        self.base = None  # Render the cache matched before the last run
+        self.render_id = None  # Render the cache matches after the last run
+        self.reverted = []  # Rectangles of stages that were on in the previous render
+
+        for stage in stages if stages is not None else registered_stages():
+            self._add(stage)
+
+        if memory_budget is not None:
+            self._fit_budget()
+
+    def mask(self, name):
+        """Resolve a mask name (see resolve_mask)"""
+        return resolve_mask(self.image_manager, name)
+
+    def _footprint(self, stage, inputs):
+        """Rectangles a stage may change"""
+        footprint = stage.footprint
+        if footprint is None:
+            return [(0, 0, self.shape[1], self.shape[0])]
+        if callable(footprint):
+            return footprint(inputs, self.shape)
+
+        footprints = self.cache.setdefault('footprints', {})
+        if footprint not in footprints:
+            footprints[footprint] = component_rects(self.mask(footprint))
+        return footprints[footprint]
+
+    def _add(self, stage):
+        """Turn a registered stage into a node, or record why it is skipped"""
+        if stage.is_noop(self.values):
+            self.skipped.append((stage.name, 'off'))
+            return
+
+        values = stage.values(self.values)
+        inputs = StageInputs(self, values)
+        for name in stage.masks:
+            self.mask(name)  # Resolve now; tiles only read them
+
+        rects = self._footprint(stage, inputs)
+        if not rects:
+            self.skipped.append((stage.name, 'empty footprint'))
+            return
+
+        node = None
+
+        def run(roi, rect):
+            return self._run_tile(node, roi, rect)
+
+        region = RegionStage(stage.name, None, run, stage.halo_for(self.values), stage.align,
+                             rects=rects, memory=stage.memory)
+        tiles = region.tiles(len(self.nodes), self.shape)
+        deps = [other for other in self.nodes
+                if any(intersect_rect(tile.read_rect, write_rect) is not None
+                       for tile in tiles for write_rect in other.region.rects(self.shape))]
+
+        input_key = tuple((other.stage.name, other.key) for other in deps)
+        params = tuple(sorted((k, _freeze(v)) for k, v in values.items()))
+        key = (params, input_key)
+        layer_key = None
+        if stage.intensity_linear:
+            layer_key = (tuple(p for p in params if p[0] != stage.intensity), input_key)
+
+        node = GraphNode(stage, inputs, region, deps, key, layer_key)
+        self.nodes.append(node)
+
+    def _color_rect(self):
+        """Region covered by the shared color planes"""
+        region = None
+        for node in self.nodes:
+            if node.stage.color_space:
+                for rect in node.region.rects(self.shape):
+                    region = union_rect(region, rect)
+        return region
+
+    def _fixed_bytes(self):
+        """Memory held for the whole render (see memory.fixed_bytes)"""
+        outputs, layers = [], []
+        for node in self.nodes:
+            reads = [tile.read_rect for tile in node.region.tiles(0, self.shape)]
+            outputs.extend(reads)
+            if node.stage.intensity_linear:
+                layers.extend(reads)
+        return fixed_bytes(self.shape, self._color_rect(), outputs, layers)
+
+    def _largest_tile(self, node):
+        """Predicted peak of a node's most expensive tile"""
+        return max(tile_bytes(node.region, tile.read_rect) for tile in node.region.tiles(0, self.shape))
+
+    def _fit_budget(self):
+        """Split tiles that would not fit in the budget, or reject the render"""
+        budget = self.memory_budget
+        footprints = {node.stage.name: node.region.rects(self.shape) for node in self.nodes}
+
+        # Smaller tiles cache a little more (overlapping halos), which can
+        # push other tiles over; a few passes settle it
+        for _ in range(BUDGET_PASSES):
+            available = budget - self._fixed_bytes()
+            if available <= 0:
+                raise MemoryBudgetError(
+                    f"Render holds {format_bytes(budget - available)} for its output frame, color planes "
+                    f"and cached tiles, more than the {format_bytes(budget)} budget")
+            split = False
+            for node in self.nodes:
+                region = node.region
+                if self._largest_tile(node) <= available:
+                    continue
+
+                rects = None
+                if node.stage.tileable:
+                    rects = fit_rects(footprints[node.stage.name], region.halo, region.memory, available,
+                                      region.align)
+                if rects is None:
+                    raise MemoryBudgetError(
+                        f"Stage '{node.stage.name}' needs {format_bytes(self._largest_tile(node))} per tile, "
+                        f"only {format_bytes(available)} of the {format_bytes(budget)} budget is left")
+                node.region = RegionStage(region.name, None, region.run, region.halo, region.align,
+                                          rects=rects, memory=region.memory)
+                split = True
+            if not split:
+                self.tile_budget = available
+                return
+
+        raise MemoryBudgetError(f"Render does not fit in the {format_bytes(budget)} memory budget")
+
+    def predicted_bytes(self):
+        """
+        Predicted peak memory of the render
+
+        Returns:
+            Bytes held for the whole render plus the largest tile
+        """
+        largest = max((self._largest_tile(node) for node in self.nodes), default=0)
+        return self._fixed_bytes() + largest
+
+    def _refresh_cache(self):
+        """
+        Bring the cache entries up to date with the nodes' keys
+
+        Done when the graph runs (a graph built only for predictions must
+        not touch the cache). Entries whose key changed start fresh, and
+        the stale tiles' buffers go back to the arena for this render to
+        reuse, unless the node can keep or patch them (see _keep_tiles and
+        _patch_plan). Sets each node's changed rectangles.
+        """
+        outputs = self.cache.setdefault('outputs', {})
+        self.cache.setdefault('layers', {})
+        written = self.cache.setdefault('written', {})
+        active = {node.stage.name for node in self.nodes}
+        self.reverted = [rect for name in list(written) if name not in active for rect in written.pop(name)]
+        dirty = list(self.reverted)  # Where the live image may differ from the previous render
+
+        for node in self.nodes:
+            stage = node.stage
+            stale = outputs.get(stage.name)
+            rects = node.region.rects(self.shape)
+            # Cached tiles are only what the previous render showed if the
+            # stage ran in it
+            previous = written.get(stage.name)
+            written[stage.name] = rects
+            node.patches = {}
+            node.changed = self._update_entries(node, stale, previous, dirty)
+            dirty.extend(node.changed)
+
+    def _update_entries(self, node, stale, previous, dirty):
+        """
+        Update one node's cache entries
+
+        Args:
+            node: GraphNode
+            stale: (key, tiles) output entry from an earlier render, or None
+            previous: Rectangles the stage wrote in the previous render,
+                or None if it did not run
+            dirty: Rectangles where the earlier stages' outputs changed
+
+        Returns:
+            Rectangles where the node's output may differ from the previous
+            render
+        """
+        stage = node.stage
+        outputs, layers = self.cache['outputs'], self.cache['layers']
+        rects = node.region.rects(self.shape)
+        if previous is None:
+            previous, stale = [], None
+
+        if stale is not None and stale[0] == node.key:
+            return []
+
+        if stale is not None and stage.tile_params is not None and node.layer_key is None:
+            kept = self._keep_tiles(node, stale)
+            if kept is not None:
+                outputs[stage.name] = (node.key, kept)
+                unchanged = [tile.write_rect for tile in node.region.tiles(0, self.shape)
+                             if tile.read_rect in kept]
+                return merge_rects(rect for rect in previous + rects if rect not in unchanged)
+
+        plan = self._patch_plan(node, stale, dirty)
+        if plan is not None:
+            # Same parameters, new input: keep the tiles this render still
+            # uses and recompute only around the changes
+            node.patches = plan
+            entries = [(outputs, node.key)]
+            if node.layer_key is not None:
+                entries.append((layers, node.layer_key))
+            for entry, node_key in entries:
+                tiles = entry[stage.name][1]
+                for rect in [rect for rect in tiles if rect not in plan]:
+                    self.buffers.give(tiles.pop(rect))
+                entry[stage.name] = (node_key, tiles)
+            if node.layer_key is not None:
+                # Patching needs the layer; tiles without one run again
+                tiles, layer_tiles = outputs[stage.name][1], layers[stage.name][1]
+                for rect in [rect for rect in tiles if rect not in layer_tiles]:
+                    self.buffers.give(tiles.pop(rect))
+            return merge_rects(write for patches in plan.values() for _, write in patches)
+
+        for entry, node_key in ((outputs, node.key), (layers, node.layer_key)):
+            stale_entry = entry.get(stage.name)
+            if node_key is not None and (stale_entry is None or stale_entry[0] != node_key):
+                if stale_entry is not None:
+                    self.buffers.give(*stale_entry[1].values())
+                entry[stage.name] = (node_key, {})
+        return merge_rects(previous + rects)
+
+    def _keep_tiles(self, node, stale):
+        """
+        Cached tiles of a node that its new parameters leave as they were
+
+        For stages declaring tile_params: with the same input, a tile is
+        kept when the parameters it depends on did not change.
+
+        Args:
+            node: GraphNode whose output key changed
+            stale: (key, tiles) output entry from the previous render
+
+        Returns:
+            Dictionary of kept tiles (the others go back to the arena), or
+            None if the input changed
+        """
+        params, input_key = node.key
+        stale_params, stale_input = stale[0]
+        if stale_input != input_key:
+            return None
+        tile_params = node.stage.tile_params
+        values, stale_values = dict(params), dict(stale_params)
+        tiles = stale[1]
+        kept = {}
+        for tile in node.region.tiles(0, self.shape):
+            rect = tile.read_rect
+            if rect in tiles and tile_params(values, rect) == tile_params(stale_values, rect):
+                kept[rect] = tiles.pop(rect)
+        self.buffers.give(*tiles.values())
+        return kept
+
+    def _patch_plan(self, node, stale, dirty):
+        """
+        Parts of a node's cached tiles that a changed input invalidates
+
+        Possible when only the input changed (same parameters) and the
+        stage is tileable, so a patch computes the same pixels a whole tile
+        would. A patch covers the dirty rectangles grown by the halo,
+        within the tile's write rectangle, and reads the halo around that.
+
+        Args:
+            node: GraphNode whose output key changed
+            stale: (key, tiles) output entry from the previous render, or
+                None
+            dirty: Rectangles where the node's input may have changed
+
+        Returns:
+            Dictionary of tile read rect -> list of (patch read rect, patch
+            write rect), or None if the tiles must be recomputed
+        """
+        stage = node.stage
+        if stale is None or not stage.tileable or stale[0][0] != node.key[0]:
+            return None
+        if node.layer_key is not None:
+            stale_layers = self.cache['layers'].get(stage.name)
+            if stale_layers is None or stale_layers[0] != (node.layer_key[0], stale[0][1]):
+                return None
+
+        halo = node.region.halo
+        plan = {}
+        for tile in node.region.tiles(0, self.shape):
+            rects = [intersect_rect(expand_rect(rect, halo, self.shape), tile.write_rect) for rect in dirty]
+            rects = [rect for rect in rects if rect is not None]
+            if stage.align:
+                rects = [align_rect(rect, self.shape) for rect in rects]
+            plan[tile.read_rect] = [(expand_rect(rect, halo, self.shape), rect) for rect in merge_rects(rects)]
+        return plan
+
+    def _run_tile(self, node, roi, rect):
+        """Run one tile of a node, using cached outputs and layers"""
+        if self.meter is not None:
+            with self.meter.track(node.stage.name):
+                return self._run_tile_cached(node, roi, rect)
+        return self._run_tile_cached(node, roi, rect)
+
+    def _run_tile_cached(self, node, roi, rect):
+        """Tile body: cached output, re-blended layer or a fresh run"""
+        stage = node.stage
+        outputs = self.cache['outputs'][stage.name][1]
+        if rect in outputs:
+            patches = node.patches.get(rect)
+            if patches:
+                self._patch_tile(node, roi, rect, outputs[rect], patches)
+                node.counts['patched'] += 1
+            else:
+                node.counts['cached'] += 1
+            return outputs[rect]
+
+        if stage.intensity_linear:
+            layers = self.cache['layers'][stage.name][1]
+            if rect in layers:
+                node.counts['blended'] += 1
+            else:
+                layers[rect] = stage.prepare(roi, rect, node.inputs)
+                node.counts['computed'] += 1
+            result = stage.blend(roi, layers[rect], rect, node.inputs)
+        else:
+            result = stage.run(roi, rect, node.inputs)
+            node.counts['computed'] += 1
+
+        outputs[rect] = result
+        return result
+
+    def _patch_tile(self, node, roi, rect, output, patches):
+        """Recompute the parts of a cached tile whose input changed, in place"""
+        stage = node.stage
+        for read, write in patches:
+            part = crop(roi, offset_rect(read, rect))
+            target = offset_rect(write, rect)
+            if stage.intensity_linear:
+                layer = self.cache['layers'][stage.name][1][rect]
+                fresh = stage.prepare(part, read, node.inputs)
+                paste(layer, crop(fresh, offset_rect(write, read)), target)
+                self.buffers.give(fresh)
+                # Blending is per pixel: only the patched part needs it
+                result = stage.blend(crop(roi, target), crop(layer, target), write, node.inputs)
+                paste(output, result, target)
+            else:
+                result = stage.run(part, read, node.inputs)
+                paste(output, crop(result, offset_rect(write, read)), target)
+            self.buffers.give(result)
+
+    def run(self, parallel=True, out=None):
+        """
+        Render the original image through the graph
+
+        Args:
+            parallel: Run independent tiles on the stage thread pool
+            out: Array shaped like the image to render into, instead of a
+                new copy of the original
+
+        Returns:
+            Rendered image (out, if given)
+        """
+        if self.meter is not None:
+            with self.meter:
+                return self._run(False, out)
+        return self._run(parallel, out)
+
+    def _run(self, parallel, out):
+        """Render body"""
+        before = self.buffers.snapshot()
+        if out is None:
+            img = self.image_manager.get_original()
+        else:
+            img = out
+            img[...] = self.image_manager.original_image
+
+        self.base = self.cache.get('render_id')
+        # Cleared first: a failed run leaves the cache matching no render
+        self.cache['render_id'] = self.render_id = None
+        self._refresh_cache()
+
+        # Color conversions are shared by the stages that declare them
+        self.colors = ColorContext(img, self._color_rect(), buffers=self.buffers)
+        try:
+            result = run_region_stages(img, [node.region for node in self.nodes], parallel=parallel,
+                                       on_write=self.colors.invalidate, budget=self.tile_budget)
+        except BaseException:
+            # Patched entries already carry the new key; their tiles may not
+            for node in self.nodes:
+                if node.patches:
+                    for kind in ('outputs', 'layers'):
+                        stale = self.cache[kind].pop(node.stage.name, None)
+                        if stale is not None:
+                            self.buffers.give(*stale[1].values())
+            raise
+        finally:
+            self.colors.release()
+            self.allocations = allocations_since(before, self.buffers.snapshot())
+        self.cache['render_id'] = self.render_id = (os.getpid(), next(_render_ids))
+        return result
+
+    def write_rects(self):
+        """
+        Rectangles the render can change
+
+        Returns:
+            List of (x0, y0, x1, y1); outside them the output equals the
+            original image
+        """
+        return [rect for node in self.nodes for rect in node.region.rects(self.shape)]
+
+    def changes(self):
+        """
+        Where the last run's output differs from the previous render
+
+        Returns:
+            (base, render id, rects): the rectangles are relative to the
+            render identified by base (None: no previous render of this
+            cache, the rectangles cover every pixel that differs from the
+            original); render id identifies this run's output
+        """
+        rects = self.reverted + [rect for node in self.nodes for rect in node.changed or []]
+        return self.base, self.render_id, merge_rects(rects)
+
+    def report(self):
+        """
+        Per-stage summary of the last run
+
+        Returns:
+            List of dictionaries with 'stage', 'status', 'tiles', 'deps'
+            and tile counts; with memory tracking also 'peak_bytes' and
+            'predicted_bytes' (largest tile, measured and predicted)
+        """
+        rows = [{'stage': name, 'status': reason, 'tiles': 0, 'deps': []}
+                for name, reason in self.skipped]
+        for node in self.nodes:
+            counts = node.counts
+            if counts['computed']:
+                status = 'computed'
+            elif counts['patched']:
+                status = 'patched'
+            elif counts['blended']:
+                status = 'blended'
+            else:
+                status = 'cached'
+            row = dict(counts, stage=node.stage.name, status=status,
+                       tiles=len(node.region.rects(self.shape)),
+                       deps=[dep.stage.name for dep in node.deps])
+            if self.meter is not None:
+                row['peak_bytes'] = self.meter.peaks.get(node.stage.name, 0)
+                row['predicted_bytes'] = self._largest_tile(node)
+            rows.append(row)
+        order = {stage.name: stage.order for stage in registered_stages()}
+        return sorted(rows, key=lambda row: order.get(row['stage'], 0))
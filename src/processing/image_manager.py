@@ -1,8 +1,39 @@
 """
 Image state management for non-destructive editing
 """
-import cv2
-import numpy as np
+import hashlib
+import time
+
+LOAD_PHASES = ('read', 'decode', 'detect', 'masks')
+
+
+def decode_image(data, reduced_scale=1):
+    """
+    Decode encoded image bytes to a BGR array
+
+    Args:
+        data: Encoded image bytes
+        reduced_scale: 1, 2, 4 or 8; JPEGs are decoded directly at that
+            fraction of full size, which is much cheaper than resizing
+
+    Returns:
+        BGR image or None if decoding fails
+    """
+    # Imported lazily: the GUI creates an ImageManager before OpenCV loads
+    import cv2
+    import numpy as np
+
+    flags = {
+        1: cv2.IMREAD_COLOR,
+        2: cv2.IMREAD_REDUCED_COLOR_2,
+        4: cv2.IMREAD_REDUCED_COLOR_4,
+        8: cv2.IMREAD_REDUCED_COLOR_8
+    }[reduced_scale]
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+
+
+class LoadCancelled(Exception):
+    """Raised by ImageManager.load_image when its load was cancelled"""
 
 
 class ImageManager:
@@ -15,21 +46,110 @@ class ImageManager:
         self.blemish_points = []  # List of (x, y) blemish coordinates
         self.face_landmarks = None  # MediaPipe landmarks
         self.face_masks = {}  # Precomputed masks
+        self.feathered_masks = {}  # Render-time masks derived from face_masks
+        self.stage_cache = {}  # Render graph masks, footprints and tile outputs
+        self._buffers = None  # BufferArena for renders of images of this shape
+        self._image_hash = (None, None)  # (image the digest belongs to, digest)
+        self.render_rects = []  # Where working_image may differ from the original (None: anywhere)
+        self.changed_rects = None  # Where working_image changed since take_changes() (None: anywhere)
+        self.working_render = None  # Render id (RenderGraph.changes) working_image holds
 
-    def load_image(self, path):
+    def load_image(self, path, face_detector=None, mask_generator=None, progress=None, cancelled=None,
+                   image=None):
         """
-        Load image from file
+        Load image from file and, with a detector, prepare its face data
+
+        Runs the phases in LOAD_PHASES order. After each phase progress is
+        called and cancelled is checked, so a load running on a background
+        thread reports as it goes and stops at the next phase boundary
+        once cancelled. original_image is set before the 'decode' report.
 
         Args:
             path: Path to image file
+            face_detector: FaceDetector; None stops after decoding
+            mask_generator: MaskGenerator (created if None)
+            progress: Optional callback(phase, seconds)
+            cancelled: Optional callable returning True to abandon the load
+            image: Already decoded image (e.g. prefetched); skips read and
+                decode
+
+        Returns:
+            Dictionary of seconds per phase
+
+        Raises:
+            ValueError: If the image cannot be decoded or has no face
+            LoadCancelled: If cancelled() returned True
+        """
+        timings = {}
+        mark = time.perf_counter()
+
+        def finish(phase):
+            nonlocal mark
+            now = time.perf_counter()
+            timings[phase] = now - mark
+            mark = now
+            if progress is not None:
+                progress(phase, timings[phase])
+            if cancelled is not None and cancelled():
+                raise LoadCancelled(path)
+
+        if cancelled is not None and cancelled():
+            raise LoadCancelled(path)
+
+        if image is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+            finish('read')
+            self.load_bytes(data)
+        else:
+            finish('read')
+            self.set_original(image)
+        if self.original_image is None:
+            raise ValueError(f"Failed to load image: {path}")
+        finish('decode')
+
+        if face_detector is None:
+            return timings
+
+        landmarks = face_detector.detect(self.original_image)
+        if landmarks is None:
+            raise ValueError("No face detected in image")
+        finish('detect')
+
+        if mask_generator is None:
+            from .mask_generator import MaskGenerator
+            mask_generator = MaskGenerator()
+        self.set_face_data(landmarks, mask_generator.generate_all_masks(landmarks, self.original_image.shape))
+        finish('masks')
+        return timings
+
+    def load_bytes(self, data):
+        """
+        Load image from encoded file contents
+
+        Args:
+            data: Encoded image bytes
         """
-        with open(path, 'rb') as f:
-            file_bytes = np.frombuffer(f.read(), dtype=np.uint8)
-            self.original_image = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
+        self.set_original(decode_image(data))
+
+    def set_original(self, image):
+        """
+        Start editing a new image
+
+        Args:
+            image: BGR image, or None
+        """
+        previous, self.original_image = self.original_image, image
 
         if self.original_image is not None:
             self.working_image = self.original_image.copy()
         self.blemish_points = []
+        self._clear_stage_cache()
+        if image is None or previous is None or image.shape != previous.shape:
+            self._buffers = None  # Differently sized tiles; start a new arena
+        self.render_rects = []
+        self.changed_rects = None
+        self.working_render = None
 
     def set_face_data(self, landmarks, masks):
         """
@@ -41,6 +161,32 @@ class ImageManager:
         """
         self.face_landmarks = landmarks
         self.face_masks = masks
+        self.feathered_masks = {}
+        self._clear_stage_cache()
+        self.render_rects = []
+        self.changed_rects = None
+
+    @property
+    def buffers(self):
+        """
+        BufferArena render stages borrow from (created on first use)
+
+        Kept while images of the same shape are loaded one after another
+        (video frames, batches), so their renders reuse each other's
+        buffers.
+        """
+        if self._buffers is None:
+            from ..utils.buffers import BufferArena
+            self._buffers = BufferArena()
+        return self._buffers
+
+    def _clear_stage_cache(self):
+        """Drop cached render state, returning tile buffers to the arena"""
+        if self._buffers is not None:
+            for kind in ('outputs', 'layers'):
+                for _, tiles in self.stage_cache.get(kind, {}).values():
+                    self._buffers.give(*tiles.values())
+        self.stage_cache = {}
 
     def add_blemish_point(self, x, y):
         """
@@ -63,17 +209,75 @@ class ImageManager:
             return self.original_image.copy()
         return None
 
-    def update_working(self, image):
+    def get_image_hash(self):
+        """
+        Content hash of the original pixels
+
+        Computed once per original image; assigning a new original_image
+        invalidates it.
+
+        Returns:
+            Hex SHA-256 digest or None if no image is loaded
+        """
+        image = self.original_image
+        if image is None:
+            return None
+        if self._image_hash[0] is not image:
+            digest = hashlib.sha256()
+            digest.update(f"{image.shape}|{image.dtype}".encode('ascii'))
+            digest.update(image.tobytes() if not image.flags['C_CONTIGUOUS'] else memoryview(image))
+            self._image_hash = (image, digest.hexdigest())
+        return self._image_hash[1]
+
+    def update_working(self, image, rects=None, changes=None):
         """
         Update working image with processed result
 
         Args:
             image: Processed image
+            rects: Rectangles outside which image equals the original
+                (None: unknown); lets viewers refresh only what changed
+            changes: RenderGraph.changes() of the render that produced
+                image; when it is relative to the current working image,
+                only the changed rectangles are copied
         """
-        self.working_image = image.copy()
+        if (changes is not None and changes[0] is not None and changes[0] == self.working_render
+                and self.working_image is not None and self.working_image.shape == image.shape):
+            # Viewers keep working_image by reference and see the update
+            for x0, y0, x1, y1 in changes[2]:
+                self.working_image[y0:y1, x0:x1] = image[y0:y1, x0:x1]
+            self._add_changes(list(changes[2]))
+        else:
+            self.working_image = image.copy()
+            if rects is None or self.render_rects is None:
+                self._add_changes(None)
+            else:
+                self._add_changes(self.render_rects + list(rects))
+        self.render_rects = None if rects is None else list(rects)
+        self.working_render = None if changes is None else changes[1]
+
+    def take_changes(self):
+        """
+        Rectangles where working_image changed since the last call
+
+        Returns:
+            List of (x0, y0, x1, y1), or None if anything may have changed
+        """
+        changes, self.changed_rects = self.changed_rects, []
+        return changes
+
+    def _add_changes(self, rects):
+        """Accumulate changed rectangles until take_changes()"""
+        if rects is None or self.changed_rects is None:
+            self.changed_rects = None
+        else:
+            self.changed_rects = self.changed_rects + rects
 
     def reset(self):
         """Reset all effects and return to original"""
         if self.original_image is not None:
             self.working_image = self.original_image.copy()
             self.blemish_points = []
+            self._add_changes(self.render_rects)
+            self.render_rects = []
+            self.working_render = None
@@ -0,0 +1,169 @@
+"""
+Image loading for scripts, services and the GUI's background loads
+"""
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ..utils.config import TWO_STAGE_MIN_PIXELS, TWO_STAGE_PREVIEW_SCALE
+from .face_detector import FaceDetector
+from .mask_generator import MaskGenerator
+from .image_manager import ImageManager, LoadCancelled, decode_image
+
+# Files this large are probably big photos: worth a reduced-scale decode
+TWO_STAGE_MIN_FILE_BYTES = 1024 * 1024
+
+
+def load_face_image(path, face_detector=None, mask_generator=None):
+    """
+    Load an image, detect the face and precompute masks
+
+    Args:
+        path: Path to image file
+        face_detector: FaceDetector to reuse (created if None)
+        mask_generator: MaskGenerator to reuse (created if None)
+
+    Returns:
+        ImageManager ready for apply_all_effects
+
+    Raises:
+        ValueError: If the image cannot be decoded or has no face
+    """
+    image_manager = ImageManager()
+    face_detector = face_detector or FaceDetector()
+
+    if os.path.getsize(path) < TWO_STAGE_MIN_FILE_BYTES:
+        image_manager.load_image(path, face_detector, mask_generator)
+        return image_manager
+
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    # Stage one of detection runs on a reduced decode while the full
+    # decode proceeds on another thread (both release the GIL)
+    preview_box = None
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        full_decode = pool.submit(image_manager.load_bytes, data)
+        preview = decode_image(data, TWO_STAGE_PREVIEW_SCALE)
+        if preview is not None and preview.size * TWO_STAGE_PREVIEW_SCALE ** 2 >= TWO_STAGE_MIN_PIXELS * 3:
+            preview_box = face_detector.locate_face(preview)
+        full_decode.result()
+
+    if image_manager.original_image is None:
+        raise ValueError(f"Failed to load image: {path}")
+
+    if preview_box is not None:
+        landmarks = face_detector.detect_in_box(image_manager.original_image, preview_box)
+        if landmarks is not None:
+            mask_generator = mask_generator or MaskGenerator()
+            masks = mask_generator.generate_all_masks(landmarks, image_manager.original_image.shape)
+            image_manager.set_face_data(landmarks, masks)
+            return image_manager
+
+    prepare_face_data(image_manager, face_detector, mask_generator)
+    return image_manager
+
+
+def prepare_face_data(image_manager, face_detector=None, mask_generator=None):
+    """
+    Detect the face in an already loaded image and store landmarks and masks
+
+    Args:
+        image_manager: ImageManager with original_image set
+        face_detector: FaceDetector to reuse (created if None)
+        mask_generator: MaskGenerator to reuse (created if None)
+
+    Raises:
+        ValueError: If no face is detected
+    """
+    face_detector = face_detector or FaceDetector()
+    mask_generator = mask_generator or MaskGenerator()
+
+    img = image_manager.original_image
+    landmarks = face_detector.detect(img)
+    if landmarks is None:
+        raise ValueError("No face detected in image")
+
+    masks = mask_generator.generate_all_masks(landmarks, img.shape)
+    image_manager.set_face_data(landmarks, masks)
+
+
+class LoadTask:
+    """
+    One ImageManager.load_image running on a background thread
+
+    The task loads into its own ImageManager, so the image being edited is
+    untouched until the caller adopts the result. Progress arrives as
+    events the caller collects with poll(): (phase, seconds) after each of
+    LOAD_PHASES, then exactly one of ('done', timings), ('error',
+    exception) or ('cancelled', None).
+    """
+
+    def __init__(self, path, face_detector, mask_generator, prefetched=None):
+        """
+        Describe a load (not started)
+
+        Args:
+            path: Image file
+            face_detector: FaceDetector; the executor running the task
+                must not run other detections at the same time
+            mask_generator: MaskGenerator
+            prefetched: Optional future resolving to the decoded image
+        """
+        self.path = path
+        self.face_detector = face_detector
+        self.mask_generator = mask_generator
+        self.prefetched = prefetched
+        self.image_manager = ImageManager()
+        self._events = queue.Queue()
+        self._cancelled = threading.Event()
+
+    def start(self, executor):
+        """
+        Queue the load
+
+        Args:
+            executor: Executor with a single worker, shared by all loads so
+                a new load waits for a cancelled one to reach a phase
+                boundary instead of running Face Mesh concurrently
+        """
+        executor.submit(self._run)
+
+    def _run(self):
+        """Worker thread body: never touches Tk"""
+        try:
+            image = self.prefetched.result() if self.prefetched is not None else None
+            timings = self.image_manager.load_image(
+                self.path, self.face_detector, self.mask_generator,
+                progress=lambda phase, seconds: self._events.put((phase, seconds)),
+                cancelled=self._cancelled.is_set, image=image)
+        except LoadCancelled:
+            self._events.put(('cancelled', None))
+        except Exception as e:
+            self._events.put(('error', e))
+        else:
+            self._events.put(('done', timings))
+
+    def cancel(self):
+        """Stop at the next phase boundary; pending events are discarded"""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        """Whether cancel() was called"""
+        return self._cancelled.is_set()
+
+    def poll(self):
+        """
+        Events since the last call
+
+        Returns:
+            List of (event, value)
+        """
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
@@ -12,7 +12,10 @@ from ..utils.constants import (
     RIGHT_CHEEK_CENTER,
     CHEEK_RADIUS_RATIO
 )
-from ..utils.image_utils import feather_mask
+from .feathering import feather_roi, analytic_ellipse_falloff
+
+CHEEK_BLUR_KERNEL = 51
+CHEEK_BLUR_SIGMA = 30
 
 
 class MaskGenerator:
@@ -63,7 +66,7 @@ class MaskGenerator:
 
         cv2.fillPoly(mask, [face_points], 255)
 
-        mask = feather_mask(mask, kernel_size=15)
+        mask = feather_roi(mask, kernel_size=15)
 
         return mask
 
@@ -106,23 +109,20 @@ class MaskGenerator:
 
         mask = cv2.erode(mask, kernel, iterations=1)
 
-        mask = feather_mask(mask, kernel_size=5)
+        mask = feather_roi(mask, kernel_size=5)
 
         return mask
 
-    def create_cheek_masks(self, landmarks, shape):
+    def cheek_ellipses(self, landmarks):
         """
-        Create cheek masks (left and right combined)
+        Cheek ellipses before blurring
 
         Args:
             landmarks: List of (x, y) coordinates
-            shape: Image shape
 
         Returns:
-            Binary mask of cheek regions
+            List of (center, (radius_h, radius_v)) for the left and right cheek
         """
-        mask = np.zeros(shape[:2], dtype=np.uint8)
-
         face_points = np.array([landmarks[i] for i in self.face_oval])
         face_width = np.max(face_points[:, 0]) - np.min(face_points[:, 0])
         face_height = np.max(face_points[:, 1]) - np.min(face_points[:, 1])
@@ -133,14 +133,28 @@ class MaskGenerator:
         left_cheek_pos = landmarks[self.left_cheek_center]
         right_cheek_pos = landmarks[self.right_cheek_center]
 
-        cv2.ellipse(mask, left_cheek_pos, (cheek_radius_h, cheek_radius_v),
-                   0, 0, 360, 255, -1)
-        cv2.ellipse(mask, right_cheek_pos, (cheek_radius_h, cheek_radius_v),
-                   0, 0, 360, 255, -1)
+        return [(left_cheek_pos, (cheek_radius_h, cheek_radius_v)),
+                (right_cheek_pos, (cheek_radius_h, cheek_radius_v))]
 
-        mask = cv2.GaussianBlur(mask, (51, 51), 30)
+    def create_cheek_masks(self, landmarks, shape):
+        """
+        Create cheek masks (left and right combined)
 
-        return mask
+        Args:
+            landmarks: List of (x, y) coordinates
+            shape: Image shape
+
+        Returns:
+            Soft mask of cheek regions
+        """
+        # Filled ellipses blurred by a 51x51, sigma 30 Gaussian, computed
+        # analytically inside the cheek ROI instead of blurring the frame
+        return analytic_ellipse_falloff(
+            shape,
+            self.cheek_ellipses(landmarks),
+            CHEEK_BLUR_KERNEL,
+            CHEEK_BLUR_SIGMA
+        )
 
     def create_eye_masks(self, landmarks, shape):
         """
@@ -0,0 +1,162 @@
+"""
+Memory accounting and budgets for renders
+
+Stages declare roughly how many bytes they allocate per pixel of a tile's
+read area (EffectStage.memory; e.g. float64 three-channel masks cost 24
+bytes per pixel each). Before a render, the render graph predicts each tile's
+peak from those figures plus what the render keeps for its whole duration
+(the output frame, shared color planes and cached tile outputs). With a
+budget set:
+
+- a tile that alone would exceed it is split into smaller tiles when its
+  stage allows it (EffectStage.tileable),
+- a wave whose tiles together would exceed it runs one tile at a time,
+- a render that cannot fit at all is rejected with MemoryBudgetError
+  before any stage runs.
+
+MemoryMeter measures what actually happened. NumPy reports its buffers
+to tracemalloc (including arrays OpenCV returns), so the traced peak
+while a tile runs is that tile's allocation peak; tiles run one at a time
+while the meter is active so peaks can be attributed to stages.
+"""
+import math
+import tracemalloc
+from contextlib import contextmanager
+
+from ..utils.regions import rect_area, split_rect
+
+FRAME_BYTES_PER_PIXEL = 3  # uint8 BGR output frame / cached tile output
+COLOR_BYTES_PER_PIXEL = 15  # ColorContext float32 BGR + uint8 HSV planes
+LAYER_BYTES_PER_PIXEL = 12  # Cached float32 BGR layer of an intensity-linear stage
+MIN_TILE = 64  # Smallest tile side worth splitting down to
+
+
+class MemoryBudgetError(MemoryError):
+    """Raised when a render cannot fit in the memory budget"""
+
+
+def tile_bytes(stage, rect):
+    """
+    Predicted transient peak of running one tile
+
+    Args:
+        stage: RegionStage (its memory is bytes per read pixel)
+        rect: The tile's read rectangle
+
+    Returns:
+        Bytes
+    """
+    return stage.memory * rect_area(rect)
+
+
+def fixed_bytes(shape, color_rect=None, outputs=(), layers=()):
+    """
+    Memory a render holds from start to finish
+
+    Args:
+        shape: Image shape
+        color_rect: Region of the shared color planes, or None
+        outputs: Read rectangles of every tile (their outputs are cached)
+        layers: Read rectangles of tiles whose layers are cached too
+
+    Returns:
+        Bytes
+    """
+    total = shape[0] * shape[1] * FRAME_BYTES_PER_PIXEL
+    if color_rect is not None:
+        total += rect_area(color_rect) * COLOR_BYTES_PER_PIXEL
+    total += sum(rect_area(rect) * FRAME_BYTES_PER_PIXEL for rect in outputs)
+    return total + sum(rect_area(rect) * LAYER_BYTES_PER_PIXEL for rect in layers)
+
+
+def fit_rects(rects, halo, memory, available, align=False):
+    """
+    Split write rectangles until every tile's predicted peak fits
+
+    Args:
+        rects: Write rectangles of a stage
+        halo: Pixels read around each rectangle
+        memory: Bytes per read pixel
+        available: Bytes one tile may use
+        align: Stage keeps its ROIs on the 64-column grid
+            (regions.align_rect): tile widths are cut to a multiple of 64
+            and not evened out across the rectangle, so only the last
+            column of tiles may be narrower
+
+    Returns:
+        List of rectangles, or None if a tile cannot be made small enough
+    """
+    max_pixels = available // max(memory, 1)
+    fitted = []
+    for rect in rects:
+        w, h = rect[2] - rect[0], rect[3] - rect[1]
+        if (w + 2 * halo) * (h + 2 * halo) <= max_pixels:
+            fitted.append(rect)
+            continue
+
+        side = int(math.isqrt(int(max_pixels))) - 2 * halo
+        tile_w = side // 64 * 64 if align else side
+        if tile_w < MIN_TILE:
+            return None
+        tile_h = int(max_pixels // (tile_w + 2 * halo)) - 2 * halo
+        if tile_h < 1:
+            return None
+
+        # Even out the tiles instead of leaving slivers at the far edges
+        if not align:
+            tile_w = math.ceil(w / math.ceil(w / tile_w))
+        tile_h = math.ceil(h / math.ceil(h / tile_h))
+        fitted.extend(split_rect(rect, tile_w, tile_h))
+    return fitted
+
+
+def format_bytes(size):
+    """Human readable byte count"""
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024.0
+    return f"{size:.1f} GB"
+
+
+class MemoryMeter:
+    """Peak traced allocations per stage during a render"""
+
+    def __init__(self):
+        self.peaks = {}  # Stage name -> peak bytes of its largest tile
+        self.total = 0  # Peak of the whole render
+        self._started = False
+        self._base = 0
+
+    def __enter__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        tracemalloc.reset_peak()
+        self._base = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, *exc):
+        self.total = max(self.total, tracemalloc.get_traced_memory()[1] - self._base)
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    @contextmanager
+    def track(self, name):
+        """
+        Attribute the allocations of a block to a stage
+
+        Args:
+            name: Stage name
+        """
+        # reset_peak() forgets the render's peak so far; fold it in first
+        current, peak = tracemalloc.get_traced_memory()
+        self.total = max(self.total, peak - self._base)
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            self.peaks[name] = max(self.peaks.get(name, 0), peak - current)
+            self.total = max(self.total, peak - self._base)
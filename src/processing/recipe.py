@@ -0,0 +1,106 @@
+"""
+Recipes: the full set of edit settings for one render
+
+A recipe is the ControlPanel.get_values() dictionary plus the list of
+blemish points, so it can be sent over the wire or stored as JSON.
+auto_blemish (0: off, otherwise the detection sensitivity) adds up to
+auto_blemish_max automatically detected spots to those points.
+"""
+from ..utils.config import SLIDER_MIN, SLIDER_MAX, BLEMISH_AUTO_MAX_SPOTS
+
+SLIDER_KEYS = ('smoothing', 'lipstick', 'blush', 'sharpening')
+
+RECIPE_DEFAULTS = {
+    'smoothing': 0,
+    'lipstick': 0,
+    'lipstick_color': 'red',
+    'blush': 0,
+    'blush_color': 'pink',
+    'sharpening': 0,
+    'blemish_points': [],
+    'auto_blemish': 0,
+    'auto_blemish_max': BLEMISH_AUTO_MAX_SPOTS
+}
+
+# Keys that choose blemish points rather than slider values
+BLEMISH_KEYS = ('blemish_points', 'auto_blemish', 'auto_blemish_max')
+
+
+def _to_int(value, key):
+    """int(value), with a ValueError naming the key for anything that is not a number"""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"{key} must be a number: {value!r}")
+    try:
+        return int(value)
+    except (ValueError, OverflowError):
+        raise ValueError(f"{key} must be a number: {value!r}") from None
+
+
+def _normalize_color(color, key):
+    """Color name stays a string; JSON lists become (B,G,R) tuples"""
+    if isinstance(color, (list, tuple)):
+        if len(color) != 3:
+            raise ValueError(f"Color must have 3 components: {color}")
+        return tuple(_to_int(c, key) for c in color)
+    if not isinstance(color, str):
+        raise ValueError(f"{key} must be a color name or (B, G, R): {color!r}")
+    return color
+
+
+def normalize_recipe(recipe):
+    """
+    Fill defaults and coerce types of a recipe
+
+    Args:
+        recipe: Dictionary with any of the RECIPE_DEFAULTS keys
+
+    Returns:
+        New recipe dictionary with every key present
+
+    Raises:
+        ValueError: On malformed values
+    """
+    recipe = recipe or {}
+    if not isinstance(recipe, dict):
+        raise ValueError(f"Recipe must be an object, not {type(recipe).__name__}")
+    unknown = set(recipe) - set(RECIPE_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown recipe keys: {', '.join(sorted(unknown))}")
+
+    normalized = {}
+    for key in SLIDER_KEYS:
+        value = _to_int(recipe.get(key, RECIPE_DEFAULTS[key]), key)
+        normalized[key] = max(SLIDER_MIN, min(SLIDER_MAX, value))
+
+    for key in ('lipstick_color', 'blush_color'):
+        normalized[key] = _normalize_color(recipe.get(key, RECIPE_DEFAULTS[key]), key)
+
+    blemish_points = recipe.get('blemish_points', [])
+    if not isinstance(blemish_points, (list, tuple)):
+        raise ValueError(f"blemish_points must be a list of (x, y): {blemish_points!r}")
+    points = []
+    for point in blemish_points:
+        if not isinstance(point, (list, tuple)) or len(point) != 2:
+            raise ValueError(f"Blemish point must be (x, y): {point!r}")
+        points.append((_to_int(point[0], 'blemish_points'), _to_int(point[1], 'blemish_points')))
+    normalized['blemish_points'] = points
+
+    normalized['auto_blemish'] = max(SLIDER_MIN, min(SLIDER_MAX, _to_int(
+        recipe.get('auto_blemish', RECIPE_DEFAULTS['auto_blemish']), 'auto_blemish')))
+    normalized['auto_blemish_max'] = max(0, _to_int(
+        recipe.get('auto_blemish_max', RECIPE_DEFAULTS['auto_blemish_max']), 'auto_blemish_max'))
+
+    return normalized
+
+
+def slider_values(recipe):
+    """
+    Slider dictionary in the ControlPanel.get_values() format
+
+    Args:
+        recipe: Normalized recipe
+
+    Returns:
+        Dictionary accepted by apply_all_effects
+    """
+    return {key: value for key, value in recipe.items() if key not in BLEMISH_KEYS}
@@ -0,0 +1,223 @@
+"""
+Content-addressed disk cache for final renders
+
+Entries are keyed by the hash of the original pixels, the normalized recipe
+(sliders, colors, blemish points in order) and PIPELINE_VERSION, and stored as
+raw .npy arrays so a hit costs a single file read with no image decoding.
+Writes are atomic (temp file + rename) and the directory is kept under a
+byte budget by evicting the least recently used entries.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from ..utils.config import PIPELINE_VERSION, RENDER_CACHE_MAX_BYTES
+from .filters import apply_all_effects, set_blemish_points
+from .recipe import normalize_recipe, slider_values
+
+ENTRY_SUFFIX = '.npy'
+
+
+def recipe_key(recipe):
+    """
+    Canonical JSON text of a recipe for hashing
+
+    Blemish points keep their order: spots are inpainted one after the
+    other, so overlapping spots given in another order render differently.
+
+    Args:
+        recipe: Recipe dictionary (normalized or not)
+
+    Returns:
+        Stable string representation
+    """
+    recipe = normalize_recipe(recipe)
+    return json.dumps(recipe, sort_keys=True, separators=(',', ':'))
+
+
+class RenderCache:
+    """Size-bounded LRU cache of rendered images on disk"""
+
+    def __init__(self, directory, max_bytes=RENDER_CACHE_MAX_BYTES):
+        """
+        Open (and create) a cache directory
+
+        Args:
+            directory: Cache directory, may be shared between processes
+            max_bytes: Total size budget for cached entries
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+        self._total_bytes = sum(size for _, size, _ in self._scan())
+
+    def key(self, image_hash, recipe):
+        """
+        Cache key for an image and recipe
+
+        Args:
+            image_hash: ImageManager.get_image_hash() of the original
+            recipe: Recipe dictionary
+
+        Returns:
+            Hex digest
+        """
+        digest = hashlib.sha256()
+        digest.update(f"v{PIPELINE_VERSION}|{image_hash}|".encode('ascii'))
+        digest.update(recipe_key(recipe).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        """Entry path; two-level fan-out keeps directories small"""
+        return os.path.join(self.directory, key[:2], key + ENTRY_SUFFIX)
+
+    def get(self, key):
+        """
+        Look up an entry
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached image or None on a miss
+        """
+        path = self._path(key)
+        try:
+            image = np.load(path, allow_pickle=False)
+        except (FileNotFoundError, ValueError, OSError):
+            with self._lock:
+                self.stats['misses'] += 1
+            return None
+
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        with self._lock:
+            self.stats['hits'] += 1
+        return image
+
+    def put(self, key, image):
+        """
+        Store an entry atomically and evict old entries if over budget
+
+        Args:
+            key: Cache key
+            image: Rendered image
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, np.ascontiguousarray(image), allow_pickle=False)
+            size = os.path.getsize(tmp_path)
+            try:
+                replaced = os.path.getsize(path)  # Overwriting an entry frees its bytes
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        with self._lock:
+            self.stats['writes'] += 1
+            self._total_bytes += size - replaced
+            over_budget = self._total_bytes > self.max_bytes
+
+        if over_budget:
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until under budget"""
+        entries = sorted(self._scan(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass  # Another process got there first
+            total -= size
+            evicted += 1
+
+        with self._lock:
+            self._total_bytes = total
+            self.stats['evictions'] += evicted
+
+    def _scan(self):
+        """
+        All cache entries
+
+        Returns:
+            List of (path, size, mtime)
+        """
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(ENTRY_SUFFIX):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((path, st.st_size, st.st_mtime))
+        return entries
+
+    def snapshot(self):
+        """
+        Hit/miss statistics and current size
+
+        Returns:
+            Dictionary of counters plus 'bytes' and 'hit_rate'
+        """
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return dict(self.stats, bytes=self._total_bytes,
+                        hit_rate=self.stats['hits'] / lookups if lookups else 0.0)
+
+
+def render_cached(image_manager, recipe, cache):
+    """
+    apply_all_effects through a RenderCache
+
+    Args:
+        image_manager: ImageManager with original image and face data
+        recipe: Recipe dictionary; its blemish points replace the manager's
+        cache: RenderCache, or None to always render
+
+    Returns:
+        (image, hit) where hit is True if served from the cache
+    """
+    recipe = normalize_recipe(recipe)
+    image_manager.blemish_points = list(recipe['blemish_points'])
+
+    key = None
+    if cache is not None:
+        key = cache.key(image_manager.get_image_hash(), recipe)
+        image = cache.get(key)
+        if image is not None:
+            image_manager.update_working(image)
+            return image, True
+
+    # Detected spots depend only on the image and the recipe, so a hit
+    # skips detection too
+    set_blemish_points(image_manager, recipe)
+    image = apply_all_effects(image_manager, slider_values(recipe))
+
+    if cache is not None:
+        cache.put(key, image)
+    return image, False
@@ -0,0 +1,360 @@
+"""
+Out-of-process render engine
+
+The GUI process keeps the Tk event loop; renders run in a separate
+process so NumPy and pure-Python stage code never hold the GUI's GIL.
+Frames never cross the process boundary by pickling: the original image,
+the face masks, the landmarks and the output frame live in
+multiprocessing.shared_memory blocks, and only their handles (name, shape,
+dtype) and the recipe are sent over the pipe.
+
+The engine process is started once and kept across image loads; loading
+an image only swaps the shared blocks it is attached to, so its stage
+cache and imported modules stay warm.
+"""
+import multiprocessing as mp
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+MASK_NAMES = ('face', 'lips', 'cheeks', 'eyes')
+
+
+class RenderEngineError(RuntimeError):
+    """Raised when the render process reports an error or dies"""
+
+
+def _attach_block(name):
+    """
+    Open an existing shared memory block without tracking it
+
+    Only the creating side may unlink a block. Before Python 3.13 opening
+    one registers it with this process's resource tracker, which then
+    warns about a leak (or unlinks it) when this process exits. An
+    unregister afterwards is no fix: a spawned child shares its parent's
+    tracker, so it would drop the creator's registration instead.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class SharedArray:
+    """NumPy array backed by a shared memory block"""
+
+    def __init__(self, shape, dtype, name=None):
+        """
+        Create a block, or attach to an existing one by name
+
+        Args:
+            shape: Array shape
+            dtype: Array dtype
+            name: Existing block name (None creates a new block)
+        """
+        dtype = np.dtype(dtype)
+        size = max(1, int(np.prod(shape)) * dtype.itemsize)
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = _attach_block(name)
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf)
+
+    @classmethod
+    def copy_of(cls, array):
+        """New block holding a copy of array"""
+        shared = cls(array.shape, array.dtype)
+        shared.array[...] = array
+        return shared
+
+    @classmethod
+    def attach(cls, handle):
+        """Attach to a block described by handle()"""
+        name, shape, dtype = handle
+        return cls(shape, dtype, name)
+
+    def handle(self):
+        """Picklable (name, shape, dtype) description"""
+        return (self.shm.name, self.array.shape, self.array.dtype.str)
+
+    def close(self):
+        """Detach, and free the block if this side created it"""
+        self.array = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _engine_main(conn):
+    """
+    Render process body: serve load/render requests until told to stop
+
+    Args:
+        conn: Pipe connection to the GUI process
+    """
+    from .image_manager import ImageManager
+    from .filters import build_render_graph
+    from .resources import plan_resources, configure_process
+    from ..utils.profiler import SamplingProfiler
+
+    configure_process(plan_resources('gui'))
+
+    frames = {}
+    image_manager = None
+    profiler = SamplingProfiler(gated=True)  # Not while idle in conn.recv below
+
+    def detach():
+        for frame in frames.values():
+            frame.close()
+        frames.clear()
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+
+        op = message['op']
+        if op == 'close':
+            break
+
+        start = time.perf_counter()
+        try:
+            if op == 'load':
+                detach()
+                image_manager = None
+                for key, handle in message['frames'].items():
+                    frames[key] = SharedArray.attach(handle)
+
+                image_manager = ImageManager()
+                image_manager.original_image = frames['image'].array
+                image_manager.working_image = frames['image'].array
+                image_manager.set_face_data(
+                    [tuple(point) for point in frames['landmarks'].array.tolist()],
+                    {name: frames[name].array for name in MASK_NAMES}
+                )
+                reply = {'ok': True}
+
+            elif op == 'render':
+                if image_manager is None:
+                    raise RuntimeError("No image loaded")
+                with profiler.recording():
+                    image_manager.blemish_points = [tuple(p) for p in message['blemish_points']]
+                    graph = build_render_graph(image_manager, message['values'])
+                    graph.run(out=frames['output'].array)
+                reply = {'ok': True, 'report': graph.report(), 'rects': graph.write_rects(),
+                         'changes': graph.changes(), 'allocations': graph.allocations}
+
+            elif op == 'profile':
+                reply = {'ok': True}
+                if message['enabled']:
+                    profiler.clear()
+                    profiler.start()
+                else:
+                    reply['counts'] = dict(profiler.stop())
+
+            else:
+                raise ValueError(f"Unknown request: {op}")
+
+        except Exception as e:
+            reply = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+
+        reply['id'] = message.get('id')
+        reply['ms'] = (time.perf_counter() - start) * 1000.0
+        conn.send(reply)
+
+    detach()
+    conn.close()
+
+
+class RenderEngine:
+    """GUI-side handle to the render process"""
+
+    def __init__(self, start_method='spawn'):
+        """
+        Start the render process
+
+        Args:
+            start_method: multiprocessing start method; 'spawn' avoids
+                forking a process that already runs Tk
+        """
+        self._context = mp.get_context(start_method)
+        self._process = None
+        self._conn = None
+        self._frames = {}
+        self._loaded = None  # ImageManager whose frames are shared
+        self._next_id = 0
+        self._pending = None  # Id of the render in flight
+        self.last_reply = None
+        self._start()
+
+    def _start(self):
+        """Launch (or relaunch) the process"""
+        parent, child = self._context.Pipe()
+        self._process = self._context.Process(target=_engine_main, args=(child,),
+                                              name='render-engine', daemon=True)
+        self._process.start()
+        child.close()
+        self._conn = parent
+        self._pending = None
+
+    @property
+    def busy(self):
+        """True while a submitted render has not been collected"""
+        return self._pending is not None
+
+    def load(self, image_manager):
+        """
+        Share a newly loaded image and its face data with the engine
+
+        Args:
+            image_manager: ImageManager with original image, masks and landmarks
+        """
+        if self._pending is not None:
+            try:
+                self._wait(self._pending)  # Drop the stale render
+            except RenderEngineError:
+                pass  # Its error belongs to the image being replaced
+
+        frames = {'image': SharedArray.copy_of(image_manager.original_image),
+                  'output': SharedArray(image_manager.original_image.shape, np.uint8),
+                  'landmarks': SharedArray.copy_of(np.asarray(image_manager.face_landmarks, dtype=np.int32))}
+        for name in MASK_NAMES:
+            frames[name] = SharedArray.copy_of(image_manager.face_masks[name])
+
+        try:
+            self._request({'op': 'load', 'frames': {k: f.handle() for k, f in frames.items()}})
+        except RenderEngineError:
+            for frame in frames.values():
+                frame.close()
+            raise
+
+        # The engine has detached from the previous blocks
+        for frame in self._frames.values():
+            frame.close()
+        self._frames = frames
+        self._loaded = image_manager
+
+    def submit(self, slider_values, blemish_points):
+        """
+        Start a render without waiting for it
+
+        Args:
+            slider_values: ControlPanel.get_values() dictionary
+            blemish_points: List of (x, y) coordinates
+        """
+        if self._pending is not None:
+            raise RenderEngineError("A render is already in progress")
+        self._pending = self._send({'op': 'render', 'values': dict(slider_values),
+                                    'blemish_points': [tuple(p) for p in blemish_points]})
+
+    def poll(self, timeout=0):
+        """
+        Collect the render started by submit()
+
+        Args:
+            timeout: Seconds to wait (None waits until done)
+
+        Returns:
+            Rendered image (a private copy), or None if not finished yet;
+            last_reply['rects'] bounds where it differs from the original
+            and last_reply['changes'] where it differs from the previous
+            render (see RenderGraph.changes)
+        """
+        if self._pending is None:
+            raise RenderEngineError("No render in progress")
+        if not self._conn.poll(timeout):
+            if not self._process.is_alive():
+                self._restart()
+                raise RenderEngineError("Render process exited")
+            return None
+        self._wait(self._pending)
+        return self._frames['output'].array.copy()
+
+    def render(self, slider_values, blemish_points):
+        """Render and wait for the result"""
+        self.submit(slider_values, blemish_points)
+        return self.poll(None)
+
+    def set_profiling(self, enabled):
+        """
+        Start or stop the sampling profiler inside the engine process
+
+        Args:
+            enabled: True to start (dropping earlier samples), False to stop
+
+        Returns:
+            Collapsed stack -> samples recorded since the start when
+            stopping, else None
+
+        Raises:
+            RenderEngineError: While a render is in progress
+        """
+        if self._pending is not None:
+            raise RenderEngineError("A render is in progress")
+        return self._request({'op': 'profile', 'enabled': enabled}).get('counts')
+
+    def close(self):
+        """Stop the process and free the shared blocks"""
+        if self._process is not None and self._process.is_alive():
+            try:
+                self._conn.send({'op': 'close'})
+            except (OSError, ValueError):
+                pass
+            self._process.join(timeout=5)
+        if self._conn is not None:
+            self._conn.close()
+        for frame in self._frames.values():
+            frame.close()
+        self._frames = {}
+        self._process = None
+
+    def _send(self, message):
+        """Send a request and return its id"""
+        self._next_id += 1
+        message['id'] = self._next_id
+        try:
+            self._conn.send(message)
+        except (OSError, ValueError):
+            self._restart()
+            raise RenderEngineError("Render process is not running")
+        return self._next_id
+
+    def _wait(self, request_id):
+        """Receive replies until the one for request_id"""
+        try:
+            while True:
+                reply = self._conn.recv()
+                if reply.get('id') == request_id:
+                    break
+        except (EOFError, OSError):
+            self._restart()
+            raise RenderEngineError("Render process exited")
+        finally:
+            if self._pending == request_id:
+                self._pending = None
+
+        self.last_reply = reply
+        if not reply['ok']:
+            raise RenderEngineError(reply['error'])
+        return reply
+
+    def _request(self, message):
+        """Send a request and wait for its reply"""
+        return self._wait(self._send(message))
+
+    def _restart(self):
+        """Replace a dead process; the current image is shared again on the next load"""
+        if self._conn is not None:
+            self._conn.close()
+        self._start()
+        if self._loaded is not None:
+            loaded, self._loaded = self._loaded, None
+            self.load(loaded)
@@ -0,0 +1,178 @@
+"""
+CPU resources: how many processes and threads each kind of run uses
+
+OpenCV's internal thread pool, the render scheduler's stage threads,
+thumbnail/load threads and worker processes all compete for the same
+cores; sized independently they oversubscribe them and throughput drops
+as workers are added. This module detects the cores this process may
+actually use (CPU affinity and the cgroup CPU quota, e.g. a container's
+--cpus) and derives one consistent plan per run:
+
+- 'gui': one render process; OpenCV and stage threads use every core,
+  gallery thumbnail decoding a few I/O threads next to it;
+- 'batch', 'video', 'service': several single-image processes; the cores
+  are divided between them, so OpenCV and stage threads shrink as
+  processes are added.
+
+configure_process() applies a plan inside the process that renders and
+logs the decision.
+"""
+import logging
+import math
+import os
+from collections import namedtuple
+
+from ..utils.config import CPU_LIMIT, STAGE_THREADS, THUMBNAIL_THREADS
+
+logger = logging.getLogger(__name__)
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+
+CpuTopology = namedtuple('CpuTopology', ['logical', 'affinity', 'quota', 'cpus'])
+
+ResourcePlan = namedtuple('ResourcePlan', ['role', 'processes', 'cv2_threads', 'stage_threads',
+                                           'io_threads', 'cpus'])
+
+ROLES = ('gui', 'batch', 'video', 'service')
+
+
+def _read(path):
+    """Stripped file contents, or None if it cannot be read"""
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _cgroup_paths():
+    """Controller list -> cgroup path of this process, from /proc/self/cgroup"""
+    paths = {}
+    for line in (_read('/proc/self/cgroup') or '').splitlines():
+        parts = line.split(':', 2)
+        if len(parts) == 3:
+            paths[parts[1]] = parts[2]
+    return paths
+
+
+def cgroup_cpu_quota():
+    """
+    CPU quota of this process's cgroup, in cores
+
+    Reads cpu.max (cgroup v2) or cpu.cfs_quota_us / cpu.cfs_period_us
+    (cgroup v1), at the process's own cgroup and at the mount root.
+
+    Returns:
+        Quota as a float (e.g. 1.5), or None if unlimited or unknown
+    """
+    paths = _cgroup_paths()
+
+    v2 = paths.get('', '/')
+    for directory in (os.path.join(CGROUP_ROOT, v2.lstrip('/')), CGROUP_ROOT):
+        value = _read(os.path.join(directory, 'cpu.max'))
+        if value:
+            quota, _, period = value.partition(' ')
+            if quota == 'max':
+                return None
+            return int(quota) / int(period or 100000)
+
+    v1 = next((path for controllers, path in paths.items() if 'cpu' in controllers.split(',')), '/')
+    for mount in ('cpu', 'cpu,cpuacct', 'cpuacct,cpu'):
+        for directory in (os.path.join(CGROUP_ROOT, mount, v1.lstrip('/')), os.path.join(CGROUP_ROOT, mount)):
+            quota = _read(os.path.join(directory, 'cpu.cfs_quota_us'))
+            period = _read(os.path.join(directory, 'cpu.cfs_period_us'))
+            if quota is not None and period:
+                return int(quota) / int(period) if int(quota) > 0 else None
+    return None
+
+
+def detect_topology():
+    """
+    Cores this process may use
+
+    Returns:
+        CpuTopology: logical CPUs of the machine, CPUs in this process's
+        affinity mask, the cgroup quota (None if unlimited) and cpus, the
+        usable whole cores (at least 1; CPU_LIMIT overrides)
+    """
+    logical = os.cpu_count() or 1
+    try:
+        affinity = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        affinity = logical
+    quota = cgroup_cpu_quota()
+
+    cpus = affinity
+    if quota is not None:
+        # A fractional quota is throttled, not shared: round down
+        cpus = min(cpus, max(1, math.floor(quota)))
+    if CPU_LIMIT:
+        cpus = min(cpus, CPU_LIMIT)
+    return CpuTopology(logical, affinity, quota, max(1, cpus))
+
+
+def plan_resources(role, processes=None, topology=None):
+    """
+    Decide processes and threads for a run
+
+    Args:
+        role: One of ROLES
+        processes: Worker processes requested (None: one per core; the
+            'gui' role always renders in one process)
+        topology: CpuTopology (detected if None)
+
+    Returns:
+        ResourcePlan; cv2_threads, stage_threads and io_threads are per
+        process
+
+    Raises:
+        ValueError: On an unknown role or a process count below 1
+    """
+    if role not in ROLES:
+        raise ValueError(f"Unknown role '{role}', expected one of {', '.join(ROLES)}")
+    if processes is not None and processes < 1:
+        raise ValueError(f"Need at least one process, got {processes}")
+
+    cpus = (topology or detect_topology()).cpus
+    if role == 'gui':
+        processes = 1
+    elif processes is None:
+        processes = cpus
+
+    per_process = max(1, cpus // processes)
+    return ResourcePlan(
+        role=role,
+        processes=processes,
+        cv2_threads=per_process,
+        stage_threads=min(STAGE_THREADS, per_process),
+        # Thumbnail decoding waits on disk as well as the CPU; worker
+        # processes read their inputs one at a time
+        io_threads=min(THUMBNAIL_THREADS, max(2, cpus)) if role == 'gui' else 1,
+        cpus=cpus
+    )
+
+
+def describe(plan):
+    """One-line summary of a plan"""
+    text = (f"{plan.role}: {plan.cpus} usable core(s), {plan.processes} process(es) x "
+            f"{plan.cv2_threads} OpenCV / {plan.stage_threads} stage / {plan.io_threads} I/O threads")
+    if plan.processes > plan.cpus:
+        text += " (oversubscribed)"
+    return text
+
+
+def configure_process(plan):
+    """
+    Apply a plan's per-process thread counts in the current process
+
+    Sets OpenCV's thread pool and the render scheduler's stage threads.
+
+    Args:
+        plan: ResourcePlan
+    """
+    import cv2
+    from .scheduler import set_stage_threads
+
+    cv2.setNumThreads(plan.cv2_threads)
+    set_stage_threads(plan.stage_threads)
+    logger.info("pid %d %s", os.getpid(), describe(plan))
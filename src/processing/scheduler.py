@@ -0,0 +1,215 @@
+"""
+Concurrent execution of effect stages that touch disjoint regions
+
+Lipstick, blush and sharpening each only change pixels under their own
+mask. A RegionStage describes such a stage by its footprint (the connected
+components of its mask) and its halo (how far outside a pixel it reads).
+The footprint is split into tiles; tiles whose regions do not depend on
+each other are grouped into waves, and each wave runs on a thread pool
+(OpenCV and large NumPy operations release the GIL). The result is
+identical to running the stages one after another on the full frame.
+"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from ..utils.config import STAGE_THREADS
+from ..utils.regions import (
+    component_rects, merge_rects, align_rect, expand_rect, intersect_rect,
+    union_rect, offset_rect, crop, paste
+)
+from .memory import tile_bytes
+
+Tile = namedtuple('Tile', ['stage', 'order', 'read_rect', 'write_rect'])
+
+_executor = None
+_stage_threads = STAGE_THREADS
+
+
+def _get_executor():
+    """Shared thread pool, created on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=_stage_threads, thread_name_prefix='stage')
+    return _executor
+
+
+def set_stage_threads(threads):
+    """
+    Resize the shared stage thread pool
+
+    Args:
+        threads: Threads for concurrent tiles; 1 runs every wave on the
+            calling thread
+    """
+    global _executor, _stage_threads
+    if threads == _stage_threads:
+        return
+    _stage_threads = max(1, threads)
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+class RegionStage:
+    """An effect stage that only changes pixels under a mask"""
+
+    def __init__(self, name, mask, run, halo=0, align=False, rects=None, memory=0):
+        """
+        Describe a stage
+
+        Args:
+            name: Stage name (for plans and reports)
+            mask: Mask whose non-zero pixels are the only ones the stage
+                changes (ignored when rects is given)
+            run: Callable run(image_roi, rect) returning the processed ROI;
+                rect is the ROI's position in the full frame, used to crop
+                masks the same way
+            halo: Pixels outside the mask the stage reads (e.g. blur radius)
+            align: Keep tile columns on the 64-pixel grid (needed for
+                bit-exact color conversions, see align_rect)
+            rects: Rectangles the stage changes, instead of a mask
+            memory: Bytes the stage allocates per pixel it reads
+                (see processing.memory)
+        """
+        self.name = name
+        self.mask = mask
+        self.run = run
+        self.halo = halo
+        self.align = align
+        self.memory = memory
+        self._footprint = rects
+        self._rects = None
+
+    def rects(self, shape):
+        """
+        Disjoint rectangles the stage writes (computed once)
+
+        Args:
+            shape: Image shape
+
+        Returns:
+            List of rectangles
+        """
+        if self._rects is None:
+            rects = self._footprint if self._footprint is not None else component_rects(self.mask)
+            if self.align:
+                rects = [align_rect(rect, shape) for rect in rects]
+            self._rects = merge_rects(rects)
+        return self._rects
+
+    def tiles(self, order, shape):
+        """
+        Split the footprint into independent tiles
+
+        Args:
+            order: Position of the stage in the pipeline
+            shape: Image shape
+
+        Returns:
+            List of Tile
+        """
+        return [Tile(self, order, expand_rect(rect, self.halo, shape), rect)
+                for rect in self.rects(shape)]
+
+
+def footprint(stages, shape):
+    """
+    Bounding rectangle of everything the stages write
+
+    Returns:
+        Rectangle or None if no stage writes anything
+    """
+    rect = None
+    for stage in stages:
+        for write_rect in stage.rects(shape):
+            rect = union_rect(rect, write_rect)
+    return rect
+
+
+def plan_waves(stages, shape):
+    """
+    Group tiles into waves that can run concurrently
+
+    A tile must run in a later wave than any earlier-stage tile whose output
+    it reads, and no earlier than any earlier-stage tile that reads pixels
+    it writes (tiles in one wave all read the image as it was before the
+    wave). Tiles of one stage all read the stage's input, so a tile whose
+    halo reaches into another tile of the same stage runs no earlier than
+    it.
+
+    Args:
+        stages: RegionStages in pipeline order
+        shape: Image shape
+
+    Returns:
+        List of waves, each a list of Tile in pipeline order
+    """
+    placed = []  # (tile, wave)
+    for order, stage in enumerate(stages):
+        new = []
+        for tile in stage.tiles(order, shape):
+            wave = 0
+            for other, other_wave in placed:
+                if intersect_rect(tile.read_rect, other.write_rect) is not None:
+                    wave = max(wave, other_wave + 1)
+                elif intersect_rect(other.read_rect, tile.write_rect) is not None:
+                    wave = max(wave, other_wave)
+            new.append((tile, wave))
+
+        # Never read what a sibling tile already wrote
+        changed = True
+        while changed:
+            changed = False
+            for i, (tile, wave) in enumerate(new):
+                for other, other_wave in new:
+                    if other_wave > wave and intersect_rect(other.read_rect, tile.write_rect) is not None:
+                        new[i] = (tile, other_wave)
+                        wave = other_wave
+                        changed = True
+        placed.extend(new)
+
+    waves = [[] for _ in range(max((w for _, w in placed), default=-1) + 1)]
+    for tile, wave in placed:
+        waves[wave].append(tile)
+    return waves
+
+
+def _run_tile(image, tile):
+    """Run one tile and return its output cropped to the write rect"""
+    read_rect = tile.read_rect
+    result = tile.stage.run(crop(image, read_rect), read_rect)
+    return crop(result, offset_rect(tile.write_rect, read_rect))
+
+
+def run_region_stages(image, stages, parallel=True, on_write=None, budget=None):
+    """
+    Apply region stages to an image
+
+    Args:
+        image: BGR image, modified in place
+        stages: RegionStages in pipeline order
+        parallel: Run the tiles of a wave on the thread pool
+        on_write: Optional callback(rect) after each tile is pasted, e.g.
+            ColorContext.invalidate
+        budget: Bytes the tiles of a wave may allocate together; waves
+            predicted to exceed it run one tile at a time
+
+    Returns:
+        The image
+    """
+    for wave in plan_waves(stages, image.shape):
+        concurrent = parallel and len(wave) > 1 and _stage_threads > 1
+        if concurrent and budget is not None:
+            concurrent = sum(tile_bytes(tile.stage, tile.read_rect) for tile in wave) <= budget
+
+        if concurrent:
+            results = list(_get_executor().map(lambda tile: _run_tile(image, tile), wave))
+        else:
+            results = [_run_tile(image, tile) for tile in wave]
+
+        # Paste only after the whole wave has read its input
+        for tile, result in zip(wave, results):
+            paste(image, result, tile.write_rect)
+            if on_write is not None:
+                on_write(tile.write_rect)
+    return image
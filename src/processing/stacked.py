@@ -0,0 +1,254 @@
+"""
+Stacked rendering of many same-sized portraits
+
+For dataset generation the per-image pipeline spends much of its time in
+Python and in per-call OpenCV dispatch on small tiles. Here images of one
+shape are stacked into an (N, H, W, 3) array with matching (N, H, W) mask
+stacks and rendered stage by stage. Each stage works on one rectangle for
+the whole stack: the union of its footprint over the images, aligned and
+grown by its halo the way the render graph tiles it. Within it
+
+- pixel-wise work (mask compositing, HSV saturation, overlay blends, the
+  unsharp-mask blend) runs once over the whole stack, viewed as one
+  (N * h, w, 3) image, through the same effect functions the pipeline
+  uses;
+- neighbourhood filters (inpainting, the bilateral filter, the sharpening
+  blur) cannot cross image borders and run per image.
+
+The result equals rendering each image with apply_all_effects.
+"""
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+from ..effects.registry import registered_stages
+from ..effects.blemish_removal import remove_multiple_blemishes
+from ..effects.smoothing import smoothing_params, smoothing_blend
+from ..effects.makeup import (
+    resolve_color, makeup_layer, composite, lipstick_alpha, blush_alpha,
+    LIPSTICK_SATURATION_BOOST, BLUSH_SATURATION_BOOST
+)
+from ..effects.sharpening import sharpen_layer, sharpen_blend
+from ..utils.buffers import NO_ARENA
+from ..utils.color_space import ColorView
+from ..utils.config import STACK_SIZE
+from ..utils.constants import LIPSTICK_COLORS, BLUSH_COLORS
+from ..utils.regions import mask_bbox, align_rect, expand_rect, union_rect, offset_rect, crop, paste
+from .graph import resolve_mask
+
+
+def iter_stacks(image_managers, size=STACK_SIZE):
+    """
+    Group loaded images into same-shape stacks
+
+    Args:
+        image_managers: ImageManagers with face data
+        size: Most images per stack
+
+    Yields:
+        Lists of ImageManager whose images share one shape, in input order
+        within each shape
+    """
+    groups = defaultdict(list)
+    for image_manager in image_managers:
+        groups[image_manager.original_image.shape].append(image_manager)
+    for group in groups.values():
+        for start in range(0, len(group), size):
+            yield group[start:start + size]
+
+
+def _rows(stack):
+    """(N, h, w, ...) stack as one (N * h, w, ...) image"""
+    return stack.reshape((-1,) + stack.shape[2:])
+
+
+def _crop(stack, rect):
+    """View of every image of a stack inside rect"""
+    x0, y0, x1, y1 = rect
+    return stack[:, y0:y1, x0:x1]
+
+
+class _StackRegion:
+    """Masks and per-image footprints of a stack inside a stage's read rectangle"""
+
+    def __init__(self, image_managers, stage, slider_values, rect, buffers):
+        self.image_managers = image_managers
+        self.stage = stage
+        self.slider_values = slider_values
+        self.rect = rect
+        self.buffers = buffers
+
+    def __call__(self, name):
+        """(N, h, w) stack of one named mask"""
+        x0, y0, x1, y1 = self.rect
+        return np.stack([resolve_mask(image_manager, name)[y0:y1, x0:x1]
+                         for image_manager in self.image_managers])
+
+    def image_rects(self):
+        """
+        Each image's own read and write rectangles, relative to the region
+
+        Neighbourhood filters run per image anyway; limiting them to the
+        image's own footprint skips the rest of the stack's union.
+
+        Yields:
+            (index, read rect, write rect) for images the stage changes
+        """
+        for i, image_manager in enumerate(self.image_managers):
+            shape = image_manager.original_image.shape
+            rects = stage_rects(self.stage, [image_manager], self.slider_values, shape)
+            if rects is not None:
+                read, write = rects
+                yield i, offset_rect(read, self.rect), offset_rect(write, self.rect)
+
+
+def _per_image(images, region, run):
+    """
+    Apply a neighbourhood filter to each image's own footprint
+
+    Pixels outside an image's footprint are left uninitialized; the
+    stage's mask is zero there, so its blend does not use them.
+
+    Args:
+        images: (N, h, w, 3) region of the stack
+        region: _StackRegion
+        run: run(image ROI) -> filtered ROI
+
+    Returns:
+        (N, h, w, 3) filtered stack
+    """
+    filtered = np.empty_like(images)
+    for i, read, write in region.image_rects():
+        paste(filtered[i], crop(run(crop(images[i], read)), offset_rect(write, read)), write)
+    return filtered
+
+
+def _blemish(images, region, values):
+    """Inpainting is per image"""
+    for i, image_manager in enumerate(region.image_managers):
+        if image_manager.blemish_points:
+            images[i] = remove_multiple_blemishes(images[i], image_manager.blemish_points)
+    return images
+
+
+def _smoothing(images, region, values):
+    """Bilateral filter per image, one blend over the stack"""
+    intensity = values['smoothing']
+    d, sigma_color, sigma_space = smoothing_params(intensity)
+    smoothed = _per_image(images, region, lambda roi: cv2.bilateralFilter(roi, d, sigma_color, sigma_space))
+    return smoothing_blend(_rows(images), _rows(smoothed), _rows(region('feathered_smooth')), intensity,
+                           region.buffers)
+
+
+def _makeup(images, mask, color, boost, alpha, buffers):
+    """Saturation boost, overlay and composite over the whole stack at once"""
+    rows = _rows(images)
+    colors = ColorView.of(rows)
+    layer = makeup_layer(colors, mask, color, boost, buffers)
+    result = composite(rows, layer, mask, alpha, colors.float32, buffers)
+    buffers.give(layer)
+    return result
+
+
+def _lipstick(images, region, values):
+    """Lipstick as one operation over the stack"""
+    return _makeup(images, _rows(region('feathered_lips')),
+                   resolve_color(values['lipstick_color'], LIPSTICK_COLORS, 'red'),
+                   LIPSTICK_SATURATION_BOOST, lipstick_alpha(values['lipstick']), region.buffers)
+
+
+def _blush(images, region, values):
+    """Blush as one operation over the stack"""
+    return _makeup(images, _rows(region('cheeks')),
+                   resolve_color(values['blush_color'], BLUSH_COLORS, 'pink'),
+                   BLUSH_SATURATION_BOOST, blush_alpha(values['blush']), region.buffers)
+
+
+def _sharpening(images, region, values):
+    """Blur per image, one unsharp-mask blend over the stack"""
+    blurred = _per_image(images, region, sharpen_layer)
+    return sharpen_blend(_rows(images), _rows(blurred), _rows(region('brows')), values['sharpening'],
+                         region.buffers)
+
+
+# Stage name -> render(images, region, values) returning the rendered
+# images (any shape holding the same pixels, e.g. _rows of the stack)
+STACK_STAGES = {
+    'blemish': _blemish,
+    'smoothing': _smoothing,
+    'lipstick': _lipstick,
+    'blush': _blush,
+    'sharpening': _sharpening
+}
+
+
+def stage_rects(stage, image_managers, slider_values, shape):
+    """
+    Rectangles a stage reads and writes for a whole stack
+
+    Args:
+        stage: EffectStage
+        image_managers: ImageManagers of the stack
+        slider_values: Slider dictionary
+        shape: Image shape
+
+    Returns:
+        (read rect, write rect), or None if the stage changes nothing in
+        any image; stages without a named footprint mask cover the frame
+    """
+    full = (0, 0, shape[1], shape[0])
+    if not isinstance(stage.footprint, str):
+        return full, full
+
+    write = None
+    for image_manager in image_managers:
+        write = union_rect(write, mask_bbox(resolve_mask(image_manager, stage.footprint)))
+    if write is None:
+        return None
+    if stage.align:
+        write = align_rect(write, shape)
+    return expand_rect(write, stage.halo_for(slider_values), shape), write
+
+
+def render_stack(image_managers, slider_values, buffers=NO_ARENA):
+    """
+    Render same-sized images together
+
+    Args:
+        image_managers: ImageManagers with face data whose original
+            images share one shape; each one's blemish points are used
+        slider_values: Slider dictionary applied to every image
+        buffers: BufferArena for stage temporaries; one arena shared by
+            successive stacks of the same size stops them allocating
+
+    Returns:
+        (N, H, W, 3) uint8 stack of rendered images, in input order
+
+    Raises:
+        ValueError: If the shapes differ or an active stage has no stacked
+            implementation
+    """
+    shapes = {image_manager.original_image.shape for image_manager in image_managers}
+    if len(shapes) != 1:
+        raise ValueError(f"Stacked images must share one shape, got {sorted(shapes)}")
+
+    images = np.stack([image_manager.original_image for image_manager in image_managers])
+    shape = images.shape[1:]
+    for stage in registered_stages():
+        if stage.is_noop(slider_values):
+            continue
+        render = STACK_STAGES.get(stage.name)
+        if render is None:
+            raise ValueError(f"Stage '{stage.name}' has no stacked implementation")
+        rects = stage_rects(stage, image_managers, slider_values, shape)
+        if rects is None:
+            continue
+
+        read, write = rects
+        region = np.ascontiguousarray(_crop(images, read))
+        result = render(region, _StackRegion(image_managers, stage, slider_values, read, buffers),
+                        stage.values(slider_values))
+        _crop(images, write)[...] = _crop(result.reshape(region.shape), offset_rect(write, read))
+        buffers.give(result)
+    return images
@@ -0,0 +1,266 @@
+"""
+Render many makeup looks of one portrait while sharing common work
+
+Every variant shares the same original -> blemish removal -> smoothing
+prefix, and the lip/cheek saturation boost only depends on that prefix and
+the masks. Those are computed once; each variant only recolors the lip and
+cheek regions (and re-sharpens the eyebrows if a recolored region reaches
+them).
+"""
+import itertools
+
+import cv2
+import numpy as np
+
+from ..effects.blemish_removal import remove_multiple_blemishes
+from ..effects.smoothing import smooth_face
+from ..effects.makeup import (
+    resolve_color, boost_saturation, overlay_blend, composite,
+    lipstick_alpha, blush_alpha,
+    LIPSTICK_SATURATION_BOOST, BLUSH_SATURATION_BOOST
+)
+from ..effects.sharpening import sharpen_region, create_eyebrow_eyelash_mask, SHARPEN_BLUR_SIGMA
+from ..utils.constants import LIPSTICK_COLORS, BLUSH_COLORS
+from .feathering import feathered_mask
+from ..utils.regions import (
+    mask_bbox, align_rect, expand_rect, intersect_rect, offset_rect, crop, paste, gaussian_halo
+)
+
+
+def iter_variants(lipstick_colors=None, blush_colors=None, intensities=(50,)):
+    """
+    Enumerate lipstick x blush x intensity combinations
+
+    Args:
+        lipstick_colors: Lipstick color names (None = all, [] = no lipstick)
+        blush_colors: Blush color names (None = all, [] = no blush)
+        intensities: Intensities (0-100) applied to both lipstick and blush
+
+    Yields:
+        Dictionaries with 'lipstick', 'lipstick_color', 'blush', 'blush_color'
+    """
+    if lipstick_colors is None:
+        lipstick_colors = list(LIPSTICK_COLORS)
+    if blush_colors is None:
+        blush_colors = list(BLUSH_COLORS)
+
+    lip_choices = [(c, True) for c in lipstick_colors] or [('red', False)]
+    blush_choices = [(c, True) for c in blush_colors] or [('pink', False)]
+
+    for intensity, (lip_color, lip_on), (blush_color, blush_on) in itertools.product(
+            intensities, lip_choices, blush_choices):
+        yield {
+            'lipstick': intensity if lip_on else 0,
+            'lipstick_color': lip_color,
+            'blush': intensity if blush_on else 0,
+            'blush_color': blush_color
+        }
+
+
+def variant_label(variant):
+    """Short human-readable label for a variant"""
+    parts = []
+    if variant.get('lipstick', 0) > 0:
+        parts.append(f"lip {variant['lipstick_color']} {variant['lipstick']}")
+    if variant.get('blush', 0) > 0:
+        parts.append(f"blush {variant['blush_color']} {variant['blush']}")
+    return ' / '.join(parts) or 'base'
+
+
+class VariantRenderer:
+    """Renders makeup variants on top of a shared, precomputed prefix"""
+
+    def __init__(self, image_manager, base_values):
+        """
+        Compute everything that does not depend on the makeup choice
+
+        Args:
+            image_manager: ImageManager with original image and face masks
+            base_values: Slider values for the shared stages
+                ('smoothing', 'sharpening'); makeup keys are ignored
+        """
+        masks = image_manager.face_masks
+        img = image_manager.get_original()
+
+        if image_manager.blemish_points:
+            img = remove_multiple_blemishes(img, image_manager.blemish_points)
+
+        if base_values.get('smoothing', 0) > 0:
+            img = smooth_face(img, masks['face'], masks['eyes'], base_values['smoothing'],
+                              smooth_mask=feathered_mask(image_manager, 'smooth'))
+
+        self.prefix = img
+        self.sharpening = base_values.get('sharpening', 0)
+
+        self.lip_mask = feathered_mask(image_manager, 'lips')
+        self.lip_rect = self._roi(self.lip_mask)
+        self.cheek_mask = masks['cheeks']
+        self.cheek_rect = self._roi(self.cheek_mask)
+
+        self._lip_saturated = None
+        self._lip_blended = {}
+        self._cheek_saturated = None
+        self._cheek_blended = {}
+
+        self.sharpen_mask = None
+        self.sharpen_rect = None
+        self.sharpen_read_rect = None
+        self._sharpened = {}
+        if self.sharpening > 0:
+            self.sharpen_mask = create_eyebrow_eyelash_mask(image_manager.face_landmarks, img.shape)
+            self.sharpen_rect = mask_bbox(self.sharpen_mask)
+            if self.sharpen_rect is not None:
+                self.sharpen_read_rect = expand_rect(
+                    self.sharpen_rect, gaussian_halo(SHARPEN_BLUR_SIGMA), img.shape)
+
+    @staticmethod
+    def _roi(mask):
+        """Aligned bounding rectangle of a mask, or None if empty"""
+        rect = mask_bbox(mask)
+        return align_rect(rect, mask.shape) if rect is not None else None
+
+    def render(self, variant):
+        """
+        Render one variant
+
+        Args:
+            variant: Dictionary with 'lipstick', 'lipstick_color',
+                'blush', 'blush_color'
+
+        Returns:
+            Rendered image, identical to apply_all_effects with the
+            combined slider values
+        """
+        img = self.prefix.copy()
+        lip_on = variant.get('lipstick', 0) > 0 and self.lip_rect is not None
+        blush_on = variant.get('blush', 0) > 0 and self.cheek_rect is not None
+
+        if lip_on:
+            paste(img, self._lipstick_roi(variant), self.lip_rect)
+
+        if blush_on:
+            paste(img, self._blush_roi(img, variant, lip_on), self.cheek_rect)
+
+        if self.sharpen_rect is not None:
+            paste(img, self._sharpen_roi(img, variant, lip_on, blush_on), self.sharpen_rect)
+
+        return img
+
+    def render_all(self, variants):
+        """
+        Render a sequence of variants
+
+        Returns:
+            List of (variant, image) pairs
+        """
+        return [(variant, self.render(variant)) for variant in variants]
+
+    def _lipstick_roi(self, variant):
+        """Lipstick result inside lip_rect"""
+        rect = self.lip_rect
+        if self._lip_saturated is None:
+            self._lip_saturated = boost_saturation(
+                crop(self.prefix, rect), crop(self.lip_mask, rect), LIPSTICK_SATURATION_BOOST)
+
+        color = variant['lipstick_color']
+        key = tuple(color) if isinstance(color, tuple) else color
+        if key not in self._lip_blended:
+            self._lip_blended[key] = overlay_blend(
+                self._lip_saturated, resolve_color(color, LIPSTICK_COLORS, 'red'))
+
+        return composite(crop(self.prefix, rect), self._lip_blended[key],
+                         crop(self.lip_mask, rect), lipstick_alpha(variant['lipstick']))
+
+    def _blush_roi(self, img, variant, lip_on):
+        """Blush result inside cheek_rect, given the image after lipstick"""
+        rect = self.cheek_rect
+        mask = crop(self.cheek_mask, rect)
+        if self._cheek_saturated is None:
+            self._cheek_saturated = boost_saturation(
+                crop(self.prefix, rect), mask, BLUSH_SATURATION_BOOST)
+
+        color = variant['blush_color']
+        blush_color = resolve_color(color, BLUSH_COLORS, 'pink')
+        key = tuple(color) if isinstance(color, tuple) else color
+        if key not in self._cheek_blended:
+            self._cheek_blended[key] = overlay_blend(self._cheek_saturated, blush_color)
+        blended = self._cheek_blended[key]
+
+        overlap = intersect_rect(self.lip_rect, rect) if lip_on else None
+        if overlap is not None:
+            # Lipstick changed pixels the cheek mask also covers; redo just those
+            local = offset_rect(overlap, rect)
+            saturated = boost_saturation(crop(img, overlap), crop(mask, local), BLUSH_SATURATION_BOOST)
+            blended = blended.copy()
+            paste(blended, overlay_blend(saturated, blush_color), local)
+
+        return composite(crop(img, rect), blended, mask, blush_alpha(variant['blush']))
+
+    def _sharpen_roi(self, img, variant, lip_on, blush_on):
+        """Sharpened eyebrows inside sharpen_rect"""
+        read_rect = self.sharpen_read_rect
+
+        key = []
+        if lip_on and intersect_rect(self.lip_rect, read_rect) is not None:
+            key += [variant['lipstick_color'], variant['lipstick']]
+        if blush_on and intersect_rect(self.cheek_rect, read_rect) is not None:
+            key += [variant['blush_color'], variant['blush']]
+        key = tuple(tuple(k) if isinstance(k, tuple) else k for k in key)
+
+        if key not in self._sharpened:
+            sharpened = sharpen_region(crop(img, read_rect), crop(self.sharpen_mask, read_rect),
+                                       self.sharpening)
+            self._sharpened[key] = crop(sharpened, offset_rect(self.sharpen_rect, read_rect)).copy()
+        return self._sharpened[key]
+
+
+def render_variants(image_manager, base_values, variants):
+    """
+    Render a list of makeup variants of the loaded image
+
+    Args:
+        image_manager: ImageManager with original image and face masks
+        base_values: Slider values for smoothing and sharpening
+        variants: Iterable of variant dictionaries (see iter_variants)
+
+    Returns:
+        List of (variant, image) pairs
+    """
+    return VariantRenderer(image_manager, base_values).render_all(variants)
+
+
+def make_contact_sheet(images, labels=None, columns=8, cell_width=256):
+    """
+    Tile images into a labelled grid
+
+    Args:
+        images: List of BGR images
+        labels: Optional list of captions
+        columns: Number of grid columns
+        cell_width: Width of each cell in pixels
+
+    Returns:
+        Contact sheet image (BGR)
+    """
+    if not images:
+        return None
+
+    h, w = images[0].shape[:2]
+    cell_height = int(round(h * cell_width / w))
+    label_height = 22 if labels else 0
+    rows = (len(images) + columns - 1) // columns
+    columns = min(columns, len(images))
+
+    sheet = np.full((rows * (cell_height + label_height), columns * cell_width, 3), 255, dtype=np.uint8)
+
+    for i, image in enumerate(images):
+        r, c = divmod(i, columns)
+        y = r * (cell_height + label_height)
+        x = c * cell_width
+        sheet[y:y + cell_height, x:x + cell_width] = cv2.resize(
+            image, (cell_width, cell_height), interpolation=cv2.INTER_AREA)
+        if labels:
+            cv2.putText(sheet, labels[i], (x + 4, y + cell_height + 15),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.4, (107, 91, 126), 1, cv2.LINE_AA)
+
+    return sheet
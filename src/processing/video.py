@@ -0,0 +1,267 @@
+"""
+Chunked video rendering across processes
+
+A video is split into contiguous frame ranges, one per chunk. Each chunk
+runs in a worker process with its own FaceDetector in tracking mode, so
+Face Mesh follows the face from frame to frame as in a sequential pass.
+Tracking needs a few frames to settle, so every chunk but the first starts
+VIDEO_WARMUP_FRAMES early: those frames only feed the detector and are not
+written. Chunks go to temporary files which are concatenated in order into
+the output.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from ..utils.config import VIDEO_WARMUP_FRAMES, VIDEO_CHUNK_FOURCC, VIDEO_FOURCC, MEMORY_BUDGET
+from .face_detector import FaceDetector
+from .mask_generator import MaskGenerator
+from .image_manager import ImageManager
+from .filters import apply_all_effects
+from .recipe import normalize_recipe, slider_values
+from .resources import plan_resources, configure_process
+
+_state = {}
+
+
+def video_info(path):
+    """
+    Frame count, frame rate and size of a video
+
+    Args:
+        path: Video file
+
+    Returns:
+        Dictionary with 'frames', 'fps', 'width', 'height'
+
+    Raises:
+        ValueError: If the file cannot be opened
+    """
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Failed to open video: {path}")
+    try:
+        return {
+            'frames': int(capture.get(cv2.CAP_PROP_FRAME_COUNT)),
+            'fps': capture.get(cv2.CAP_PROP_FPS) or 25.0,
+            'width': int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        }
+    finally:
+        capture.release()
+
+
+def plan_chunks(frames, chunks, warmup=VIDEO_WARMUP_FRAMES):
+    """
+    Split a frame range into contiguous chunks
+
+    Args:
+        frames: Number of frames
+        chunks: Number of chunks
+        warmup: Frames each chunk reads before its first output frame
+
+    Returns:
+        List of (warmup start, start, end) frame indices; the last chunk's
+        end is None (read to the end, frame counts can be estimates)
+    """
+    chunks = max(1, min(chunks, frames))
+    bounds = [round(i * frames / chunks) for i in range(chunks + 1)]
+    plan = []
+    for i in range(chunks):
+        start = bounds[i]
+        end = bounds[i + 1] if i < chunks - 1 else None
+        plan.append((max(0, start - warmup), start, end))
+    return plan
+
+
+def _writer(path, fourcc, fps, size):
+    """Open a VideoWriter or raise ValueError"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+    if not writer.isOpened():
+        raise ValueError(f"Failed to open video writer: {path} ({fourcc})")
+    if fourcc == 'MJPG':
+        writer.set(cv2.VIDEOWRITER_PROP_QUALITY, 100)
+    return writer
+
+
+def init_video_worker(memory_budget=MEMORY_BUDGET, resources=None):
+    """
+    Process initializer: one tracking FaceDetector per process
+
+    Args:
+        memory_budget: Bytes one frame's render may allocate, or None
+        resources: ResourcePlan for this process's threads, or None
+    """
+    start = time.perf_counter()
+    if resources is not None:
+        configure_process(resources)
+    _state['face_detector'] = FaceDetector(static_image_mode=False)
+    _state['mask_generator'] = MaskGenerator()
+    _state['memory_budget'] = memory_budget
+    _state['init_seconds'] = time.perf_counter() - start
+
+
+def render_frame(frame, values):
+    """
+    Detect the face in a frame and render it
+
+    Args:
+        frame: BGR frame
+        values: Slider values
+
+    Returns:
+        Rendered frame, or the frame itself if no face is found
+    """
+    landmarks = _state['face_detector'].detect(frame)
+    if landmarks is None:
+        return frame
+
+    # One manager per process: frames share its buffer arena, and tiles of
+    # a slowly moving face keep their sizes from frame to frame
+    image_manager = _state.setdefault('image_manager', ImageManager())
+    image_manager.set_original(frame)
+    image_manager.set_face_data(landmarks, _state['mask_generator'].generate_all_masks(landmarks, frame.shape))
+    return apply_all_effects(image_manager, values, _state['memory_budget'])
+
+
+def render_chunk(path, chunk, recipe, chunk_path, fps):
+    """
+    Render one frame range into its own file
+
+    Args:
+        path: Input video
+        chunk: (warmup start, start, end) from plan_chunks
+        recipe: Recipe dictionary (blemish points are ignored)
+        chunk_path: Output file for this chunk
+        fps: Output frame rate
+
+    Returns:
+        Dictionary with 'frames', 'warmup', 'seconds', 'init_seconds', 'pid'
+    """
+    if 'face_detector' not in _state:
+        init_video_worker()
+    warm_start, start, end = chunk
+    values = slider_values(normalize_recipe(dict(recipe, blemish_points=[])))
+
+    began = time.perf_counter()
+    capture = cv2.VideoCapture(path)
+    capture.set(cv2.CAP_PROP_POS_FRAMES, warm_start)
+    writer = None
+    frames = warmup = 0
+    try:
+        index = warm_start
+        while end is None or index < end:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            if index < start:
+                _state['face_detector'].detect(frame)
+                warmup += 1
+            else:
+                if writer is None:
+                    writer = _writer(chunk_path, VIDEO_CHUNK_FOURCC, fps, (frame.shape[1], frame.shape[0]))
+                writer.write(render_frame(frame, values))
+                frames += 1
+            index += 1
+    finally:
+        capture.release()
+        if writer is not None:
+            writer.release()
+
+    return {'frames': frames, 'warmup': warmup, 'seconds': time.perf_counter() - began,
+            'init_seconds': _state['init_seconds'], 'pid': os.getpid()}
+
+
+def concatenate(chunk_paths, output, fps, size):
+    """
+    Join chunk files in order
+
+    Args:
+        chunk_paths: Chunk files in frame order (missing files are empty
+            chunks)
+        output: Output video; the codec follows its extension (VIDEO_FOURCC)
+        fps: Frame rate
+        size: (width, height)
+
+    Returns:
+        Number of frames written
+    """
+    fourcc = VIDEO_FOURCC.get(os.path.splitext(output)[1].lower(), VIDEO_CHUNK_FOURCC)
+    writer = _writer(output, fourcc, fps, size)
+    written = 0
+    try:
+        for chunk_path in chunk_paths:
+            if not os.path.exists(chunk_path):
+                continue
+            capture = cv2.VideoCapture(chunk_path)
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                writer.write(frame)
+                written += 1
+            capture.release()
+    finally:
+        writer.release()
+    return written
+
+
+def render_video(path, output, recipe, workers=None, chunks=None, warmup=VIDEO_WARMUP_FRAMES,
+                 memory_budget=MEMORY_BUDGET):
+    """
+    Render every frame of a video with one recipe
+
+    Args:
+        path: Input video
+        output: Output video
+        recipe: Recipe dictionary (blemish points are ignored)
+        workers: Worker processes (None: one per usable core, see
+            processing.resources)
+        chunks: Frame ranges to split into (default: one per worker)
+        warmup: Overlap frames per chunk for landmark tracking
+        memory_budget: Bytes one frame's render may allocate, or None
+
+    Returns:
+        Dictionary with 'frames', 'seconds' (wall clock, including worker
+        start-up), 'fps', 'concat_seconds' and per-chunk 'chunks' reports
+
+    Raises:
+        ValueError: If the input cannot be read or the output written
+    """
+    info = video_info(path)
+    resources = plan_resources('video', workers)
+    workers = resources.processes
+    plan = plan_chunks(info['frames'], chunks or workers, warmup)
+    size = (info['width'], info['height'])
+
+    start = time.perf_counter()
+    temp_dir = tempfile.mkdtemp(prefix='.chunks-', dir=os.path.dirname(os.path.abspath(output)))
+    try:
+        chunk_paths = [os.path.join(temp_dir, f"{i:04d}.avi") for i in range(len(plan))]
+        if workers > 1:
+            # Spawned, not forked: a forked copy of an initialized MediaPipe
+            # graph crashes
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=init_video_worker, initargs=(memory_budget, resources)) as executor:
+                futures = [executor.submit(render_chunk, path, chunk, recipe, chunk_path, info['fps'])
+                           for chunk, chunk_path in zip(plan, chunk_paths)]
+                reports = [future.result() for future in futures]
+        else:
+            init_video_worker(memory_budget, resources)
+            reports = [render_chunk(path, chunk, recipe, chunk_path, info['fps'])
+                       for chunk, chunk_path in zip(plan, chunk_paths)]
+
+        concat_start = time.perf_counter()
+        frames = concatenate(chunk_paths, output, info['fps'], size)
+        concat_seconds = time.perf_counter() - concat_start
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    seconds = time.perf_counter() - start
+    return {'frames': frames, 'seconds': seconds, 'fps': frames / seconds if seconds else 0.0,
+            'concat_seconds': concat_seconds, 'chunks': reports}
@@ -0,0 +1 @@
+# Rendering Service
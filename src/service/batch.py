@@ -0,0 +1,395 @@
+"""
+Resumable, shardable bulk rendering of a folder
+
+Every finished image is recorded in an append-only manifest: input hash
+(of the file bytes), recipe hash, output path, status and timings. A rerun
+replays the manifest and skips items already done with the same input and
+recipe, so a crashed or preempted job picks up where it stopped.
+
+Several processes, possibly on different machines sharing a filesystem,
+can work on one job:
+
+- --shard i/N deterministically assigns each input (by relative path) to
+  one of N shards, so machines split the dataset without talking to each
+  other;
+- within a shard, a lease file per item makes sure only one process
+  renders it. Leases older than the lease timeout belong to a crashed
+  process and are taken over.
+
+Each process appends to its own manifest file, so no two processes ever
+write to the same file. Renders are deterministic and outputs are written
+atomically, so the rare duplicate render (a lease that expired while its
+render was still running) only costs time.
+"""
+import hashlib
+import json
+import os
+import socket
+import tempfile
+import time
+
+from ..utils.config import PIPELINE_VERSION, MEMORY_BUDGET, BATCH_LEASE_SECONDS
+from ..processing.render_cache import recipe_key
+from . import worker
+
+INPUT_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+MANIFEST_SUFFIX = '.jsonl'
+
+
+def parse_shard(text):
+    """
+    Parse an 'i/N' shard specification
+
+    Args:
+        text: Shard index and count, e.g. '2/8'
+
+    Returns:
+        (index, count)
+
+    Raises:
+        ValueError: If malformed or out of range
+    """
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise ValueError(f"Shard must be i/N: {text}") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index must be in 0..{count - 1}: {text}")
+    return index, count
+
+
+def shard_of(name, count):
+    """
+    Shard an input belongs to, identical on every machine
+
+    Args:
+        name: Input path relative to the input directory
+        count: Number of shards
+
+    Returns:
+        Shard index
+    """
+    digest = hashlib.sha256(name.replace(os.sep, '/').encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count
+
+
+def list_inputs(directory):
+    """
+    Image files under a directory
+
+    Returns:
+        Sorted relative paths
+    """
+    names = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for name in files:
+            if name.lower().endswith(INPUT_EXTENSIONS):
+                names.append(os.path.relpath(os.path.join(root, name), directory))
+    return sorted(names)
+
+
+def recipe_hash(recipe, fmt):
+    """
+    Hash of everything besides the input that determines an output
+
+    Args:
+        recipe: Recipe dictionary
+        fmt: Output format
+
+    Returns:
+        Hex digest
+    """
+    text = f"v{PIPELINE_VERSION}|{fmt}|{recipe_key(recipe)}"
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def item_key(input_hash, recipe_digest):
+    """Manifest and lease key of one input rendered with one recipe"""
+    return f"{input_hash[:32]}-{recipe_digest[:16]}"
+
+
+class Manifest:
+    """Append-only job log, one JSON line per finished item"""
+
+    def __init__(self, directory, owner):
+        """
+        Open a manifest directory
+
+        Args:
+            directory: Manifest directory shared by every process of the job
+            owner: This process's name; its records go to <owner>.jsonl
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, owner + MANIFEST_SUFFIX)
+        self.records = {}  # Item key -> latest record
+        self._offsets = {}  # Manifest file -> bytes already read
+        self.refresh()
+
+    def refresh(self):
+        """Read what every process appended since the last refresh"""
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(MANIFEST_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            offset = self._offsets.get(path, 0)
+            try:
+                with open(path, 'rb') as f:
+                    f.seek(offset)
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+
+            # A line without its newline is still being written (or was cut
+            # off by a crash); leave it for the next refresh
+            end = data.rfind(b'\n') + 1
+            for line in data[:end].splitlines():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self.records[record['key']] = record
+            self._offsets[path] = offset + end
+
+    def is_done(self, key):
+        """
+        Whether an item finished and its output is still there
+
+        Args:
+            key: Item key
+        """
+        record = self.records.get(key)
+        return record is not None and record['status'] == 'done' and os.path.exists(record['output'])
+
+    def failed_in(self, key, run_id):
+        """
+        Whether an item already failed in this run (in any of its processes)
+
+        Args:
+            key: Item key
+            run_id: Identifier shared by the processes of one run
+        """
+        record = self.records.get(key)
+        return record is not None and record['status'] == 'failed' and record.get('run') == run_id
+
+    def append(self, record):
+        """
+        Record a finished item durably
+
+        Args:
+            record: JSON-serializable dictionary with at least 'key' and
+                'status'
+        """
+        line = json.dumps(record, sort_keys=True) + '\n'
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self.records[record['key']] = record
+
+
+class Lease:
+    """Exclusive claim on one item, held as a file next to the others"""
+
+    def __init__(self, directory, key, owner, timeout=BATCH_LEASE_SECONDS):
+        """
+        Describe a lease (not yet acquired)
+
+        Args:
+            directory: Lease directory shared by every process of the job
+            key: Item key
+            owner: This process's name
+            timeout: Seconds after which a lease is considered abandoned
+        """
+        self.path = os.path.join(directory, key + '.lease')
+        self.owner = owner
+        self.timeout = timeout
+        self.held = False
+
+    def acquire(self):
+        """
+        Try to take the lease
+
+        Returns:
+            True if this process now holds it
+        """
+        for _ in range(2):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if not self._break_stale():
+                    return False
+                continue
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'owner': self.owner, 'time': time.time()}, f)
+            self.held = True
+            return True
+        return False
+
+    def _break_stale(self):
+        """
+        Remove an abandoned lease
+
+        Renaming is atomic, so when several processes find the same stale
+        lease only one of them removes it.
+
+        Returns:
+            True if the lease is gone and acquiring can be retried
+        """
+        try:
+            age = time.time() - os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return True
+        if age < self.timeout:
+            return False
+
+        stale_path = f"{self.path}.{self.owner}.stale"
+        try:
+            os.rename(self.path, stale_path)
+        except FileNotFoundError:
+            return False  # Another process broke it first and may hold it now
+        if time.time() - os.stat(stale_path).st_mtime < self.timeout:
+            # Lost a race: what we moved is a fresh lease taken after the
+            # stale one was broken; put it back
+            os.rename(stale_path, self.path)
+            return False
+        os.unlink(stale_path)
+        return True
+
+    def release(self):
+        """Give the lease up"""
+        if self.held:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            self.held = False
+
+
+def _write_atomic(path, data):
+    """Write a file under a temporary name and rename it into place"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def run_batch(input_dir, output_dir, recipe, fmt='jpg', shard=(0, 1), job_dir=None, cache_dir=None,
+              memory_budget=MEMORY_BUDGET, lease_timeout=BATCH_LEASE_SECONDS, on_item=None, resources=None,
+              run_id=None):
+    """
+    Render every input of a shard that is not done yet
+
+    Args:
+        input_dir: Directory of portraits (searched recursively)
+        output_dir: Directory for results; the input tree is mirrored
+        recipe: Recipe dictionary applied to every image
+        fmt: Output format ('jpg' or 'png')
+        shard: (index, count) of the shard this process works on
+        job_dir: Directory for the manifest and leases (default:
+            output_dir/.job)
+        cache_dir: Render cache directory, or None
+        memory_budget: Bytes one render may allocate, or None
+        lease_timeout: Seconds after which another process's lease is
+            considered abandoned
+        on_item: Optional callback(status, name, record) per input; record
+            is None for items skipped without rendering
+        resources: ResourcePlan for this process's threads, or None
+        run_id: Identifier shared by the processes of one run; an item
+            one of them recorded as failed is not retried by the others
+            (None: this process alone)
+
+    Returns:
+        Dictionary of item key -> 'done', 'failed' or 'skipped' (already
+        done) for the items this process rendered or found done; items
+        held or failed by another process of the run are left out, so
+        several processes' results merge by key
+    """
+    if fmt not in worker.ENCODE_FORMATS:
+        raise ValueError(f"Unsupported output format: {fmt}")
+    job_dir = job_dir or os.path.join(output_dir, '.job')
+    owner = f"{socket.gethostname()}-{os.getpid()}"
+    run_id = run_id or owner
+    manifest = Manifest(os.path.join(job_dir, 'manifest'), owner)
+    lease_dir = os.path.join(job_dir, 'leases')
+    os.makedirs(lease_dir, exist_ok=True)
+
+    worker.init_worker(cache_dir, memory_budget, resources)
+    recipe_digest = recipe_hash(recipe, fmt)
+    ext = worker.ENCODE_FORMATS[fmt][0]
+    items = {}
+
+    index, count = shard
+    for name in list_inputs(input_dir):
+        if shard_of(name, count) != index:
+            continue
+
+        start = time.perf_counter()
+        with open(os.path.join(input_dir, name), 'rb') as f:
+            data = f.read()
+        input_hash = hashlib.sha256(data).hexdigest()
+        key = item_key(input_hash, recipe_digest)
+        read_ms = (time.perf_counter() - start) * 1000.0
+
+        status = None
+        if manifest.is_done(key):
+            status = 'skipped'
+        elif manifest.failed_in(key, run_id):
+            status = 'leased'
+        else:
+            lease = Lease(lease_dir, key, owner, lease_timeout)
+            if not lease.acquire():
+                status = 'leased'
+            else:
+                # Another process may have finished (or failed) it while we
+                # were reading
+                manifest.refresh()
+                if manifest.is_done(key):
+                    lease.release()
+                    status = 'skipped'
+                elif manifest.failed_in(key, run_id):
+                    lease.release()
+                    status = 'leased'
+
+        if status is not None:
+            if status == 'skipped':
+                items[key] = status
+            if on_item is not None:
+                on_item(status, name, None)
+            continue
+
+        output = os.path.join(output_dir, os.path.splitext(name)[0] + ext)
+        record = {'key': key, 'input': name, 'input_hash': input_hash, 'recipe_hash': recipe_digest,
+                  'output': output, 'owner': owner, 'run': run_id, 'started': time.time()}
+        try:
+            try:
+                encoded, _, timings = worker.render_job(data, recipe, fmt)
+                mark = time.perf_counter()
+                _write_atomic(output, encoded)
+                timings['write'] = (time.perf_counter() - mark) * 1000.0
+                record.update(status='done', cache_hit=timings.pop('cache_hit'))
+                timings.pop('pid')
+            except (ValueError, MemoryError, OSError) as e:
+                timings = {}
+                record.update(status='failed', error=str(e))
+
+            timings['read'] = read_ms
+            timings['total'] = (time.perf_counter() - start) * 1000.0
+            record['timings_ms'] = {phase: round(ms, 2) for phase, ms in timings.items()}
+            record['finished'] = time.time()
+            # Recorded before the lease goes, so the next holder sees it
+            manifest.append(record)
+        finally:
+            lease.release()
+
+        items[key] = record['status']
+        if on_item is not None:
+            on_item(record['status'], name, record)
+    return items
@@ -0,0 +1,335 @@
+"""
+Pre-forked pool of warm render workers
+
+A ProcessPoolExecutor starts its workers from scratch: each one imports
+OpenCV and MediaPipe and loads the Face Mesh graph before its first job,
+a multi-second stall whenever the pool (re)starts a process, and one dead
+worker breaks the whole executor.
+
+WarmPool starts workers from a fork server that has already imported
+SERVICE_PRELOAD (the worker module, MediaPipe, the landmark constants),
+so a new worker only forks that warm interpreter, sharing its pages
+copy-on-write. Each worker runs its initializer (loading Face Mesh)
+before it reports ready, and only ready workers take jobs. Every worker
+slot is watched by a thread that starts a replacement as soon as its
+process dies, while idle as well as mid-job, so the capacity is back
+before the next request needs it. A job lost with its worker is retried
+once on another worker. A slot whose worker fails to initialize
+INIT_ATTEMPTS times in a row gives up; once every slot has, the queued
+jobs fail instead of waiting forever.
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from ..utils.config import SERVICE_PRELOAD, SERVICE_HEALTH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+RESTART_DELAY = 1.0  # Seconds before retrying a worker whose initializer failed
+JOB_ATTEMPTS = 2  # Workers a job may be sent to before it fails with WorkerDiedError
+INIT_ATTEMPTS = 3  # Failed initializations in a row before a slot gives up
+
+
+class WorkerDiedError(RuntimeError):
+    """Raised for a job whose worker process exited while running it"""
+
+
+def _worker_main(conn, initializer, initargs):
+    """
+    Worker process body: initialize, report ready, then run jobs
+
+    Messages in are (function, args) or None to stop; replies are
+    ('ready', pid, init seconds), ('init_failed', error) and
+    ('ok', result) / ('error', exception) per job.
+    """
+    start = time.perf_counter()
+    try:
+        if initializer is not None:
+            initializer(*initargs)
+    except Exception as e:
+        conn.send(('init_failed', f"{type(e).__name__}: {e}"))
+        return
+    conn.send(('ready', os.getpid(), time.perf_counter() - start))
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+        fn, args = message
+        try:
+            reply = ('ok', fn(*args))
+        except Exception as e:
+            reply = ('error', e)
+        try:
+            conn.send(reply)
+        except Exception as e:  # Result or exception that does not pickle
+            conn.send(('error', RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+def _context(preload):
+    """Fork-server context preloading the given modules (spawn where unavailable)"""
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload(list(preload))
+    return context
+
+
+class WarmPool:
+    """Fixed number of pre-initialized worker processes fed from one queue"""
+
+    def __init__(self, workers, initializer=None, initargs=(), preload=SERVICE_PRELOAD,
+                 health_seconds=SERVICE_HEALTH_SECONDS):
+        """
+        Start the worker processes (returns without waiting for them)
+
+        Args:
+            workers: Number of worker processes
+            initializer: Function each worker runs before taking jobs
+            initargs: Arguments for initializer
+            preload: Modules the fork server imports once for all workers
+            health_seconds: How often idle workers are checked
+        """
+        self.workers = workers
+        self.initializer = initializer
+        self.initargs = initargs
+        self.health_seconds = health_seconds
+        self._context = _context(preload)
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._closing = False
+        self.ready = {}  # Slot -> (pid, init seconds, seconds from start to ready)
+        self.stats = {'started': 0, 'died': 0}
+        self.init_errors = {}  # Slot -> why its last worker failed to initialize (until one is ready)
+        self.failed = set()  # Slots that gave up after INIT_ATTEMPTS failures
+        self._slots = [threading.Thread(target=self._run_slot, args=(slot,), name=f'pool-slot-{slot}',
+                                        daemon=True)
+                       for slot in range(workers)]
+        for thread in self._slots:
+            thread.start()
+
+    def submit(self, fn, *args):
+        """
+        Queue a job for the next free worker
+
+        Args:
+            fn: Module-level function (pickled by reference)
+            args: Its arguments
+
+        Returns:
+            concurrent.futures.Future of fn(*args); a job whose worker dies
+            is retried on another one (fn must be safe to run twice), then
+            fails with WorkerDiedError
+
+        Raises:
+            RuntimeError: If the pool is shut down or no worker could
+                initialize
+        """
+        future = Future()
+        with self._lock:
+            if self._closing:
+                raise RuntimeError("Pool is shut down")
+            if len(self.failed) == self.workers:
+                raise RuntimeError(f"No worker could initialize: {self._failure()}")
+            self._jobs.put((future, fn, args, 0))
+        return future
+
+    def wait_ready(self, timeout=None):
+        """
+        Block until every worker has initialized
+
+        Args:
+            timeout: Seconds to wait (None: no limit)
+
+        Returns:
+            List of (pid, init seconds, seconds from start to ready), one
+            per ready worker
+
+        Raises:
+            RuntimeError: If a slot gave up initializing its worker
+                (failures it recovers from only delay the wait)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._ready:
+            while len(self.ready) < self.workers and not self._closing:
+                if self.failed:
+                    raise RuntimeError(f"Worker failed to initialize: {self._failure()}")
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._ready.wait(remaining)
+            return sorted(self.ready.values())
+
+    def snapshot(self):
+        """Worker counts: ready now, started and died so far, slots that gave up"""
+        with self._lock:
+            return dict(self.stats, ready=len(self.ready), failed=len(self.failed))
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        """
+        Stop the workers
+
+        Args:
+            wait: Wait for the running jobs and the processes to finish
+            cancel_futures: Cancel jobs still waiting in the queue (else
+                they are run first)
+        """
+        with self._ready:
+            self._closing = True
+            self._ready.notify_all()
+        if cancel_futures:
+            while True:
+                try:
+                    future = self._jobs.get_nowait()[0]
+                except queue.Empty:
+                    break
+                future.cancel()
+        for _ in self._slots:
+            self._jobs.put(None)
+        if wait:
+            for thread in self._slots:
+                thread.join()
+
+    def _run_slot(self, slot):
+        """Slot thread: keep one warm worker alive and feed it jobs"""
+        failures = 0
+        while not self._closing:
+            started = self._start_worker(slot)
+            if started is None:
+                failures += 1
+                if failures >= INIT_ATTEMPTS:
+                    self._give_up(slot)
+                    return
+                time.sleep(RESTART_DELAY)
+                continue
+            failures = 0
+            process, conn = started
+            try:
+                stopped = self._serve(slot, process, conn)
+            finally:
+                with self._lock:
+                    self.ready.pop(slot, None)
+                conn.close()
+            if stopped:
+                process.join()
+                return
+            process.join()
+            with self._lock:
+                self.stats['died'] += 1
+            logger.warning("Worker %d exited with code %s; starting a replacement", process.pid, process.exitcode)
+
+    def _start_worker(self, slot):
+        """
+        Start a worker and wait until it has initialized
+
+        Returns:
+            (process, connection), or None if it failed to start
+        """
+        start = time.perf_counter()
+        conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_worker_main, args=(child_conn, self.initializer, self.initargs),
+                                        name=f'render-worker-{slot}', daemon=True)
+        process.start()
+        child_conn.close()
+        with self._lock:
+            self.stats['started'] += 1
+
+        try:
+            message = conn.recv()
+        except EOFError:
+            message = ('init_failed', f"exited with code {process.exitcode}")
+        if message[0] != 'ready':
+            logger.error("Worker %d failed to initialize: %s", process.pid, message[1])
+            conn.close()
+            process.join()
+            with self._ready:
+                self.init_errors[slot] = message[1]
+                self._ready.notify_all()
+            return None
+
+        _, pid, init_seconds = message
+        with self._ready:
+            self.init_errors.pop(slot, None)
+            self.ready[slot] = (pid, init_seconds, time.perf_counter() - start)
+            self._ready.notify_all()
+        logger.info("Worker %d ready in %.2fs (%.2fs initializing)", pid, time.perf_counter() - start,
+                    init_seconds)
+        return process, conn
+
+    def _failure(self):
+        """Initialization error of a slot that gave up (lock held)"""
+        return self.init_errors.get(min(self.failed)) if self.failed else None
+
+    def _give_up(self, slot):
+        """Stop restarting a slot's worker; fail the queued jobs once no slot is left"""
+        with self._ready:
+            self.failed.add(slot)
+            self._ready.notify_all()
+            logger.error("Worker slot %d gave up after %d failed initializations", slot, INIT_ATTEMPTS)
+            if len(self.failed) < self.workers:
+                return
+            error = self._failure()
+            while True:
+                try:
+                    job = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:  # Shutdown marker for a slot thread that has already returned
+                    continue
+                future, attempts = job[0], job[3]
+                if attempts or future.set_running_or_notify_cancel():
+                    future.set_exception(RuntimeError(f"No worker could initialize: {error}"))
+
+    def _serve(self, slot, process, conn):
+        """
+        Run jobs on one worker until it dies or the pool shuts down
+
+        Returns:
+            True if the pool is shutting down, False if the worker died
+        """
+        while True:
+            try:
+                job = self._jobs.get(timeout=self.health_seconds)
+            except queue.Empty:
+                if not process.is_alive():
+                    return False
+                continue
+            if job is None:
+                try:
+                    conn.send(None)
+                except OSError:
+                    pass
+                return True
+
+            future, fn, args, attempts = job
+            if not process.is_alive():
+                self._jobs.put(job)  # Another worker (or the replacement) takes it
+                return False
+            if attempts == 0 and not future.set_running_or_notify_cancel():
+                continue
+            try:
+                conn.send((fn, args))
+                status, value = conn.recv()
+            except (EOFError, OSError):
+                # A worker killed while idle can still look alive: retry elsewhere
+                if attempts + 1 < JOB_ATTEMPTS:
+                    self._jobs.put((future, fn, args, attempts + 1))
+                else:
+                    future.set_exception(WorkerDiedError(f"Worker {process.pid} exited during the job"))
+                return False
+            except Exception as e:  # Arguments that do not pickle
+                future.set_exception(e)
+                continue
+            if status == 'ok':
+                future.set_result(value)
+            else:
+                future.set_exception(value)
@@ -0,0 +1,256 @@
+"""
+Local HTTP rendering service
+
+POST /render with a JSON body:
+    {"image": "<base64 encoded file>", "recipe": {...}, "format": "jpg"}
+returns the encoded result. GET /health returns pool statistics.
+
+Renders run on a WarmPool (service.pool) whose workers fork from a
+preloaded fork server and each keep a warm FaceDetector. At most
+workers + queue_depth requests are admitted; the rest get 503.
+"""
+import base64
+import binascii
+import concurrent.futures
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ..utils.config import (
+    SERVICE_HOST, SERVICE_PORT, SERVICE_WORKERS, SERVICE_QUEUE_DEPTH,
+    SERVICE_TIMEOUT, SERVICE_MAX_UPLOAD, MEMORY_BUDGET
+)
+from ..processing.memory import MemoryBudgetError
+from ..processing.resources import plan_resources
+from . import worker
+from .pool import WarmPool
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the service cannot admit another request"""
+
+
+class RenderPool:
+    """Warm worker pool with bounded admission"""
+
+    def __init__(self, workers=SERVICE_WORKERS, queue_depth=SERVICE_QUEUE_DEPTH, cache_dir=None,
+                 memory_budget=MEMORY_BUDGET, resources=None):
+        """
+        Start worker processes (they initialize in the background; see
+        warm_up)
+
+        Args:
+            workers: Number of render processes (None: planned from the
+                usable cores, see processing.resources)
+            queue_depth: Requests allowed to wait while all workers are busy
+            cache_dir: Shared render cache directory, or None to disable
+            memory_budget: Bytes one render may allocate, or None
+            resources: ResourcePlan already made for this service (None:
+                planned here from workers)
+        """
+        self.resources = resources or plan_resources('service', workers)
+        self.workers = self.resources.processes
+        self.capacity = self.workers + queue_depth
+        self.executor = WarmPool(self.workers, initializer=worker.init_worker,
+                                 initargs=(cache_dir, memory_budget, self.resources))
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.stats = {'accepted': 0, 'rejected': 0, 'completed': 0, 'failed': 0}
+
+    def warm_up(self, timeout=None):
+        """
+        Wait until every worker has loaded its detector
+
+        Args:
+            timeout: Seconds to wait (None: no limit)
+
+        Returns:
+            List of (pid, init seconds, seconds from start to ready) for
+            each ready worker
+        """
+        return self.executor.wait_ready(timeout)
+
+    def submit(self, image_bytes, recipe, fmt):
+        """
+        Queue a render job
+
+        Returns:
+            Future resolving to worker.render_job's result
+
+        Raises:
+            QueueFullError: If capacity is exhausted
+        """
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                self.stats['rejected'] += 1
+                raise QueueFullError()
+            self.in_flight += 1
+            self.stats['accepted'] += 1
+
+        try:
+            future = self.executor.submit(worker.render_job, image_bytes, recipe, fmt)
+        except Exception:
+            self._release(False)
+            raise
+        future.add_done_callback(lambda f: self._release(f.exception() is None))
+        return future
+
+    def _release(self, ok):
+        """Free an admission slot"""
+        with self._lock:
+            self.in_flight -= 1
+            self.stats['completed' if ok else 'failed'] += 1
+
+    def snapshot(self):
+        """Current pool statistics"""
+        with self._lock:
+            stats = dict(self.stats, in_flight=self.in_flight, capacity=self.capacity, workers=self.workers)
+        workers = self.executor.snapshot()
+        stats.update(workers_ready=workers['ready'], workers_started=workers['started'],
+                     workers_died=workers['died'], workers_failed=workers['failed'])
+        return stats
+
+    def shutdown(self):
+        """Stop worker processes"""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """HTTP handler; the pool is attached to the server instance"""
+
+    server_version = 'PrettyPixels/1.0'
+
+    def do_GET(self):
+        """Health and statistics endpoint"""
+        if self.path != '/health':
+            self._send_json(404, {'error': 'Not found'})
+            return
+        self._send_json(200, self.server.pool.snapshot())
+
+    def do_POST(self):
+        """Render endpoint"""
+        received = time.perf_counter()
+        if self.path != '/render':
+            self._send_json(404, {'error': 'Not found'})
+            return
+
+        try:
+            image_bytes, recipe, fmt = self._read_request()
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        try:
+            future = self.server.pool.submit(image_bytes, recipe, fmt)
+        except QueueFullError:
+            self._send_json(503, {'error': 'Render queue is full'}, {'Retry-After': '1'})
+            return
+
+        try:
+            body, content_type, timings = future.result(timeout=self.server.timeout_seconds)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            self._send_json(504, {'error': 'Render timed out'})
+            return
+        except MemoryBudgetError as e:
+            self._send_json(413, {'error': str(e)})
+            return
+        except ValueError as e:
+            self._send_json(422, {'error': str(e)})
+            return
+        except Exception as e:
+            logger.exception("Render failed")
+            self._send_json(500, {'error': f"Failed to process image: {e}"})
+            return
+
+        total_ms = (time.perf_counter() - received) * 1000.0
+        phases = ('decode', 'detect', 'render', 'encode')
+        work_ms = sum(timings[name] for name in phases)
+        headers = {
+            'X-Total-Ms': f"{total_ms:.1f}",
+            'X-Queue-Ms': f"{max(0.0, total_ms - work_ms):.1f}",
+            'X-Worker-Pid': str(timings['pid']),
+            'X-Cache': 'hit' if timings['cache_hit'] else 'miss'
+        }
+        for name in phases:
+            headers[f"X-{name.capitalize()}-Ms"] = f"{timings[name]:.1f}"
+        self._send(200, body, content_type, headers)
+
+    def _read_request(self):
+        """
+        Parse the JSON request body
+
+        Returns:
+            (image bytes, recipe dict, output format)
+        """
+        length = int(self.headers.get('Content-Length', 0))
+        if length <= 0:
+            raise ValueError("Empty request body")
+        if length > SERVICE_MAX_UPLOAD:
+            raise ValueError("Request body too large")
+
+        try:
+            payload = json.loads(self.rfile.read(length))
+            image_bytes = base64.b64decode(payload['image'], validate=True)
+        except (json.JSONDecodeError, KeyError, TypeError, binascii.Error) as e:
+            raise ValueError(f"Malformed request: {e}")
+
+        recipe = payload.get('recipe', {})
+        if not isinstance(recipe, dict):
+            raise ValueError("Recipe must be a JSON object")
+        return image_bytes, recipe, str(payload.get('format', 'jpg')).lower()
+
+    def _send_json(self, status, data, headers=None):
+        """Send a JSON response"""
+        self._send(status, json.dumps(data).encode('utf-8'), 'application/json', headers)
+
+    def _send(self, status, body, content_type, headers=None):
+        """Send a response with body"""
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Route access logs through logging"""
+        logger.info("%s %s", self.address_string(), format % args)
+
+
+class RenderServer(ThreadingHTTPServer):
+    """Threading HTTP server owning a RenderPool"""
+
+    daemon_threads = True
+
+    def __init__(self, host=SERVICE_HOST, port=SERVICE_PORT, workers=SERVICE_WORKERS,
+                 queue_depth=SERVICE_QUEUE_DEPTH, timeout_seconds=SERVICE_TIMEOUT, cache_dir=None,
+                 memory_budget=MEMORY_BUDGET):
+        """
+        Bind the socket and start the worker pool
+
+        Args:
+            host: Interface to bind
+            port: TCP port
+            workers: Number of render processes (None: planned)
+            queue_depth: Requests allowed to wait for a worker
+            timeout_seconds: Per-request render timeout
+            cache_dir: Shared render cache directory, or None to disable
+            memory_budget: Bytes one render may allocate, or None
+        """
+        resources = plan_resources('service', workers)
+        # Leave room in the accept backlog for rejected requests too
+        self.request_queue_size = max(16, (resources.processes + queue_depth) * 2)
+        super().__init__((host, port), RenderRequestHandler)
+        self.pool = RenderPool(resources.processes, queue_depth, cache_dir, memory_budget, resources)
+        self.timeout_seconds = timeout_seconds
+
+    def server_close(self):
+        """Close the socket and stop the workers"""
+        super().server_close()
+        self.pool.shutdown()
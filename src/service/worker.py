@@ -0,0 +1,132 @@
+"""
+Render worker process: holds a warm FaceDetector and renders one job at a time
+"""
+import os
+import time
+
+import cv2
+import numpy as np
+
+from ..utils.config import MEMORY_BUDGET
+from ..processing.face_detector import FaceDetector
+from ..processing.mask_generator import MaskGenerator
+from ..processing.image_manager import ImageManager
+from ..processing.loader import prepare_face_data
+from ..processing.filters import apply_all_effects, set_blemish_points
+from ..processing.recipe import normalize_recipe, slider_values
+from ..processing.render_cache import RenderCache
+from ..processing.resources import configure_process
+
+ENCODE_FORMATS = {
+    'jpg': ('.jpg', 'image/jpeg'),
+    'jpeg': ('.jpg', 'image/jpeg'),
+    'png': ('.png', 'image/png')
+}
+
+_state = {}
+
+
+def init_worker(cache_dir=None, memory_budget=MEMORY_BUDGET, resources=None):
+    """
+    Process initializer: load MediaPipe and the Face Mesh graph once
+
+    Args:
+        cache_dir: Render cache directory shared by all workers, or None
+        memory_budget: Bytes one render may allocate, or None
+        resources: ResourcePlan whose thread counts this process uses
+            (None: leave OpenCV's and the scheduler's defaults)
+    """
+    start = time.perf_counter()
+    if resources is not None:
+        configure_process(resources)
+    _state['face_detector'] = FaceDetector()
+    _state['mask_generator'] = MaskGenerator()
+    _state['render_cache'] = RenderCache(cache_dir) if cache_dir else None
+    _state['memory_budget'] = memory_budget
+    _state['init_seconds'] = time.perf_counter() - start
+
+
+def ping(hold=0.0):
+    """
+    No-op job used to force worker start-up
+
+    Args:
+        hold: Seconds to keep the worker busy, so other pings land elsewhere
+
+    Returns:
+        (pid, seconds spent initializing)
+    """
+    time.sleep(hold)
+    return os.getpid(), _state.get('init_seconds', 0.0)
+
+
+def render_job(image_bytes, recipe, fmt='jpg'):
+    """
+    Decode, detect, render and encode one image
+
+    Args:
+        image_bytes: Encoded input image
+        recipe: Recipe dictionary (see processing.recipe)
+        fmt: Output format ('jpg' or 'png')
+
+    Returns:
+        (encoded bytes, content type, timings dict in milliseconds); the
+        dict also carries 'pid' and 'cache_hit'
+
+    Raises:
+        ValueError: If the input or recipe is invalid or no face is found
+        MemoryBudgetError: If the render cannot fit in the memory budget
+    """
+    if fmt not in ENCODE_FORMATS:
+        raise ValueError(f"Unsupported output format: {fmt}")
+    if 'face_detector' not in _state:
+        init_worker()
+
+    timings = {}
+    mark = time.perf_counter()
+
+    def lap(name):
+        nonlocal mark
+        now = time.perf_counter()
+        timings[name] = (now - mark) * 1000.0
+        mark = now
+
+    recipe = normalize_recipe(recipe)
+
+    img = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Failed to load image")
+    lap('decode')
+
+    image_manager = ImageManager()
+    image_manager.original_image = img
+    image_manager.working_image = img.copy()
+
+    # A cache hit skips detection as well as rendering
+    cache = _state.get('render_cache')
+    key = cache.key(image_manager.get_image_hash(), recipe) if cache else None
+    result = cache.get(key) if cache else None
+    timings['cache_hit'] = result is not None
+
+    if result is None:
+        prepare_face_data(image_manager, _state['face_detector'], _state['mask_generator'])
+        lap('detect')
+
+        set_blemish_points(image_manager, recipe)
+        result = apply_all_effects(image_manager, slider_values(recipe), _state['memory_budget'])
+        lap('render')
+
+        if cache:
+            cache.put(key, result)
+    else:
+        lap('detect')
+        timings['render'] = 0.0
+
+    ext, content_type = ENCODE_FORMATS[fmt]
+    ok, encoded = cv2.imencode(ext, result)
+    if not ok:
+        raise ValueError("Failed to encode result")
+    lap('encode')
+
+    timings['pid'] = os.getpid()
+    return encoded.tobytes(), content_type, timings
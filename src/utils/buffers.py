@@ -0,0 +1,121 @@
+"""
+Reusable buffers for render intermediates
+
+Renders of one image allocate the same arrays over and over: float masks,
+blend temporaries and tile outputs, all shaped like the tiles, which stay
+the same while a slider is dragged. A BufferArena hands out arrays by
+shape and dtype and takes them back when the caller is done, so after the
+first render of an image the effects write into recycled memory (through
+OpenCV's dst= and NumPy's out=) instead of allocating.
+
+Each ImageManager owns an arena for as long as images of one shape are
+loaded. Scratch buffers go back at the end of the effect that took them;
+tile outputs and cached layers go back when the render graph drops them
+from the stage cache.
+"""
+import threading
+import weakref
+from collections import defaultdict
+
+import numpy as np
+
+from .config import BUFFER_ARENA_MAX_BYTES
+
+
+class BufferArena:
+    """Free lists of arrays keyed by shape and dtype"""
+
+    def __init__(self, max_bytes=BUFFER_ARENA_MAX_BYTES):
+        """
+        Create an empty arena
+
+        Args:
+            max_bytes: Bytes of returned buffers kept for reuse; beyond it
+                returned buffers are dropped (0: never reuse)
+        """
+        self.max_bytes = max_bytes
+        self._free = defaultdict(list)  # (shape, dtype) -> arrays
+        self._free_bytes = 0
+        self._lent = weakref.WeakValueDictionary()  # id -> array handed out
+        self._lock = threading.Lock()
+        self.counts = {'allocations': 0, 'allocated_bytes': 0, 'reuses': 0}
+
+    def take(self, shape, dtype):
+        """
+        Borrow an array; its contents are undefined
+
+        Args:
+            shape: Array shape
+            dtype: NumPy dtype
+
+        Returns:
+            Array to fill and later give() back
+        """
+        key = (tuple(shape), np.dtype(dtype))
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                array = free.pop()
+                self._free_bytes -= array.nbytes
+                self.counts['reuses'] += 1
+            else:
+                array = np.empty(key[0], dtype=key[1])
+                self.counts['allocations'] += 1
+                self.counts['allocated_bytes'] += array.nbytes
+            self._lent[id(array)] = array
+        return array
+
+    def zeros(self, shape, dtype):
+        """Borrow an array filled with zeros"""
+        array = self.take(shape, dtype)
+        array.fill(0)
+        return array
+
+    def like(self, array, dtype=None):
+        """Borrow an array shaped like another (contents undefined)"""
+        return self.take(array.shape, dtype or array.dtype)
+
+    def give(self, *arrays):
+        """
+        Return borrowed arrays
+
+        Arrays the arena did not hand out (views, caller-owned images) are
+        ignored, so results can be given back without checking where they
+        came from.
+
+        Args:
+            arrays: Arrays from take(); do not use them afterwards
+        """
+        with self._lock:
+            for array in arrays:
+                if array is None or self._lent.get(id(array)) is not array:
+                    continue
+                del self._lent[id(array)]
+                if self._free_bytes + array.nbytes > self.max_bytes:
+                    continue
+                self._free[(array.shape, array.dtype)].append(array)
+                self._free_bytes += array.nbytes
+
+    def snapshot(self):
+        """
+        Counters and pooled size
+
+        Returns:
+            Dictionary of counts plus 'free_bytes'
+        """
+        with self._lock:
+            return dict(self.counts, free_bytes=self._free_bytes)
+
+
+def allocations_since(before, after):
+    """
+    Arena activity between two snapshots
+
+    Returns:
+        Dictionary with 'allocations', 'allocated_bytes' and 'reuses'
+    """
+    return {key: after[key] - before[key] for key in ('allocations', 'allocated_bytes', 'reuses')}
+
+
+# Arena of callers that do not pass one: plain allocation, nothing is kept
+NO_ARENA = BufferArena(max_bytes=0)
@@ -0,0 +1,261 @@
+"""
+Per-render color-space context shared by the makeup stages
+
+Lipstick and blush both need the image as float32 and as HSV. A
+ColorContext converts the live image lazily in 64x64 blocks, keeps each
+conversion until the scheduler reports that the pixels underneath were
+rewritten, and hands stages ColorViews of their ROI. Blocks start on the
+64-column grid of the full frame, so conversions are bit-identical to
+converting the whole image.
+
+saturate_direct() scales saturation in BGR, skipping the HSV round trip.
+"""
+import threading
+
+import cv2
+import numpy as np
+
+from .buffers import NO_ARENA
+from .config import DIRECT_SATURATION
+from .regions import align_rect, intersect_rect, offset_rect, crop
+
+BLOCK_SIZE = 64
+
+
+def saturate_hsv(hsv, mask, boost, buffers=NO_ARENA):
+    """
+    Raise saturation of an HSV image inside a soft mask
+
+    Only the S channel goes through float math; the result is the same as
+    converting the whole HSV image to float and back.
+
+    Args:
+        hsv: uint8 HSV image
+        mask: Soft mask (0-255)
+        boost: Saturation gain at full mask strength
+        buffers: BufferArena for temporaries and the result
+
+    Returns:
+        Saturated image as float32 BGR
+    """
+    # hsv[:, :, 1] * (1 + boost * mask / 255.0), rounded to float32
+    gain = buffers.take(mask.shape, np.float64)
+    np.multiply(boost, mask, out=gain)
+    gain /= 255.0
+    np.add(1, gain, out=gain)
+    np.multiply(hsv[:, :, 1], gain, out=gain)
+    saturation = buffers.take(mask.shape, np.float32)
+    np.copyto(saturation, gain, casting='same_kind')
+    np.clip(saturation, 0, 255, out=saturation)
+
+    boosted = buffers.like(hsv)
+    np.copyto(boosted, hsv)
+    boosted[:, :, 1] = saturation
+    bgr = cv2.cvtColor(boosted, cv2.COLOR_HSV2BGR, dst=buffers.like(hsv))
+    result = buffers.like(hsv, np.float32)
+    np.copyto(result, bgr)
+    buffers.give(gain, saturation, boosted, bgr)
+    return result
+
+
+def saturate_direct(bgr, bgr_float, mask, boost):
+    """
+    Raise saturation inside a soft mask without converting to HSV
+
+    With V = max(B, G, R), scaling HSV saturation by k while keeping hue
+    and value is the same as moving every channel away from V by k:
+    c' = V + k * (c - V). k is capped where the smallest channel would go
+    below zero, which is where HSV saturation clips at 255. Differs from
+    the uint8 HSV path only by its quantization (a few gray levels).
+
+    Args:
+        bgr: uint8 BGR image
+        bgr_float: The same image as float32
+        mask: Soft mask (0-255)
+        boost: Saturation gain at full mask strength
+
+    Returns:
+        Saturated image as float32 BGR
+    """
+    b, g, r = cv2.split(bgr)
+    value = cv2.max(cv2.max(b, g), r)
+    chroma = cv2.subtract(value, cv2.min(cv2.min(b, g), r))
+
+    # cv2.divide yields 0 for grey pixels, where the gain does not matter
+    gain = cv2.min(cv2.divide(value, chroma, dtype=cv2.CV_32F),
+                   mask.astype(np.float32) * (boost / 255.0) + 1)
+
+    value_3ch = cv2.cvtColor(value, cv2.COLOR_GRAY2BGR).astype(np.float32)
+    result = cv2.subtract(bgr_float, value_3ch)
+    cv2.multiply(result, cv2.cvtColor(gain, cv2.COLOR_GRAY2BGR), dst=result)
+    cv2.add(result, value_3ch, dst=result)
+    return result
+
+
+class ColorContext:
+    """Lazily converted float32 and HSV copies of an image region"""
+
+    def __init__(self, image, rect=None, direct=DIRECT_SATURATION, buffers=NO_ARENA):
+        """
+        Create a context for one render
+
+        Args:
+            image: Live BGR image; the caller reports writes via invalidate()
+            rect: Region that will be requested (default: whole image);
+                requests outside it are converted without caching
+            direct: Effects should boost saturation with saturate_direct
+            buffers: BufferArena the planes are borrowed from (see release)
+        """
+        h, w = image.shape[:2]
+        self.image = image
+        self.direct = direct
+        self.buffers = buffers
+        self.rect = align_rect(rect or (0, 0, w, h), image.shape, BLOCK_SIZE)
+
+        x0, y0, x1, y1 = self.rect
+        blocks = (-(-(y1 - y0) // BLOCK_SIZE), -(-(x1 - x0) // BLOCK_SIZE))
+        self._planes = {}  # kind -> full-region array, allocated on first use
+        self._valid = {kind: np.zeros(blocks, dtype=bool) for kind in ('float', 'hsv')}
+        self._lock = threading.Lock()
+        self.conversions = 0  # Blocks converted, for benchmarks
+
+    def view(self, rect):
+        """
+        Conversions of one ROI
+
+        Args:
+            rect: ROI in full-frame coordinates
+
+        Returns:
+            ColorView
+        """
+        return ColorView(self, rect)
+
+    def invalidate(self, rect):
+        """
+        Forget conversions of pixels that were rewritten
+
+        Args:
+            rect: Rectangle of the image that changed
+        """
+        local = intersect_rect(rect, self.rect)
+        if local is None:
+            return
+        bx0, by0, bx1, by1 = self._block_range(local)
+        with self._lock:
+            for valid in self._valid.values():
+                valid[by0:by1, bx0:bx1] = False
+
+    def get(self, kind, rect):
+        """
+        float32 ('float') or uint8 HSV ('hsv') pixels of a rectangle
+
+        Returns:
+            Array for rect; do not modify it, it may be shared
+        """
+        inside = intersect_rect(rect, self.rect)
+        if inside != tuple(rect):
+            return self._convert(kind, crop(self.image, rect))
+
+        with self._lock:
+            plane = self._planes.get(kind)
+            if plane is None:
+                x0, y0, x1, y1 = self.rect
+                dtype = np.float32 if kind == 'float' else np.uint8
+                plane = self._planes[kind] = self.buffers.take((y1 - y0, x1 - x0, 3), dtype)
+
+            # Convert the bounding box of the missing blocks in one call
+            bx0, by0, bx1, by1 = self._block_range(rect)
+            missing = ~self._valid[kind][by0:by1, bx0:bx1]
+            if missing.any():
+                rows = np.flatnonzero(missing.any(axis=1))
+                cols = np.flatnonzero(missing.any(axis=0))
+                block_rect = self._block_rect(bx0 + cols[0], by0 + rows[0],
+                                              bx0 + cols[-1] + 1, by0 + rows[-1] + 1)
+                local = offset_rect(block_rect, self.rect)
+                lx0, ly0, lx1, ly1 = local
+                self._convert(kind, crop(self.image, block_rect), plane[ly0:ly1, lx0:lx1])
+                self._valid[kind][by0 + rows[0]:by0 + rows[-1] + 1,
+                                  bx0 + cols[0]:bx0 + cols[-1] + 1] = True
+                self.conversions += int(missing.sum())
+
+        return crop(plane, offset_rect(rect, self.rect))
+
+    def release(self):
+        """Give the planes back to the arena once the render is done"""
+        with self._lock:
+            self.buffers.give(*self._planes.values())
+            self._planes = {}
+            for valid in self._valid.values():
+                valid[:] = False
+
+    @staticmethod
+    def _convert(kind, pixels, dst=None):
+        """Convert BGR pixels to the requested representation, into dst if given"""
+        if kind == 'float':
+            if dst is None:
+                return pixels.astype(np.float32)
+            np.copyto(dst, pixels)
+            return dst
+        return cv2.cvtColor(pixels, cv2.COLOR_BGR2HSV, dst=dst)
+
+    def _block_range(self, rect):
+        """Block indices (bx0, by0, bx1, by1) covering a rectangle"""
+        x0, y0, x1, y1 = offset_rect(rect, self.rect)
+        return (x0 // BLOCK_SIZE, y0 // BLOCK_SIZE,
+                -(-x1 // BLOCK_SIZE), -(-y1 // BLOCK_SIZE))
+
+    def _block_rect(self, bx0, by0, bx1, by1):
+        """Full-frame rectangle of a block range, clipped to the region"""
+        x0, y0, x1, y1 = self.rect
+        return (x0 + bx0 * BLOCK_SIZE, y0 + by0 * BLOCK_SIZE,
+                min(x1, x0 + bx1 * BLOCK_SIZE), min(y1, y0 + by1 * BLOCK_SIZE))
+
+
+class ColorView:
+    """Conversions of one ROI, as handed to an effect"""
+
+    def __init__(self, context, rect):
+        """
+        Args:
+            context: ColorContext the ROI belongs to
+            rect: ROI in full-frame coordinates
+        """
+        self.context = context
+        self.rect = rect
+        self.direct = context.direct if context is not None else DIRECT_SATURATION
+        self._image = None
+        self._own = {}
+
+    @classmethod
+    def of(cls, image, direct=DIRECT_SATURATION):
+        """Standalone view over a whole image (converted on demand, no sharing)"""
+        view = cls(None, None)
+        view.direct = direct
+        view._image = image
+        return view
+
+    def _get(self, kind):
+        """Shared conversion from the context, or a private one"""
+        if self.context is not None:
+            return self.context.get(kind, self.rect)
+        if kind not in self._own:
+            self._own[kind] = ColorContext._convert(kind, self._image)
+        return self._own[kind]
+
+    @property
+    def bgr(self):
+        """ROI pixels as they are now (uint8 BGR)"""
+        if self.context is not None:
+            return crop(self.context.image, self.rect)
+        return self._image
+
+    @property
+    def float32(self):
+        """ROI as float32 BGR"""
+        return self._get('float')
+
+    @property
+    def hsv(self):
+        """ROI as uint8 HSV"""
+        return self._get('hsv')
@@ -8,10 +8,15 @@ WINDOW_HEIGHT = 1000
 
 CANVAS_WIDTH = 400
 CANVAS_HEIGHT = 500
+CANVAS_PATCH_LIMIT = 32  # Partial after-canvas refreshes stacked before a full redraw
 
 MAX_IMAGE_DIMENSION = 1200  
 BLEMISH_RADIUS = 10  
 INPAINT_RADIUS = 3  
+BLEMISH_AUTO_SENSITIVITY = 50  # Automatic spot detection, 0-100 (higher finds fainter spots)
+BLEMISH_AUTO_MAX_SPOTS = 20  # Most spots removed automatically per face
+BLEMISH_DETECT_WIDTH = 256  # Face width (pixels) spot detection runs at
+BLEMISH_EDGE_MARGIN = 0.15  # Spots are searched this far inside the face outline (fraction of face width)
 
 SLIDER_MIN = 0
 SLIDER_MAX = 100
@@ -34,3 +39,49 @@ SUPPORTED_FORMATS = [
 
 FACE_DETECTION_CONFIDENCE = 0.5
 MAX_NUM_FACES = 1
+
+SERVICE_HOST = '127.0.0.1'
+SERVICE_PORT = 8765
+SERVICE_WORKERS = None  # Render processes (None: one per usable core, see processing.resources)
+SERVICE_QUEUE_DEPTH = 8  # Requests allowed to wait for a worker
+SERVICE_TIMEOUT = 30  # Seconds per render before giving up
+SERVICE_MAX_UPLOAD = 50 * 1024 * 1024
+SERVICE_PRELOAD = ('mediapipe', 'src.utils.constants', 'src.service.worker')  # Imported once in the fork server
+SERVICE_HEALTH_SECONDS = 0.5  # Idle workers are checked this often; dead ones are replaced at once
+
+TWO_STAGE_MIN_PIXELS = 8_000_000  # Use two-stage detection above this size
+TWO_STAGE_PREVIEW_SCALE = 4  # Stage one runs at 1/4 resolution
+TWO_STAGE_PADDING = 0.35  # Crop margin around the face box, relative to its size
+
+PIPELINE_VERSION = 3  # Bump whenever effect output changes; invalidates render caches
+RENDER_CACHE_MAX_BYTES = 2 * 1024 ** 3
+BATCH_LEASE_SECONDS = 600  # A bulk-job lease this old belongs to a crashed process
+
+CPU_LIMIT = None  # Cores processes and threads are planned for (None: affinity and cgroup quota)
+STAGE_THREADS = 4  # Threads for concurrent region-disjoint effect stages
+STACK_SIZE = 4  # Same-sized images rendered together by processing.stacked
+DIRECT_SATURATION = False  # Boost makeup saturation in BGR (faster, within a few levels of HSV)
+
+RENDER_PROCESS = True  # GUI renders in a separate engine process (main.py --no-render-process)
+RENDER_POLL_MS = 10  # How often the GUI checks for a finished engine render
+LOAD_POLL_MS = 20  # How often the GUI checks on a background image load
+
+VIDEO_WARMUP_FRAMES = 5  # Frames each video chunk feeds the face tracker before writing
+VIDEO_CHUNK_FOURCC = 'MJPG'  # Codec of intermediate chunk files
+VIDEO_FOURCC = {'.mp4': 'mp4v', '.avi': 'MJPG', '.mkv': 'MJPG'}  # Output codec by extension
+
+THUMBNAIL_SIZE = 96  # Longest side of gallery thumbnails
+THUMBNAIL_THREADS = 4  # Thumbnail decode threads
+THUMBNAIL_CACHE_ITEMS = 1000  # Thumbnails kept in memory
+THUMBNAIL_CACHE_DIR = None  # Disk cache for thumbnails, e.g. '~/.cache/prettypixels/thumbnails'
+GALLERY_COLUMNS = 2
+
+PROFILE_INTERVAL_MS = 5  # Sampling profiler period (main.py --profile, F9 in the GUI)
+PROFILE_TOP_N = 20  # Functions in the profiler's hot-function summary
+PROFILE_PATH = 'profile.folded'  # Collapsed-stack output when none is given
+
+VIEW_MAX_ZOOM = 8  # Canvas pixels per image pixel at full zoom
+VIEW_ZOOM_STEP = 1.25  # Zoom factor per mouse wheel notch
+
+MEMORY_BUDGET = None  # Bytes one render may allocate beyond its input (None: unlimited)
+BUFFER_ARENA_MAX_BYTES = 256 * 1024 ** 2  # Returned render buffers kept for reuse per loaded image
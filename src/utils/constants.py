@@ -29,6 +29,9 @@ RIGHT_EYE_INDICES = [
 LEFT_EYEBROW_INDICES = [70, 63, 105, 66, 107, 55, 65, 52, 53, 46]
 RIGHT_EYEBROW_INDICES = [300, 293, 334, 296, 336, 285, 295, 282, 283, 276]
 
+# Nose tip, alae and nostrils
+NOSE_INDICES = [1, 2, 98, 327, 64, 294, 48, 278, 219, 439, 60, 290, 75, 305, 97, 326, 167, 393, 240, 460]
+
 
 LEFT_CHEEK_CENTER = 205  
 RIGHT_CHEEK_CENTER = 425  
@@ -38,3 +41,23 @@ CHEEK_RADIUS_RATIO = 0.08
 LIPSTICK_RED = (0, 0, 200)
 LIPSTICK_PINK = (180, 105, 255)
 BLUSH_PINK = (180, 100, 255)
+
+LIPSTICK_COLORS = {
+    'red': (0, 0, 200),           # Classic red
+    'pink': (180, 100, 255),      # Bright pink
+    'coral': (80, 127, 255),      # Coral
+    'berry': (128, 0, 128),       # Berry/purple
+    'nude': (120, 140, 180),      # Nude/beige
+    'wine': (80, 30, 139),        # Wine/dark red
+    'orange': (0, 140, 255),      # Orange
+    'mauve': (170, 120, 200)      # Mauve
+}
+
+BLUSH_COLORS = {
+    'pink': (180, 100, 255),      # Bright pink
+    'peach': (140, 180, 255),     # Peach
+    'coral': (100, 140, 255),     # Coral
+    'rose': (150, 100, 200),      # Rose
+    'bronze': (80, 120, 180),     # Bronze/terracotta
+    'mauve': (180, 130, 200)      # Mauve
+}
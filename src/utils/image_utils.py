@@ -1,45 +1,13 @@
 """
-Image conversion and utility functions
+Mask and blending utilities
+
+Display conversions (Tk PhotoImages) live in gui.photo; nothing here
+needs PIL or Tk.
 """
 import cv2
 import numpy as np
-from PIL import Image, ImageTk
-
-
-def cv2_to_pil(cv2_image):
-    """Convert OpenCV BGR image to PIL RGB image"""
-    rgb_image = cv2.cvtColor(cv2_image, cv2.COLOR_BGR2RGB)
-    return Image.fromarray(rgb_image)
-
-
-def pil_to_cv2(pil_image):
-    """Convert PIL RGB image to OpenCV BGR image"""
-    rgb_array = np.array(pil_image)
-    return cv2.cvtColor(rgb_array, cv2.COLOR_RGB2BGR)
-
-
-def cv2_to_photoimage(cv2_image, target_width=400, target_height=500):
-    """
-    Convert OpenCV image to Tkinter PhotoImage with resizing
-
-    Args:
-        cv2_image: OpenCV BGR image
-        target_width: Target width for display
-        target_height: Target height for display
-
-    Returns:
-        ImageTk.PhotoImage
-    """
-    rgb_image = cv2.cvtColor(cv2_image, cv2.COLOR_BGR2RGB)
-
-    h, w = rgb_image.shape[:2]
-    scale = min(target_width / w, target_height / h)
-    new_w, new_h = int(w * scale), int(h * scale)
-
-    resized = cv2.resize(rgb_image, (new_w, new_h), interpolation=cv2.INTER_AREA)
 
-    pil_image = Image.fromarray(resized)
-    return ImageTk.PhotoImage(pil_image)
+from .buffers import NO_ARENA
 
 
 def feather_mask(mask, kernel_size=15):
@@ -59,6 +27,28 @@ def feather_mask(mask, kernel_size=15):
     return cv2.GaussianBlur(mask, (kernel_size, kernel_size), 0)
 
 
+def float_mask_3ch(mask, buffers=NO_ARENA):
+    """
+    Three-channel 0-1 float64 copy of a soft mask
+
+    Same values as cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR) / 255.0, written
+    into arrays borrowed from an arena.
+
+    Args:
+        mask: Soft mask (0-255)
+        buffers: BufferArena to borrow from
+
+    Returns:
+        float64 array; give it back to the arena when done
+    """
+    gray = buffers.take(mask.shape + (3,), np.uint8)
+    cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR, dst=gray)
+    result = buffers.take(gray.shape, np.float64)
+    np.divide(gray, 255.0, out=result)
+    buffers.give(gray)
+    return result
+
+
 def blend_images(img1, img2, mask, alpha=1.0):
     """
     Blend two images using mask and alpha
@@ -0,0 +1,205 @@
+"""
+Sampling profiler for the real load and render code paths
+
+A background thread wakes every PROFILE_INTERVAL_MS and records the
+Python stack of every other thread (sys._current_frames, no tracing
+hooks), so the code being measured runs at full speed. Only stacks that
+pass through src/effects or src/processing are kept: idle GUI time and
+the profiler itself never show up. Time spent inside OpenCV and NumPy
+is attributed to the Python function that called them.
+
+Results are written in the collapsed-stack format flamegraph tools read
+(flamegraph.pl, speedscope, inferno): one 'outer;...;inner count' line
+per distinct stack. top() summarizes the hottest src/effects and
+src/processing functions.
+
+A gated profiler only samples inside recording() blocks. The render
+engine uses one: its dispatch loop lives in src/processing, so its idle
+waits for the next request would otherwise dominate the profile.
+"""
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from .config import PROFILE_INTERVAL_MS, PROFILE_TOP_N
+
+# Repository root: frame labels are paths relative to it
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Functions top() attributes time to
+PROFILE_ROOTS = ('src/effects/', 'src/processing/')
+
+
+class SamplingProfiler:
+    """Periodic stack sampler for all threads of this process"""
+
+    def __init__(self, interval=PROFILE_INTERVAL_MS / 1000.0, roots=PROFILE_ROOTS, gated=False):
+        """
+        Create a stopped profiler
+
+        Args:
+            interval: Seconds between samples
+            roots: Path prefixes (relative to ROOT) a stack must pass
+                through to be recorded
+            gated: Only sample inside recording() blocks
+        """
+        self.interval = interval
+        self.roots = roots
+        self._open = threading.Event()  # Set while samples are recorded
+        self._gated = gated
+        if not gated:
+            self._open.set()
+        self.counts = Counter()  # Collapsed stack -> samples
+        self._labels = {}  # Code object -> (label, under roots)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        """True between start() and stop()"""
+        return self._thread is not None
+
+    def start(self):
+        """Start sampling (no-op if already running)"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop sampling; the samples so far are kept
+
+        Returns:
+            Counter of collapsed stack -> samples
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return self.counts
+
+    def clear(self):
+        """Drop the samples collected so far"""
+        with self._lock:
+            self.counts = Counter()
+
+    def merge(self, counts):
+        """
+        Add samples collected elsewhere (e.g. another process)
+
+        Args:
+            counts: Mapping of collapsed stack -> samples
+        """
+        with self._lock:
+            self.counts.update(counts)
+
+    @contextmanager
+    def recording(self):
+        """Block during which a gated profiler samples (always on otherwise)"""
+        self._open.set()
+        try:
+            yield self
+        finally:
+            if self._gated:
+                self._open.clear()
+
+    def _run(self):
+        """Sampler thread body"""
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        """Record the current stack of every other thread"""
+        if not self._open.is_set():
+            return
+        me = threading.get_ident()
+        stacks = [self._collapse(frame) for ident, frame in sys._current_frames().items() if ident != me]
+        with self._lock:
+            self.counts.update(stack for stack in stacks if stack)
+
+    def _label(self, code):
+        """(label, under roots) of a code object, cached"""
+        entry = self._labels.get(code)
+        if entry is None:
+            path = os.path.abspath(code.co_filename)
+            if path.startswith(ROOT + os.sep):
+                path = os.path.relpath(path, ROOT).replace(os.sep, '/')
+            else:
+                path = os.path.basename(path)
+            name = getattr(code, 'co_qualname', code.co_name)
+            entry = (f"{path}:{name}", path.startswith(self.roots))
+            self._labels[code] = entry
+        return entry
+
+    def _collapse(self, frame):
+        """'outer;...;inner' for a thread's stack, or None if it never enters the roots"""
+        labels = []
+        relevant = False
+        while frame is not None:
+            label, under_roots = self._label(frame.f_code)
+            labels.append(label)
+            relevant = relevant or under_roots
+            frame = frame.f_back
+        if not relevant:
+            return None
+        return ';'.join(reversed(labels))
+
+    def write_collapsed(self, path):
+        """
+        Write the samples in collapsed-stack format
+
+        Args:
+            path: Output file
+
+        Returns:
+            Number of samples written
+        """
+        with self._lock:
+            counts = dict(self.counts)
+        with open(path, 'w') as f:
+            for stack, count in sorted(counts.items()):
+                f.write(f"{stack} {count}\n")
+        return sum(counts.values())
+
+    def top(self, n=PROFILE_TOP_N):
+        """
+        Hottest functions under the roots
+
+        A sample's self time goes to the innermost frame under the roots
+        (so OpenCV calls count for the effect that made them); its total
+        time to every such frame on the stack, once each.
+
+        Args:
+            n: Rows returned
+
+        Returns:
+            List of (label, self samples, total samples), by self samples
+        """
+        own = Counter()
+        total = Counter()
+        with self._lock:
+            counts = dict(self.counts)
+        for stack, count in counts.items():
+            frames = [label for label in stack.split(';') if label.startswith(self.roots)]
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for label in set(frames):
+                total[label] += count
+        return [(label, samples, total[label]) for label, samples in own.most_common(n)]
+
+    def format_top(self, n=PROFILE_TOP_N):
+        """Text table of top(n), with times estimated from the interval"""
+        with self._lock:
+            samples = sum(self.counts.values())
+        lines = [f"{samples} samples ({samples * self.interval:.2f}s of sampled thread time)",
+                 f"{'self %':>7} {'self s':>7} {'total %':>8}  function"]
+        for label, own, total in self.top(n):
+            lines.append(f"{100.0 * own / samples:>6.1f}% {own * self.interval:>7.2f} "
+                         f"{100.0 * total / samples:>7.1f}%  {label}")
+        return '\n'.join(lines)
@@ -0,0 +1,139 @@
+"""
+Lazily built mipmap pyramid for display
+
+Level 0 is the image itself; level k is level k-1 halved with a 2x2 box
+filter (INTER_AREA at exactly half size), so every level-k pixel depends
+only on a 2^k x 2^k block of level 0. Levels are split into tiles that
+are built on first use and invalidated only where level 0 changed, so a
+viewer pays for the tiles it shows, and a render that touched the lips
+only rebuilds the tiles over the lips.
+"""
+import math
+
+import cv2
+import numpy as np
+
+PYRAMID_TILE = 256
+PYRAMID_MIN_SIZE = 64  # Stop halving once a level fits in this many pixels
+
+
+class ImagePyramid:
+    """Mipmap pyramid of a BGR image, built tile by tile on demand"""
+
+    def __init__(self, tile=PYRAMID_TILE):
+        """
+        Args:
+            tile: Tile size in pixels (the same at every level)
+        """
+        self.tile = tile
+        self.image = None
+        self.levels = []  # Level arrays, allocated on first use (level 0 is the image)
+        self.valid = []  # Per-level (tiles_y, tiles_x) bool grids
+        self.tiles_built = 0
+
+    @property
+    def level_count(self):
+        """Number of levels including level 0"""
+        return len(self.levels)
+
+    def level_shape(self, level):
+        """(height, width) of a level"""
+        h, w = self.image.shape[:2]
+        return h >> level, w >> level
+
+    def update(self, image, rects=None):
+        """
+        Show a new version of the image
+
+        Args:
+            image: BGR image (kept by reference, not copied)
+            rects: Rectangles outside which image equals the previous
+                version; None rebuilds everything
+        """
+        if rects is None or self.image is None or image.shape != self.image.shape:
+            self._reset(image)
+            return
+
+        self.image = image
+        self.levels[0] = image
+        for rect in rects:
+            self.invalidate(rect)
+
+    def _reset(self, image):
+        """Drop every level"""
+        self.image = image
+        self.levels = [image]
+        self.valid = [None]
+
+        h, w = image.shape[:2]
+        level = 1
+        while max(h >> (level - 1), w >> (level - 1)) > PYRAMID_MIN_SIZE and min(h >> level, w >> level) > 0:
+            lh, lw = h >> level, w >> level
+            self.levels.append(None)
+            self.valid.append(np.zeros((math.ceil(lh / self.tile), math.ceil(lw / self.tile)), dtype=bool))
+            level += 1
+
+    def invalidate(self, rect):
+        """
+        Mark the tiles over a level-0 rectangle as stale
+
+        Args:
+            rect: (x0, y0, x1, y1) in level-0 pixels
+        """
+        x0, y0, x1, y1 = rect
+        for level in range(1, len(self.levels)):
+            scale = 1 << level
+            tx0, ty0 = (x0 // scale) // self.tile, (y0 // scale) // self.tile
+            tx1 = math.ceil(math.ceil(x1 / scale) / self.tile)
+            ty1 = math.ceil(math.ceil(y1 / scale) / self.tile)
+            self.valid[level][ty0:ty1, tx0:tx1] = False
+
+    def level_for(self, zoom):
+        """
+        Coarsest level that still has at least one pixel per display pixel
+
+        Args:
+            zoom: Display pixels per image pixel
+
+        Returns:
+            Level index
+        """
+        if zoom >= 1:
+            return 0
+        level = int(math.floor(math.log2(1.0 / zoom) + 1e-9))
+        return min(level, len(self.levels) - 1)
+
+    def region(self, level, rect):
+        """
+        Pixels of a level, building stale tiles they cover
+
+        Args:
+            level: Level index
+            rect: (x0, y0, x1, y1) in that level's pixels
+
+        Returns:
+            View into the level array
+        """
+        x0, y0, x1, y1 = rect
+        if level > 0:
+            valid = self.valid[level]
+            if self.levels[level] is None:
+                lh, lw = self.level_shape(level)
+                self.levels[level] = np.empty((lh, lw) + self.image.shape[2:], dtype=self.image.dtype)
+
+            ty0, tx0 = y0 // self.tile, x0 // self.tile
+            ty1, tx1 = math.ceil(y1 / self.tile), math.ceil(x1 / self.tile)
+            for ty, tx in zip(*np.nonzero(~valid[ty0:ty1, tx0:tx1])):
+                self._build_tile(level, ty0 + int(ty), tx0 + int(tx))
+        return self.levels[level][y0:y1, x0:x1]
+
+    def _build_tile(self, level, ty, tx):
+        """Downsample one tile from the level below"""
+        lh, lw = self.level_shape(level)
+        x0, y0 = tx * self.tile, ty * self.tile
+        x1, y1 = min(x0 + self.tile, lw), min(y0 + self.tile, lh)
+
+        source = self.region(level - 1, (2 * x0, 2 * y0, 2 * x1, 2 * y1))
+        self.levels[level][y0:y1, x0:x1] = cv2.resize(source, (x1 - x0, y1 - y0), interpolation=cv2.INTER_AREA)
+        self.valid[level][ty, tx] = True
+        self.tiles_built += 1
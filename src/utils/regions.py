@@ -0,0 +1,201 @@
+"""
+Rectangle helpers for region-of-interest processing
+
+Rectangles are (x0, y0, x1, y1) tuples with exclusive right/bottom edges,
+matching NumPy slicing: image[y0:y1, x0:x1].
+
+The rectangle arithmetic is pure Python; only the mask helpers load
+NumPy and OpenCV, on first use, so the GUI can import this module before
+either is loaded.
+"""
+import math
+
+
+def mask_bbox(mask):
+    """
+    Bounding rectangle of the non-zero pixels of a mask
+
+    Args:
+        mask: 2D mask
+
+    Returns:
+        (x0, y0, x1, y1) or None if the mask is empty
+    """
+    import numpy as np
+
+    rows = np.flatnonzero(mask.any(axis=1))
+    if rows.size == 0:
+        return None
+    cols = np.flatnonzero(mask.any(axis=0))
+    return (int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1)
+
+
+def component_rects(mask):
+    """
+    Bounding rectangles of the connected non-zero regions of a mask
+
+    Args:
+        mask: 2D mask
+
+    Returns:
+        List of (x0, y0, x1, y1), empty if the mask is empty
+    """
+    import cv2
+    import numpy as np
+
+    rect = mask_bbox(mask)
+    if rect is None:
+        return []
+
+    # Label only the bounding box, not the whole frame
+    count, _, stats, _ = cv2.connectedComponentsWithStats(
+        (crop(mask, rect) > 0).astype(np.uint8), connectivity=8)
+    x0, y0 = rect[:2]
+    return [(x0 + int(x), y0 + int(y), x0 + int(x + w), y0 + int(y + h))
+            for x, y, w, h, _ in stats[1:count]]
+
+
+def merge_rects(rects):
+    """
+    Merge overlapping rectangles until the remaining ones are disjoint
+
+    Args:
+        rects: Iterable of rectangles
+
+    Returns:
+        List of pairwise disjoint rectangles covering the input
+    """
+    merged = []
+    for rect in rects:
+        # Absorb every rectangle the growing one touches, then re-check
+        while True:
+            hits = [other for other in merged if intersect_rect(rect, other) is not None]
+            if not hits:
+                break
+            for other in hits:
+                merged.remove(other)
+                rect = union_rect(rect, other)
+        merged.append(rect)
+    return merged
+
+
+def expand_rect(rect, pad, shape):
+    """
+    Grow a rectangle by pad pixels on every side, clipped to the image
+
+    Args:
+        rect: (x0, y0, x1, y1)
+        pad: Padding in pixels
+        shape: Image shape (height, width, ...)
+
+    Returns:
+        Expanded rectangle
+    """
+    x0, y0, x1, y1 = rect
+    h, w = shape[:2]
+    return (max(0, x0 - pad), max(0, y0 - pad), min(w, x1 + pad), min(h, y1 + pad))
+
+
+def align_rect(rect, shape, multiple=64):
+    """
+    Widen a rectangle so its columns sit on a fixed grid from the left edge
+
+    OpenCV's vectorized color conversions round slightly differently in the
+    scalar tail of each row. Keeping ROI columns on the same vector grid as
+    the full frame makes ROI results bit-identical to full-frame results.
+
+    Args:
+        rect: (x0, y0, x1, y1)
+        shape: Image shape (height, width, ...)
+        multiple: Column alignment in pixels
+
+    Returns:
+        Aligned rectangle
+    """
+    x0, y0, x1, y1 = rect
+    w = shape[1]
+    x0 = x0 // multiple * multiple
+    x1 = min(w, -(-x1 // multiple) * multiple)
+    return (x0, y0, x1, y1)
+
+
+def intersect_rect(a, b):
+    """
+    Intersection of two rectangles
+
+    Returns:
+        Rectangle or None if they do not overlap
+    """
+    if a is None or b is None:
+        return None
+    x0, y0 = max(a[0], b[0]), max(a[1], b[1])
+    x1, y1 = min(a[2], b[2]), min(a[3], b[3])
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return (x0, y0, x1, y1)
+
+
+def union_rect(a, b):
+    """
+    Smallest rectangle covering both rectangles (either may be None)
+    """
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def rect_area(rect):
+    """Pixels inside a rectangle"""
+    return (rect[2] - rect[0]) * (rect[3] - rect[1])
+
+
+def split_rect(rect, tile_w, tile_h):
+    """
+    Cut a rectangle into a grid of tiles
+
+    Tile columns start at rect's left edge, so an aligned rectangle split
+    with a tile_w on the alignment grid gives aligned tiles.
+
+    Args:
+        rect: (x0, y0, x1, y1)
+        tile_w: Maximum tile width
+        tile_h: Maximum tile height
+
+    Returns:
+        List of disjoint rectangles covering rect
+    """
+    x0, y0, x1, y1 = rect
+    return [(x, y, min(x + tile_w, x1), min(y + tile_h, y1))
+            for y in range(y0, y1, tile_h) for x in range(x0, x1, tile_w)]
+
+
+def offset_rect(rect, origin):
+    """
+    Express a rectangle relative to another rectangle's top-left corner
+    """
+    return (rect[0] - origin[0], rect[1] - origin[1],
+            rect[2] - origin[0], rect[3] - origin[1])
+
+
+def crop(image, rect):
+    """View of image inside rect"""
+    x0, y0, x1, y1 = rect
+    return image[y0:y1, x0:x1]
+
+
+def paste(dst, src, rect):
+    """Copy src into dst at rect (in place)"""
+    x0, y0, x1, y1 = rect
+    dst[y0:y1, x0:x1] = src
+    return dst
+
+
+def gaussian_halo(sigma):
+    """
+    Pixels a Gaussian blur of the given sigma can reach
+
+    OpenCV sizes 8-bit kernels at 3 sigma; 4 sigma keeps float inputs safe too.
+    """
+    return math.ceil(sigma * 4)
@@ -0,0 +1,299 @@
+"""
+Thumbnail decoding and caching for the folder gallery
+
+Thumbnails are decoded with OpenCV's reduced-scale decode: for JPEG the
+decoder itself skips detail (IMREAD_REDUCED_COLOR_8 is several times faster
+than a full decode), so even large photos are cheap. Decoded thumbnails
+are kept in a bounded in-memory LRU and, optionally, written to a disk
+cache keyed by path, modification time and size, so reopening a folder
+skips decoding altogether.
+
+Nothing here touches Tk: decodes run on a thread pool and the gallery
+collects finished thumbnails from the Tk thread with drain().
+"""
+import hashlib
+import os
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from .config import THUMBNAIL_SIZE, THUMBNAIL_THREADS, THUMBNAIL_CACHE_ITEMS, THUMBNAIL_CACHE_DIR
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# Reduction factor -> decode flag, largest first
+REDUCED_DECODE = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+    (1, cv2.IMREAD_COLOR)
+)
+
+
+def list_images(directory):
+    """
+    Image files directly inside a directory
+
+    Returns:
+        Sorted list of paths
+    """
+    with os.scandir(directory) as entries:
+        return sorted(entry.path for entry in entries
+                      if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def decode_thumbnail(path, size=THUMBNAIL_SIZE):
+    """
+    Decode an image at reduced scale and fit it into a square
+
+    The 1/8 decode is tried first; if that comes out smaller than the
+    thumbnail, the image is decoded again at the largest reduction that
+    still covers it.
+
+    Args:
+        path: Image file
+        size: Longest side of the thumbnail
+
+    Returns:
+        BGR thumbnail or None if the file cannot be decoded
+    """
+    with open(path, 'rb') as f:
+        data = np.frombuffer(f.read(), dtype=np.uint8)
+
+    image = cv2.imdecode(data, REDUCED_DECODE[0][1])
+    if image is None:
+        return None
+
+    if max(image.shape[:2]) < size:
+        full_side = max(image.shape[:2]) * REDUCED_DECODE[0][0]
+        for factor, flag in REDUCED_DECODE[1:]:
+            if full_side // factor >= size or factor == 1:
+                image = cv2.imdecode(data, flag)
+                break
+        if image is None:
+            return None
+
+    h, w = image.shape[:2]
+    scale = size / max(h, w)
+    if scale < 1:
+        image = cv2.resize(image, (max(1, round(w * scale)), max(1, round(h * scale))),
+                           interpolation=cv2.INTER_AREA)
+    return image
+
+
+class ThumbnailCache:
+    """Bounded LRU of decoded thumbnails with an optional disk tier"""
+
+    def __init__(self, capacity=THUMBNAIL_CACHE_ITEMS, disk_dir=THUMBNAIL_CACHE_DIR, size=THUMBNAIL_SIZE):
+        """
+        Create an empty cache
+
+        Args:
+            capacity: Thumbnails kept in memory
+            disk_dir: Directory for cached thumbnail files, or None
+            size: Longest side of the thumbnails
+        """
+        self.capacity = capacity
+        self.disk_dir = os.path.expanduser(disk_dir) if disk_dir else None
+        self.size = size
+        self._entries = OrderedDict()  # (path, mtime, bytes) -> thumbnail
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'disk_hits': 0, 'decodes': 0}
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def _key(self, path):
+        """Cache key; changes whenever the file does"""
+        st = os.stat(path)
+        return os.path.abspath(path), st.st_mtime_ns, st.st_size
+
+    def _disk_path(self, key):
+        """Disk cache file for a key"""
+        digest = hashlib.sha1(f"{key}|{self.size}".encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_dir, digest + '.png')
+
+    def get(self, path):
+        """
+        Thumbnail if it is in memory
+
+        Args:
+            path: Image file
+
+        Returns:
+            Thumbnail or None
+        """
+        try:
+            key = self._key(path)
+        except OSError:
+            return None
+        with self._lock:
+            thumbnail = self._entries.get(key)
+            if thumbnail is not None:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+            return thumbnail
+
+    def load(self, path):
+        """
+        Thumbnail from memory, disk or a fresh decode (worker threads)
+
+        Args:
+            path: Image file
+
+        Returns:
+            Thumbnail or None if the file cannot be decoded
+        """
+        thumbnail = self.get(path)
+        if thumbnail is not None:
+            return thumbnail
+
+        try:
+            key = self._key(path)
+        except OSError:
+            return None
+
+        disk_path = self._disk_path(key) if self.disk_dir else None
+        if disk_path is not None and os.path.exists(disk_path):
+            thumbnail = cv2.imread(disk_path, cv2.IMREAD_COLOR)
+            if thumbnail is not None:
+                self._put(key, thumbnail, 'disk_hits')
+                return thumbnail
+
+        try:
+            thumbnail = decode_thumbnail(path, self.size)
+        except OSError:
+            return None
+        if thumbnail is None:
+            return None
+
+        if disk_path is not None:
+            tmp_path = f"{disk_path}.{threading.get_ident()}.tmp.png"
+            if cv2.imwrite(tmp_path, thumbnail):
+                os.replace(tmp_path, disk_path)
+        self._put(key, thumbnail, 'decodes')
+        return thumbnail
+
+    def _put(self, key, thumbnail, counter):
+        """Insert and evict the least recently used thumbnails"""
+        with self._lock:
+            self.stats[counter] += 1
+            self._entries[key] = thumbnail
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+
+class ThumbnailLoader:
+    """Decodes thumbnails on a thread pool and prefetches full images"""
+
+    def __init__(self, cache=None, threads=THUMBNAIL_THREADS):
+        """
+        Start the decode pool
+
+        Args:
+            cache: ThumbnailCache (a default one is created if None)
+            threads: Decode threads
+        """
+        self.cache = cache or ThumbnailCache()
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='thumbnail')
+        self._pending = {}  # Path -> future
+        self._done = queue.Queue()
+        self._prefetch = None  # (path, future)
+
+    def request(self, path):
+        """
+        Queue a thumbnail decode unless it is cached or already queued
+
+        Args:
+            path: Image file
+
+        Returns:
+            The thumbnail if it is already in memory, else None (it will
+            come out of drain())
+        """
+        thumbnail = self.cache.get(path)
+        if thumbnail is not None or path in self._pending:
+            return thumbnail
+
+        future = self.executor.submit(self.cache.load, path)
+        self._pending[path] = future
+        future.add_done_callback(lambda f, path=path: self._done.put((path, f)))
+        return None
+
+    def cancel(self, path):
+        """Drop a queued decode that has not started yet"""
+        future = self._pending.get(path)
+        if future is not None and future.cancel():
+            del self._pending[path]
+
+    def cancel_all(self):
+        """Drop every queued decode that has not started yet"""
+        for path in list(self._pending):
+            self.cancel(path)
+
+    @property
+    def busy(self):
+        """Whether decodes are queued or running"""
+        return bool(self._pending)
+
+    def drain(self):
+        """
+        Thumbnails finished since the last call
+
+        Returns:
+            List of (path, thumbnail or None)
+        """
+        finished = []
+        while True:
+            try:
+                path, future = self._done.get_nowait()
+            except queue.Empty:
+                return finished
+            if self._pending.get(path) is future:
+                del self._pending[path]
+            if not future.cancelled():
+                finished.append((path, future.result()))
+
+    def prefetch(self, path):
+        """
+        Read and decode a full image in the background
+
+        Args:
+            path: Image file likely to be opened next
+        """
+        if self._prefetch is not None and self._prefetch[0] == path:
+            return
+        self._prefetch = (path, self.executor.submit(self._read_image, path))
+
+    def take_prefetched(self, path):
+        """
+        The prefetch of an image, if it is the one being opened
+
+        Args:
+            path: Image file being opened
+
+        Returns:
+            Future resolving to the BGR image (None if unreadable), or None
+        """
+        if self._prefetch is None or self._prefetch[0] != path:
+            return None
+        _, future = self._prefetch
+        self._prefetch = None
+        return future
+
+    @staticmethod
+    def _read_image(path):
+        """Full decode (worker thread)"""
+        try:
+            with open(path, 'rb') as f:
+                return cv2.imdecode(np.frombuffer(f.read(), dtype=np.uint8), cv2.IMREAD_COLOR)
+        except OSError:
+            return None
+
+    def close(self):
+        """Stop the decode threads"""
+        self.executor.shutdown(wait=False, cancel_futures=True)